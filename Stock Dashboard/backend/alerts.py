@@ -0,0 +1,302 @@
+"""User-defined alert rules evaluated incrementally after each refresh.
+
+Rules are indexed by symbol, so a refresh only evaluates the rules that apply to
+the symbols whose latest bar changed. Every (rule, symbol) pair keeps its last
+condition state: an alert fires on the False -> True transition only, at most
+once per bar (dedupe) and not again within the rule's cooldown. Fired alerts are
+handed to pluggable sinks (JSON-lines log file, webhook, stdout).
+"""
+import json
+import math
+import operator
+import os
+import threading
+import urllib.request
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+from price_panel import atomic_write_json
+
+ALERT_METRICS = ('rsi14', 'z_score_100', 'current_drawdown_pct', 'daily_change_pct', 'latest_price',
+                 'ema_signal', 'ema_long_signal', 'relative_perf_1y')
+ALERT_OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+                   '==': operator.eq, '!=': operator.ne}
+DEFAULT_COOLDOWN_SECONDS = 4 * 3600
+RECENT_ALERTS = 200 # Fired alerts kept in memory for /api/alerts
+
+class AlertRule:
+    """One condition `metric op threshold` over a symbol list (None = every symbol)."""
+
+    def __init__(self, rule_id, metric, op, threshold, symbols=None, name=None,
+                 cooldown_seconds=DEFAULT_COOLDOWN_SECONDS):
+        if metric not in ALERT_METRICS:
+            raise ValueError(f"Unknown metric '{metric}' (valid: {', '.join(ALERT_METRICS)})")
+        if op not in ALERT_OPERATORS:
+            raise ValueError(f"Unknown operator '{op}' (valid: {', '.join(ALERT_OPERATORS)})")
+        if metric in ('ema_signal', 'ema_long_signal'):
+            if not isinstance(threshold, str):
+                raise ValueError(f"'{metric}' compares against a signal string such as 'Buy'")
+        elif isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not math.isfinite(threshold):
+            raise ValueError(f"'{metric}' needs a finite numeric threshold")
+        if not math.isfinite(cooldown_seconds) or cooldown_seconds < 0:
+            raise ValueError("cooldown_seconds must be a finite number >= 0")
+        self.rule_id = rule_id
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.symbols = sorted(set(symbols)) if symbols else None
+        self.name = name or f"{metric} {op} {threshold}"
+        self.cooldown_seconds = cooldown_seconds
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a rule from its JSON form (raises ValueError if invalid)."""
+        if not isinstance(data, dict):
+            raise ValueError("A rule must be a JSON object")
+        symbols = data.get('symbols')
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if symbols is not None and not (isinstance(symbols, list) and all(isinstance(s, str) for s in symbols)):
+            raise ValueError("symbols must be a symbol or a list of symbols")
+        for field in ('id', 'name'):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                raise ValueError(f"{field} must be a string")
+        try:
+            cooldown_seconds = float(data.get('cooldown_seconds', DEFAULT_COOLDOWN_SECONDS))
+        except (TypeError, ValueError):
+            raise ValueError("cooldown_seconds must be a number") from None
+        try:
+            return cls(rule_id=data.get('id') or uuid.uuid4().hex[:12],
+                       metric=data['metric'], op=data.get('op', '<'), threshold=data['threshold'],
+                       symbols=[s.upper() for s in symbols] if symbols else None,
+                       name=data.get('name'),
+                       cooldown_seconds=cooldown_seconds)
+        except KeyError as e:
+            raise ValueError(f"Missing field {e}") from None
+        except TypeError as e: # e.g. a list as the operator
+            raise ValueError(f"Invalid rule: {e}") from None
+
+    def to_dict(self):
+        """Returns the JSON form stored in the rules file."""
+        return {'id': self.rule_id, 'name': self.name, 'metric': self.metric, 'op': self.op,
+                'threshold': self.threshold, 'symbols': self.symbols, 'cooldown_seconds': self.cooldown_seconds}
+
+    def matches(self, entry):
+        """Evaluates the condition against one symbol's snapshot entry (None if the metric is missing)."""
+        value = entry.get(self.metric)
+        if value is None:
+            return None
+        return ALERT_OPERATORS[self.op](value, self.threshold)
+
+# --- Sinks ---
+class LogFileSink:
+    """Appends each alert as one JSON line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alert):
+        """Appends one alert to the log file."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert) + '\n')
+
+class WebhookSink:
+    """POSTs each alert as JSON to a URL (e.g. a local chat or automation webhook)."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        """POSTs one alert; errors propagate to the engine, which logs them."""
+        req = urllib.request.Request(self.url, data=json.dumps(alert).encode(),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+
+class PrintSink:
+    """Prints alerts to stdout alongside the refresh log."""
+
+    def send(self, alert):
+        """Prints one alert."""
+        print(f"Alert: {alert['symbol']} {alert['rule_name']} (value {alert['value']}, bar {alert['bar_date']})")
+
+def sinks_from_spec(spec, default_log_path):
+    """Parses a sink list such as 'log:/var/log/alerts.jsonl,webhook:http://localhost:9000/hook,print'."""
+    sinks = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        kind, _, target = item.partition(':')
+        if kind == 'log':
+            sinks.append(LogFileSink(target or default_log_path))
+        elif kind == 'webhook' and target:
+            sinks.append(WebhookSink(target))
+        elif kind == 'print':
+            sinks.append(PrintSink())
+        else:
+            raise ValueError(f"Unknown alert sink '{item}'")
+    return sinks
+
+# --- Engine ---
+class AlertEngine:
+    """Stores rules and per-(rule, symbol) state, persisted as JSON next to the panels."""
+
+    def __init__(self, rules_path, state_path, sinks=()):
+        self.rules_path = rules_path
+        self.state_path = state_path
+        self.sinks = list(sinks)
+        self._rules = {}       # rule id -> AlertRule
+        self._by_symbol = {}   # symbol -> {rule id}
+        self._wildcard = set() # rule ids applying to every symbol
+        self._state = {}       # (rule id, symbol) -> {'active', 'last_fired', 'last_bar'}
+        self._recent = deque(maxlen=RECENT_ALERTS)
+        self._lock = threading.Lock()
+        self._rules_mtime = None
+        self._load_rules()
+        try:
+            with open(self.state_path) as f:
+                for entry in json.load(f).get('state', []):
+                    self._state[(entry['rule_id'], entry['symbol'])] = {
+                        'active': entry['active'], 'last_fired': entry['last_fired'], 'last_bar': entry['last_bar']}
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _load_rules(self):
+        try:
+            self._rules_mtime = os.stat(self.rules_path).st_mtime_ns
+            with open(self.rules_path) as f:
+                rules = [AlertRule.from_dict(data) for data in json.load(f).get('rules', [])]
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.rules_path):
+                print(f"Alerts: Could not load rules: {e}")
+            return
+        self._rules, self._by_symbol, self._wildcard = {}, {}, set()
+        for rule in rules:
+            self._index(rule)
+
+    def _reload_if_changed(self):
+        """Picks up rules edited by another worker process (RUN_SCHEDULER=0 readers share the file)."""
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._rules_mtime:
+            with self._lock:
+                self._load_rules()
+
+    def _index(self, rule):
+        self._rules[rule.rule_id] = rule
+        if rule.symbols is None:
+            self._wildcard.add(rule.rule_id)
+        else:
+            for symbol in rule.symbols:
+                self._by_symbol.setdefault(symbol, set()).add(rule.rule_id)
+
+    def _unindex(self, rule):
+        self._wildcard.discard(rule.rule_id)
+        for symbol in rule.symbols or ():
+            ids = self._by_symbol.get(symbol)
+            if ids is not None:
+                ids.discard(rule.rule_id)
+                if not ids:
+                    del self._by_symbol[symbol]
+        self._state = {key: value for key, value in self._state.items() if key[0] != rule.rule_id}
+
+    def _save_rules(self):
+        os.makedirs(os.path.dirname(self.rules_path) or '.', exist_ok=True)
+        atomic_write_json(self.rules_path, {'rules': [rule.to_dict() for rule in self._rules.values()]})
+        self._rules_mtime = os.stat(self.rules_path).st_mtime_ns
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        atomic_write_json(self.state_path, {'state': [dict(value, rule_id=key[0], symbol=key[1])
+                                                      for key, value in self._state.items()]})
+
+    def rules(self):
+        """Returns every rule in its JSON form."""
+        self._reload_if_changed()
+        with self._lock:
+            return [rule.to_dict() for rule in self._rules.values()]
+
+    def add_rule(self, data):
+        """Validates, stores and returns a rule (replacing one with the same id)."""
+        rule = AlertRule.from_dict(data)
+        self._reload_if_changed()
+        with self._lock:
+            previous = self._rules.get(rule.rule_id)
+            if previous is not None:
+                self._unindex(previous)
+            self._index(rule)
+            self._save_rules()
+        return rule.to_dict()
+
+    def remove_rule(self, rule_id):
+        """Deletes a rule and its state; returns False if it did not exist."""
+        self._reload_if_changed()
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            self._unindex(rule)
+            self._save_rules()
+            self._save_state()
+        return True
+
+    def recent_alerts(self, limit=50):
+        """Returns the most recently fired alerts, newest first."""
+        with self._lock:
+            return list(self._recent)[-limit:][::-1]
+
+    def evaluate(self, entries, bar_dates, now=None):
+        """Evaluates the rules of the changed symbols only.
+
+        `entries` maps each changed symbol to its snapshot entry and `bar_dates` to the date
+        of its latest bar. Returns the alerts fired.
+        """
+        now = now or datetime.now(timezone.utc)
+        fired = []
+        self._reload_if_changed()
+        with self._lock:
+            if not self._rules:
+                return fired
+            for symbol, entry in entries.items():
+                if not entry or 'error' in entry:
+                    continue
+                bar_date = bar_dates.get(symbol)
+                for rule_id in self._wildcard | self._by_symbol.get(symbol, set()):
+                    rule = self._rules[rule_id]
+                    matched = rule.matches(entry)
+                    if matched is None:
+                        continue
+                    state = self._state.setdefault((rule_id, symbol), {'active': False, 'last_fired': None, 'last_bar': None})
+                    was_active = state['active']
+                    state['active'] = matched
+                    if not matched or was_active:
+                        continue
+                    if state['last_bar'] == bar_date:
+                        continue # Already fired for this bar (condition flickered intraday)
+                    last_fired = state['last_fired']
+                    if last_fired is not None and (now - datetime.fromisoformat(last_fired)).total_seconds() < rule.cooldown_seconds:
+                        continue
+                    state['last_fired'] = now.isoformat()
+                    state['last_bar'] = bar_date
+                    fired.append({
+                        'rule_id': rule_id,
+                        'rule_name': rule.name,
+                        'symbol': symbol,
+                        'metric': rule.metric,
+                        'value': entry.get(rule.metric),
+                        'threshold': rule.threshold,
+                        'bar_date': bar_date,
+                        'fired_at': now.isoformat(),
+                    })
+            self._recent.extend(fired)
+            self._save_state()
+        for alert in fired:
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    print(f"Alerts: {type(sink).__name__} failed: {e}")
+        return fired
@@ -1,11 +1,29 @@
 import sys
-import pandas as pd
-import numpy as np
-import yfinance as yf
 import os
 import json
+import bisect
+import threading
 from datetime import datetime, timedelta, timezone
 from flask import Flask, jsonify, send_from_directory, request
+from alerts import AlertEngine, sinks_from_spec
+from backtest import BACKTEST_PERIODS, DEFAULT_FAST_SPANS, DEFAULT_SLOW_SPANS, METRICS, run_backtest, span_pairs, summarize_pairs, symbol_results
+from corporate_actions import CorporateActionStore
+from correlation import CORRELATION_PERIODS, RollingCovariance, window_returns
+from downsample import DOWNSAMPLE_METHODS, downsample_indices
+from indicators import calculate_indicators
+from lazy_imports import lazy_import
+from portfolio import Holdings, PortfolioEngine, asof_closes, day_labels, panel_days, position_weights, summarize
+from price_panel import PANEL_DIR, PricePanel, atomic_write_json, load_panel, write_panel
+from risk import RISK_METHODS, build_model, return_matrix, risk_summary, simulate
+from scheduler import RefreshSchedule, RefreshScheduler, always_open_calendar, equity_calendar
+from sentiment import SENTIMENT_DATA_PATH, SENTIMENT_STATE_PATH, JsonlHeadlineSource, SentimentPipeline, load_monthly_scores, merge_monthly_scores
+from timeframes import DEFAULT_TIMEFRAME, TIMEFRAMES, TimeframeCache
+from watchlists import SymbolResultCache, WatchlistStore
+
+# Heavy libraries load on first use so a restart can serve the persisted snapshot immediately
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+yf = lazy_import('yfinance')
 
 # --- Configuration ---
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
@@ -33,42 +51,6 @@ MARKET_SYMBOLS = {
 # Use a longer period for EMA/RSI calculation stability if needed
 DATA_FETCH_PERIOD = "5y" # Fetch 5 years of data for calculations
 
-# --- Calculation Logic ---
-
-def calculate_indicators(df):
-    """Calculates EMA13, EMA21, EMA100, EMA200, and RSI14 for a given DataFrame."""
-    if df.empty or 'Close' not in df.columns:
-        return pd.DataFrame({'EMA13': [], 'EMA21': [], 'EMA100': [], 'EMA200': [], 'RSI14': []})
-
-    result = pd.DataFrame(index=df.index)
-    close_series = df['Close'].astype(float)
-
-    result['EMA13'] = close_series.ewm(span=13, adjust=False).mean()
-    result['EMA21'] = close_series.ewm(span=21, adjust=False).mean()
-    result['EMA100'] = close_series.ewm(span=100, adjust=False).mean()
-    result['EMA200'] = close_series.ewm(span=200, adjust=False).mean()
-
-    # Logarithmic Z-Score Calculation (100-day)
-    # Drop NaNs to ensure rolling window doesn't fail due to a single missing value
-    clean_close_series = close_series.dropna()
-    log_close = np.log(clean_close_series)
-    sma100_log = log_close.rolling(window=100).mean()
-    std100_log = log_close.rolling(window=100).std()
-    z_score_series = (log_close - sma100_log) / std100_log
-    # Reindex to match the original result DataFrame's index
-    result['Z_Score_100'] = z_score_series.reindex(result.index)
-
-    delta = close_series.diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = -delta.where(delta < 0, 0.0)
-    avg_gain = gain.ewm(com=13, adjust=False).mean()
-    avg_loss = loss.ewm(com=13, adjust=False).mean()
-    rs = avg_gain / avg_loss
-    result['RSI14'] = 100.0 - (100.0 / (1.0 + rs.replace(np.inf, np.nan)))
-    result['RSI14'] = result['RSI14'].fillna(50)
-
-    return result[['EMA13', 'EMA21', 'EMA100', 'EMA200', 'RSI14', 'Z_Score_100']]
-
 # --- Helper Function for Time Periods ---
 def get_start_date_from_period(period_str, reference_date=None):
     """Converts period string (e.g., '1y', '3m', '1d') to a start date relative to the reference date."""
@@ -104,112 +86,137 @@ def get_ytd_start_date(reference_date=None):
     # Return January 1st of the same year as reference_date
     return reference_date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
 
+class DateAxis:
+    """UTC-normalized date index that resolves period starts to integer offsets.
+
+    The index is normalized to UTC once and each period start is found by binary
+    search once, so series sharing the axis are sliced with `iloc` instead of
+    re-localizing and masking the full index. Axes of symbol slices that end on the
+    parent's last bar reuse the parent's offsets.
+    """
+
+    def __init__(self, index, parent=None, parent_start=0):
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        elif str(index.tz) != 'UTC':
+            index = index.tz_convert('UTC')
+        self.index = index
+        self._parent = parent
+        self._parent_start = parent_start
+        self._offsets = {}
+        self._labels = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def sub_axis(self, start, end):
+        """Returns the axis of the [start, end) slice of this axis."""
+        if start == 0 and end == len(self):
+            return self
+        # Offsets are relative to the last bar, so they can only be shared when it is the same
+        parent = self if end == len(self) else None
+        return DateAxis(self.index[start:end], parent=parent, parent_start=start)
+
+    def start_offset(self, period_str):
+        """Offset of the first bar on or after the period start ('ytd' = January 1st)."""
+        return self._offset('start', period_str.lower())
+
+    def baseline_offset(self, period_str):
+        """Offset of the last bar on or before the period start (0 if the series starts later)."""
+        return self._offset('baseline', period_str.lower())
+
+    def labels(self, start=0):
+        """Returns 'YYYY-MM-DD' labels from `start` on, formatting the index only once."""
+        if self._labels is None:
+            if self._parent is not None:
+                self._labels = self._parent.labels(self._parent_start)
+            else:
+                self._labels = self.index.strftime('%Y-%m-%d').tolist()
+        return self._labels[start:] if start else self._labels
+
+    def _offset(self, kind, period_str):
+        key = (kind, period_str)
+        offset = self._offsets.get(key)
+        if offset is not None:
+            return offset
+        if len(self) == 0:
+            offset = 0
+        elif self._parent is not None:
+            offset = max(self._parent._offset(kind, period_str) - self._parent_start, 0)
+        else:
+            reference_date = self.index[-1]
+            if period_str == 'ytd':
+                start_date = pd.Timestamp(get_ytd_start_date(reference_date))
+            else:
+                start_date = pd.Timestamp(get_start_date_from_period(period_str, reference_date=reference_date))
+            if kind == 'start':
+                offset = int(self.index.searchsorted(start_date, side='left'))
+            else:
+                offset = max(int(self.index.searchsorted(start_date, side='right')) - 1, 0)
+        self._offsets[key] = offset
+        return offset
+
+def get_series_axis(series, axis=None):
+    """Returns `axis` if it matches the series length, otherwise builds one from the series index."""
+    if axis is not None and len(axis) == len(series):
+        return axis
+    return DateAxis(series.index)
+
 # --- Calculation Logic (Modified Drawdown) ---
-def calculate_current_drawdown_from_peak(full_close_prices, period_start_date):
+def calculate_current_drawdown_from_peak(close_prices, period_str='1y', axis=None):
     """Calculates the drawdown from the peak within the period to the current price."""
-    if full_close_prices.empty: return None
-    if full_close_prices.index.tz is None:
-        close_prices_utc = full_close_prices.tz_localize('UTC')
-    else:
-        close_prices_utc = full_close_prices.tz_convert('UTC')
-    period_prices = close_prices_utc[close_prices_utc.index >= period_start_date]
+    if close_prices.empty: return None
+    axis = get_series_axis(close_prices, axis)
+    period_prices = close_prices.iloc[axis.start_offset(period_str):]
     if period_prices.empty: return None
     period_peak = period_prices.max()
-    latest_price = full_close_prices.iloc[-1]
+    latest_price = close_prices.iloc[-1]
     if pd.isna(period_peak) or period_peak == 0: return None
     return ((latest_price - period_peak) / period_peak) * 100
 
-def calculate_period_change(close_prices, period_str='1d'):
+def calculate_period_change(close_prices, period_str='1d', axis=None):
     """Calculates the percentage change over a specified period."""
     if close_prices.empty or len(close_prices) < 2: return 0.0
 
     latest_price = close_prices.iloc[-1]
-    latest_date = close_prices.index[-1]
-
-    # Ensure latest_date is timezone-aware for comparison
-    if latest_date.tzinfo is None:
-        latest_date = latest_date.tz_localize('UTC')
-    else:
-        latest_date = latest_date.astimezone(timezone.utc)
+    axis = get_series_axis(close_prices, axis)
 
     # Use YTD (Year-To-Date) for 1y period to start from January 1st
-    if period_str.lower() == '1y':
-        start_date = get_ytd_start_date(latest_date)
-    else:
-        start_date = get_start_date_from_period(period_str, reference_date=latest_date)
+    period_key = 'ytd' if period_str.lower() == '1y' else period_str
 
-    # Ensure the index is timezone-aware (UTC) for comparison
-    if close_prices.index.tz is None:
-        close_prices_index_utc = close_prices.index.tz_localize('UTC')
-    else:
-        close_prices_index_utc = close_prices.index.tz_convert('UTC')
-
-    # Find the closest available price at or before the start date using the UTC index
-    historical_prices = close_prices[close_prices_index_utc <= start_date]
-    if historical_prices.empty:
-        # If no data before start date, use the earliest available price
-        historical_price = close_prices.iloc[0]
-        if historical_price == 0 or pd.isna(historical_price): return 0.0 # Avoid division by zero or NaN
-    else:
-        historical_price = historical_prices.iloc[-1]
-        if historical_price == 0 or pd.isna(historical_price): return 0.0 # Avoid division by zero or NaN
+    # Closest available price at or before the start date (earliest price if none)
+    historical_price = close_prices.iloc[axis.baseline_offset(period_key)]
+    if historical_price == 0 or pd.isna(historical_price): return 0.0 # Avoid division by zero or NaN
 
     if pd.isna(latest_price): return 0.0 # Avoid calculation with NaN
 
     return ((latest_price - historical_price) / historical_price) * 100
 
-def calculate_cumulative_return(close_prices, period_str='1y'):
+def cumulative_window(axis, period_str):
+    """Returns (start offset, baseline offset) of a cumulative-return window.
+
+    '1y' is year-to-date, like `calculate_period_change`: the baseline is the last bar of the
+    previous year. Other periods start from their first bar.
+    """
+    period_str = period_str.lower()
+    if period_str in ('1y', 'ytd'):
+        return axis.start_offset('ytd'), axis.baseline_offset('ytd')
+    start = axis.start_offset(period_str)
+    return start, start
+
+def calculate_cumulative_return(close_prices, period_str='1y', axis=None):
     """Calculates the cumulative percentage return series over a specified period."""
     if close_prices.empty or len(close_prices) < 2:
         return pd.Series(dtype=float) # Return empty series if not enough data
 
-    latest_date = close_prices.index[-1]
-    # Ensure latest_date is timezone-aware for comparison
-    if latest_date.tzinfo is None: latest_date = latest_date.tz_localize('UTC')
-    else: latest_date = latest_date.astimezone(timezone.utc)
-
-    # Use YTD (Year-To-Date) for 1y period to start from January 1st
-    if period_str.lower() == '1y':
-        start_date = get_ytd_start_date(latest_date)
-    else:
-        start_date = get_start_date_from_period(period_str, reference_date=latest_date)
-
-    # Ensure the index is timezone-aware (UTC) for comparison
-    if close_prices.index.tz is None: close_prices_index_utc = close_prices.index.tz_localize('UTC')
-    else: close_prices_index_utc = close_prices.index.tz_convert('UTC')
-
-    # For YTD: Use the last trading day of the previous year as baseline
-    # This ensures consistency with calculate_period_change
-    if period_str.lower() == '1y':
-        # Get prices at or before Jan 1st
-        baseline_prices = close_prices[close_prices_index_utc <= start_date]
-        if baseline_prices.empty:
-            # If no data before start_date, use earliest available
-            baseline_price = close_prices.iloc[0]
-        else:
-            # Use the last price before/at Jan 1st (typically Dec 31st)
-            baseline_price = baseline_prices.iloc[-1]
-        
-        # Get all prices from Jan 1st onwards
-        period_prices = close_prices[close_prices_index_utc >= start_date]
-        
-        if period_prices.empty:
-            return pd.Series(dtype=float)
-        
-        # Calculate cumulative return relative to the baseline price
-        cumulative_return = (period_prices / baseline_price - 1) * 100
-        return cumulative_return.dropna()
-    else:
-        # For non-YTD periods, use the original logic
-        # Filter data for the period
-        period_prices = close_prices[close_prices_index_utc >= start_date]
-
-        if period_prices.empty:
-            return pd.Series(dtype=float) # Return empty series if no data in period
+    axis = get_series_axis(close_prices, axis)
+    start, baseline = cumulative_window(axis, period_str)
+    period_prices = close_prices.iloc[start:]
+    if period_prices.empty:
+        return pd.Series(dtype=float) # Return empty series if no data in period
 
-        # Calculate cumulative return relative to the first price in the period
-        cumulative_return = (period_prices / period_prices.iloc[0] - 1) * 100
-        return cumulative_return.dropna()
+    cumulative_return = (period_prices / close_prices.iloc[baseline] - 1) * 100
+    return cumulative_return.dropna()
 
 
 # --- Helper function to find last crossover date ---
@@ -225,48 +232,67 @@ def find_last_ema_crossover_date(ema_short_series, ema_long_series):
     last_crossover_date = crossover_points.index[-1]
     return last_crossover_date.strftime('%Y-%m-%d') if isinstance(last_crossover_date, pd.Timestamp) else str(last_crossover_date)
 
+def series_to_history(series, axis=None, start=0):
+    """Converts a series to JSON-ready (dates, values) lists rounded to 2 decimals, skipping NaNs.
+
+    When `series` is the tail of `axis` starting at `start`, the axis' cached date labels are reused.
+    """
+    values = series.to_numpy(dtype=float)
+    if axis is not None and len(axis) - start == len(values):
+        dates = axis.labels(start)
+    else:
+        dates = series.index.strftime('%Y-%m-%d').tolist()
+    valid = ~np.isnan(values)
+    if not valid.all():
+        dates = [d for d, ok in zip(dates, valid) if ok]
+        values = values[valid]
+    return dates, np.round(values, 2).tolist()
+
 def process_asset_data(symbol, stock_data_raw, drawdown_period_str='1y', change_period_str='1d',
                                spy_1y_change=None, # Keep for tooltip calculation
-                               is_market_symbol=False):
-    """Calculates indicators, relative performance (point), asset cumulative history, and sparkline data from provided data."""
+                               is_market_symbol=False, axis=None, indicators=None):
+    """Calculates indicators, relative performance (point), asset cumulative history, and sparkline data from provided data.
+
+    `axis` is the DateAxis of `stock_data_raw` (e.g. the symbol's slice of its panel calendar);
+    every period window is sliced by offset from it. Precomputed `indicators` (aligned with a
+    NaN-free `stock_data_raw`) are used as-is instead of being recalculated.
+    """
     try:
         if stock_data_raw is None or stock_data_raw.empty: return None
 
-        # Handle potential MultiIndex if passed directly (though batch fetch usually handles this before passing)
-        if isinstance(stock_data_raw.columns, pd.MultiIndex):
-             # Try to drop the top level if it's just the ticker name, or ensure we have OHLCV
-             # For batch with group_by='ticker', we expect a DF with columns Open, High, Low, Close, Volume
-             pass 
-
         cols_to_keep = ['Open', 'High', 'Low', 'Close', 'Volume']
         valid_cols = [col for col in cols_to_keep if col in stock_data_raw.columns]
         if not valid_cols or 'Close' not in valid_cols: return None
-        stock_data = stock_data_raw[valid_cols].copy()
-
-        indicators = calculate_indicators(stock_data)
-        combined_data = stock_data.join(indicators)
-        if combined_data.empty or len(combined_data) < 2 or 'Close' not in combined_data.columns: return None
-
-        # Drop rows where Close is NaN (e.g. holidays, future dates)
-        combined_data = combined_data.dropna(subset=['Close'])
-        if combined_data.empty: return None
-
-        latest_row = combined_data.iloc[-1]
-        close_prices = combined_data['Close'] # Already dropped NaNs
+        # Per-symbol float64 working copy; the shared panel itself stays float32 (no copy if already float64)
+        stock_data = stock_data_raw[valid_cols].astype('float64', copy=False)
+
+        # Drop rows where Close is NaN (e.g. holidays, future dates) so every series shares one axis
+        close_valid = stock_data['Close'].notna().to_numpy()
+        if not close_valid.all():
+            stock_data = stock_data[close_valid]
+            axis = None
+            indicators = None
+        if stock_data.empty or len(stock_data) < 2: return None
+        axis = get_series_axis(stock_data, axis)
+
+        if indicators is None:
+            indicators = calculate_indicators(stock_data)
+        latest_row = indicators.iloc[-1]
+        close_prices = stock_data['Close']
 
         result_dict = {
             'name': symbol,
             'display_name': MARKET_SYMBOLS.get(symbol, symbol), # Use custom name or symbol
             'type': MARKET_SYMBOLS.get(symbol) or ASSET_LIST.get(symbol, 'Unknown'),
-            'latest_price': float(latest_row['Close']),
-            'daily_change_pct': calculate_period_change(close_prices, change_period_str), # Use period change
+            'latest_price': float(close_prices.iloc[-1]),
+            'daily_change_pct': calculate_period_change(close_prices, change_period_str, axis), # Use period change
             'ema13': float(latest_row['EMA13']) if pd.notna(latest_row['EMA13']) else None,
             'ema21': float(latest_row['EMA21']) if pd.notna(latest_row['EMA21']) else None,
             'rsi14': float(latest_row['RSI14']) if pd.notna(latest_row['RSI14']) else None,
             'ema100': float(latest_row['EMA100']) if pd.notna(latest_row['EMA100']) else None,
             'ema200': float(latest_row['EMA200']) if pd.notna(latest_row['EMA200']) else None,
             'z_score_100': float(latest_row['Z_Score_100']) if pd.notna(latest_row['Z_Score_100']) else None,
-            'current_drawdown_pct': calculate_current_drawdown_from_peak(close_prices, get_start_date_from_period(drawdown_period_str)),
+            'current_drawdown_pct': calculate_current_drawdown_from_peak(close_prices, drawdown_period_str, axis),
             'ema_signal': None,
             'ema_long_signal': None,
             'ema_short_last_buy_date': None,
@@ -293,16 +319,14 @@ def process_asset_data(symbol, stock_data_raw, drawdown_period_str='1y', change_
         # Calculate signals and last buy dates (only if EMAs exist)
         if result_dict['ema13'] is not None and result_dict['ema21'] is not None:
             result_dict['ema_signal'] = 'Buy' if result_dict['ema13'] > result_dict['ema21'] else ('Sell' if result_dict['ema13'] < result_dict['ema21'] else None)
-            if 'EMA13' in combined_data.columns and 'EMA21' in combined_data.columns:
-                 result_dict['ema_short_last_buy_date'] = find_last_ema_crossover_date(combined_data['EMA13'], combined_data['EMA21'])
+            result_dict['ema_short_last_buy_date'] = find_last_ema_crossover_date(indicators['EMA13'], indicators['EMA21'])
 
         if result_dict['ema100'] is not None and result_dict['ema200'] is not None:
             result_dict['ema_long_signal'] = 'Buy' if result_dict['ema100'] > result_dict['ema200'] else ('Sell' if result_dict['ema100'] < result_dict['ema200'] else None)
-            if 'EMA100' in combined_data.columns and 'EMA200' in combined_data.columns:
-                 result_dict['ema_long_last_buy_date'] = find_last_ema_crossover_date(combined_data['EMA100'], combined_data['EMA200'])
+            result_dict['ema_long_last_buy_date'] = find_last_ema_crossover_date(indicators['EMA100'], indicators['EMA200'])
 
         # Calculate 1-year change for the asset
-        asset_1y_change = calculate_period_change(close_prices, '1y')
+        asset_1y_change = calculate_period_change(close_prices, '1y', axis)
 
         # Calculate relative performance if SPY change is provided and asset is not SPY
         if spy_1y_change is not None and symbol != 'SPY':
@@ -314,163 +338,64 @@ def process_asset_data(symbol, stock_data_raw, drawdown_period_str='1y', change_
              result_dict['relative_perf_1y'] = 0.0 # SPY relative to itself is 0
 
         # Prepare sparkline data based on the change_period_str
-        if len(close_prices) >= 2:
-            sparkline_start_date = get_start_date_from_period(change_period_str, reference_date=close_prices.index[-1])
-            # Ensure index is timezone-aware for comparison
-            if close_prices.index.tz is None: close_prices_index_utc = close_prices.index.tz_localize('UTC')
-            else: close_prices_index_utc = close_prices.index.tz_convert('UTC')
-            # Filter prices for the sparkline period
-            sparkline_prices = close_prices[close_prices_index_utc >= sparkline_start_date]
-
-            if not sparkline_prices.empty:
-                 # Ensure data is suitable for JSON (handle potential NaNs)
-                 result_dict['sparkline_data'] = [p for p in sparkline_prices.tolist() if pd.notna(p)]
-            else:
-                 # Fallback to last 2 points if period has no data but overall data exists
-                 sparkline_points = close_prices.tail(2).tolist()
-                 result_dict['sparkline_data'] = [p for p in sparkline_points if pd.notna(p)]
-        else:
-            result_dict['sparkline_data'] = []
+        sparkline_prices = close_prices.iloc[axis.start_offset(change_period_str):]
+        if sparkline_prices.empty:
+            # Fallback to last 2 points if period has no data but overall data exists
+            sparkline_prices = close_prices.tail(2)
+        result_dict['sparkline_data'] = sparkline_prices.tolist()
 
         # --- Calculate Asset's Historical Cumulative Performance (1 Year) ---
-        asset_1y_cum_ret = calculate_cumulative_return(close_prices, '1y')
+        asset_1y_cum_ret = calculate_cumulative_return(close_prices, '1y', axis)
         if not asset_1y_cum_ret.empty:
-            result_dict['asset_1y_history_dates'] = asset_1y_cum_ret.index.strftime('%Y-%m-%d').tolist()
-            result_dict['asset_1y_history_values'] = [round(v, 2) for v in asset_1y_cum_ret.values.tolist()]
-        # --- End Asset Historical Performance ---
-
-        # --- Calculate Asset's Historical RSI (1 Year) ---
-        if 'RSI14' in indicators.columns:
-            rsi_series = indicators['RSI14'].dropna()
-            if not rsi_series.empty and len(rsi_series) >= 2:
-                rsi_latest_date = rsi_series.index[-1]
-                # Ensure latest_date is timezone-aware for comparison
-                if rsi_latest_date.tzinfo is None: rsi_latest_date = rsi_latest_date.tz_localize('UTC')
-                else: rsi_latest_date = rsi_latest_date.astimezone(timezone.utc)
-
-                rsi_start_date = get_start_date_from_period('1y', reference_date=rsi_latest_date)
-
-                # Ensure the index is timezone-aware (UTC) for comparison
-                if rsi_series.index.tz is None: rsi_index_utc = rsi_series.index.tz_localize('UTC')
-                else: rsi_index_utc = rsi_series.index.tz_convert('UTC')
-
-                # Filter data for the period
-                rsi_1y_series = rsi_series[rsi_index_utc >= rsi_start_date]
-
-                if not rsi_1y_series.empty:
-                    result_dict['rsi_1y_history_dates'] = rsi_1y_series.index.strftime('%Y-%m-%d').tolist()
-                    result_dict['rsi_1y_history_values'] = [round(v, 2) for v in rsi_1y_series.values.tolist()]
-        # --- End Asset Historical RSI ---
-
-        # --- Calculate Asset's Historical Z-Score (1 Year) ---
-        if 'Z_Score_100' in indicators.columns:
-            zscore_series = indicators['Z_Score_100'].dropna()
-            if not zscore_series.empty and len(zscore_series) >= 2:
-                zscore_latest_date = zscore_series.index[-1]
-                # Ensure latest_date is timezone-aware for comparison
-                if zscore_latest_date.tzinfo is None: zscore_latest_date = zscore_latest_date.tz_localize('UTC')
-                else: zscore_latest_date = zscore_latest_date.astimezone(timezone.utc)
-
-                zscore_start_date = get_start_date_from_period('1y', reference_date=zscore_latest_date)
-
-                # Ensure the index is timezone-aware (UTC) for comparison
-                if zscore_series.index.tz is None: zscore_index_utc = zscore_series.index.tz_localize('UTC')
-                else: zscore_index_utc = zscore_series.index.tz_convert('UTC')
-
-                # Filter data for the period
-                zscore_1y_series = zscore_series[zscore_index_utc >= zscore_start_date]
-
-                if not zscore_1y_series.empty:
-                    result_dict['zscore_1y_history_dates'] = zscore_1y_series.index.strftime('%Y-%m-%d').tolist()
-                    result_dict['zscore_1y_history_values'] = [round(v, 2) for v in zscore_1y_series.values.tolist()]
-        # --- End Asset Historical Z-Score ---
-
-        # --- Calculate Asset's Historical EMAs (1 Year) ---
-        if 'EMA13' in indicators.columns and 'EMA21' in indicators.columns:
-            ema13_series = indicators['EMA13'].dropna()
-            ema21_series = indicators['EMA21'].dropna()
-
-            # Use EMA13 series for date filtering (assuming they share the same index)
-            if not ema13_series.empty and len(ema13_series) >= 2:
-                ema_latest_date = ema13_series.index[-1]
-                # Ensure latest_date is timezone-aware
-                if ema_latest_date.tzinfo is None: ema_latest_date = ema_latest_date.tz_localize('UTC')
-                else: ema_latest_date = ema_latest_date.astimezone(timezone.utc)
-
-                ema_start_date = get_start_date_from_period('1y', reference_date=ema_latest_date)
-
-                # Ensure index is timezone-aware
-                if ema13_series.index.tz is None: ema_index_utc = ema13_series.index.tz_localize('UTC')
-                else: ema_index_utc = ema13_series.index.tz_convert('UTC')
-
-                # Filter EMA series for the 1-year period
-                ema13_1y_series = ema13_series[ema_index_utc >= ema_start_date]
-                # Align EMA21 series to the filtered EMA13 index to ensure matching dates/lengths
-                ema21_1y_series = ema21_series.reindex(ema13_1y_series.index)
-
-                if not ema13_1y_series.empty and not ema21_1y_series.empty:
-                    result_dict['ema_1y_history_dates'] = ema13_1y_series.index.strftime('%Y-%m-%d').tolist()
-                    result_dict['ema13_1y_history_values'] = [round(v, 2) for v in ema13_1y_series.values.tolist() if pd.notna(v)]
-                    result_dict['ema21_1y_history_values'] = [round(v, 2) for v in ema21_1y_series.values.tolist() if pd.notna(v)]
-                    # Basic check to ensure value lists match date list length after potential NaN removal
-                    if len(result_dict['ema13_1y_history_values']) != len(result_dict['ema_1y_history_dates']) or \
-                       len(result_dict['ema21_1y_history_values']) != len(result_dict['ema_1y_history_dates']):
-                        print(f"Warning: EMA history length mismatch after NaN removal for {symbol}. Clearing EMA history.")
-                        result_dict['ema_1y_history_dates'] = []
-                        result_dict['ema13_1y_history_values'] = []
-                        result_dict['ema21_1y_history_values'] = []
-
-        # --- Calculate Asset's Historical Long EMAs (1 Year) ---
-        if 'EMA100' in indicators.columns and 'EMA200' in indicators.columns:
-            ema100_series = indicators['EMA100'].dropna()
-            ema200_series = indicators['EMA200'].dropna()
-
-            if not ema100_series.empty and len(ema100_series) >= 2:
-                ema_latest_date = ema100_series.index[-1]
-                if ema_latest_date.tzinfo is None: ema_latest_date = ema_latest_date.tz_localize('UTC')
-                else: ema_latest_date = ema_latest_date.astimezone(timezone.utc)
-
-                ema_start_date = get_start_date_from_period('1y', reference_date=ema_latest_date)
-
-                if ema100_series.index.tz is None: ema_index_utc = ema100_series.index.tz_localize('UTC')
-                else: ema_index_utc = ema100_series.index.tz_convert('UTC')
-
-                ema100_1y_series = ema100_series[ema_index_utc >= ema_start_date]
-                ema200_1y_series = ema200_series.reindex(ema100_1y_series.index)
-
-                if not ema100_1y_series.empty and not ema200_1y_series.empty:
-                    result_dict['ema_long_1y_history_dates'] = ema100_1y_series.index.strftime('%Y-%m-%d').tolist()
-                    result_dict['ema100_1y_history_values'] = [round(v, 2) for v in ema100_1y_series.values.tolist() if pd.notna(v)]
-                    result_dict['ema200_1y_history_values'] = [round(v, 2) for v in ema200_1y_series.values.tolist() if pd.notna(v)]
-        # --- End Asset Historical EMAs ---
+            result_dict['asset_1y_history_dates'], result_dict['asset_1y_history_values'] = \
+                series_to_history(asset_1y_cum_ret, axis, axis.start_offset('ytd'))
+
+        # --- Indicator histories (1 Year, 365 days back from the latest bar) ---
+        history_start = axis.start_offset('1y')
+
+        # RSI
+        rsi_1y_series = indicators['RSI14'].iloc[history_start:]
+        if not rsi_1y_series.empty:
+            result_dict['rsi_1y_history_dates'], result_dict['rsi_1y_history_values'] = \
+                series_to_history(rsi_1y_series, axis, history_start)
+
+        # Z-Score (NaN for the first 99 bars, skipped by series_to_history)
+        zscore_1y_series = indicators['Z_Score_100'].iloc[history_start:]
+        if zscore_1y_series.notna().sum() >= 2:
+            result_dict['zscore_1y_history_dates'], result_dict['zscore_1y_history_values'] = \
+                series_to_history(zscore_1y_series, axis, history_start)
+
+        # Short EMAs (shared dates)
+        ema_dates, ema13_values = series_to_history(indicators['EMA13'].iloc[history_start:], axis, history_start)
+        ema21_dates, ema21_values = series_to_history(indicators['EMA21'].iloc[history_start:], axis, history_start)
+        if len(ema_dates) >= 2 and ema_dates == ema21_dates:
+            result_dict['ema_1y_history_dates'] = ema_dates
+            result_dict['ema13_1y_history_values'] = ema13_values
+            result_dict['ema21_1y_history_values'] = ema21_values
+        elif ema_dates != ema21_dates:
+            print(f"Warning: EMA history length mismatch after NaN removal for {symbol}. Clearing EMA history.")
+
+        # Long EMAs (shared dates)
+        ema_long_dates, ema100_values = series_to_history(indicators['EMA100'].iloc[history_start:], axis, history_start)
+        _, ema200_values = series_to_history(indicators['EMA200'].iloc[history_start:], axis, history_start)
+        if len(ema_long_dates) >= 2:
+            result_dict['ema_long_1y_history_dates'] = ema_long_dates
+            result_dict['ema100_1y_history_values'] = ema100_values
+            result_dict['ema200_1y_history_values'] = ema200_values
+        # --- End Indicator Histories ---
 
         # --- Calculate Asset's Historical Drawdown (Based on selected drawdown_period_str) ---
-        if not close_prices.empty:
-            drawdown_start_date = get_start_date_from_period(drawdown_period_str, reference_date=close_prices.index[-1])
-            # Ensure index is timezone-aware for comparison
-            if close_prices.index.tz is None: close_prices_index_utc = close_prices.index.tz_localize('UTC')
-            else: close_prices_index_utc = close_prices.index.tz_convert('UTC')
-
-            # Filter prices for the drawdown period
-            drawdown_period_prices = close_prices[close_prices_index_utc >= drawdown_start_date]
-
-            if not drawdown_period_prices.empty and len(drawdown_period_prices) > 1:
-                running_peak = drawdown_period_prices.cummax()
-                # Avoid division by zero if peak is 0
-                running_peak = running_peak.replace(0, np.nan)
-                drawdown_pct_series = ((drawdown_period_prices - running_peak) / running_peak) * 100
-                # Fill initial NaNs (before first peak) with 0 drawdown
-                drawdown_pct_series = drawdown_pct_series.fillna(0)
-
-                # Ensure results are JSON serializable and rounded
-                result_dict['drawdown_history_dates'] = drawdown_pct_series.index.strftime('%Y-%m-%d').tolist()
-                result_dict['drawdown_history_values'] = [round(v, 2) for v in drawdown_pct_series.values.tolist() if pd.notna(v)]
-
-                # Check for length mismatch after NaN removal (should be rare here)
-                if len(result_dict['drawdown_history_values']) != len(result_dict['drawdown_history_dates']):
-                    print(f"Warning: Drawdown history length mismatch after NaN removal for {symbol}. Clearing drawdown history.")
-                    result_dict['drawdown_history_dates'] = []
-                    result_dict['drawdown_history_values'] = []
+        drawdown_start = axis.start_offset(drawdown_period_str)
+        drawdown_period_prices = close_prices.iloc[drawdown_start:]
+        if len(drawdown_period_prices) > 1:
+            running_peak = drawdown_period_prices.cummax()
+            # Avoid division by zero if peak is 0
+            running_peak = running_peak.replace(0, np.nan)
+            drawdown_pct_series = ((drawdown_period_prices - running_peak) / running_peak) * 100
+            # Fill initial NaNs (before first peak) with 0 drawdown
+            drawdown_pct_series = drawdown_pct_series.fillna(0)
+            result_dict['drawdown_history_dates'], result_dict['drawdown_history_values'] = \
+                series_to_history(drawdown_pct_series, axis, drawdown_start)
         # --- End Asset Historical Drawdown ---
 
 
@@ -480,180 +405,1322 @@ def process_asset_data(symbol, stock_data_raw, drawdown_period_str='1y', change_
         print(f"Error processing {symbol}: {e}")
         return {'name': symbol, 'display_name': MARKET_SYMBOLS.get(symbol, symbol), 'error': str(e)} # Return error structure
 
-# --- API Endpoints ---
-@app.route('/api/dashboard-data')
-def get_dashboard_data():
-    """API endpoint to get processed data for market and asset symbols."""
-    drawdown_period = request.args.get('drawdown_period', default='1y', type=str)
-    change_period = request.args.get('change_period', default='1d', type=str) # Get change_period
-    print(f"API: Using drawdown period: {drawdown_period}, change period: {change_period}")
-
+# --- Data Fetching ---
+def get_asset_class(symbol):
+    """Returns the refresh asset class ('equity' or 'crypto') for a symbol."""
+    if symbol in ASSET_LIST:
+        return 'crypto' if ASSET_LIST[symbol] == 'Crypto' else 'equity'
+    return 'crypto' if symbol.endswith('-USD') else 'equity' # Symbols only on watchlists
+
+def get_all_symbols():
+    """Returns every symbol the backend tracks (market symbols + assets + symbols only on watchlists)."""
+    return list(dict.fromkeys(list(MARKET_SYMBOLS.keys()) + SYMBOLS + watchlists.watched_symbols()))
+
+def download_history(symbols, period=DATA_FETCH_PERIOD):
+    """Batch-downloads daily bars (with split/dividend columns) for `symbols` as a ticker-grouped DataFrame with a UTC index."""
+    data = yf.download(symbols, period=period, interval="1d", group_by='ticker', progress=False, auto_adjust=False, actions=True)
+    return normalize_download(data, symbols)
+
+def fetch_quotes(symbols):
+    """Fetches the latest traded price of every symbol in one batched request: {symbol: (price, UTC timestamp)}."""
+    data = normalize_download(yf.download(symbols, period='1d', interval='1m', group_by='ticker', progress=False,
+                                          auto_adjust=False, actions=False), symbols)
+    quotes = {}
+    if data.empty:
+        return quotes
+    available = set(data.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol in available and 'Close' in data[symbol].columns:
+            close = data[symbol]['Close'].dropna()
+            if not close.empty:
+                quotes[symbol] = (float(close.iloc[-1]), close.index[-1])
+    return quotes
+
+def normalize_download(data, symbols):
+    """Gives a yf.download result ticker-grouped columns and a UTC index."""
+    if data.empty:
+        return data
+    # If single symbol, yfinance doesn't return MultiIndex. Normalize it.
+    if len(symbols) == 1 and not isinstance(data.columns, pd.MultiIndex):
+        data.columns = pd.MultiIndex.from_product([symbols, data.columns])
+    # Ensure index is timezone-aware (UTC)
+    if data.index.tz is None:
+        data.index = data.index.tz_localize('UTC')
+    else:
+        data.index = data.index.tz_convert('UTC')
+    return data
+
+# --- Snapshot Building ---
+def clean_nan(obj):
+    """Sanitizes a response object, replacing NaN and infinities with None (null in JSON)."""
+    if isinstance(obj, float):
+        return None if not np.isfinite(obj) else obj
+    elif isinstance(obj, dict):
+        return {k: clean_nan(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_nan(v) for v in obj]
+    return obj
+
+def find_symbol_panel(panels, symbol):
+    """Returns the panel holding `symbol`, or None."""
+    for panel in panels.values():
+        if symbol in panel:
+            return panel
+    return None
+
+_panel_axes = {} # panel name -> (panel version, DateAxis)
+
+def get_panel_axis(panel):
+    """Returns the DateAxis of a panel's calendar, built once per panel version."""
+    cached = _panel_axes.get(panel.name)
+    if cached is None or cached[0] != panel.version:
+        cached = (panel.version, DateAxis(panel.dates))
+        _panel_axes[panel.name] = cached
+    return cached[1]
+
+def get_symbol_axis(panel, symbol):
+    """Returns the DateAxis of a symbol's validity range within its panel."""
+    return get_panel_axis(panel).sub_axis(*panel.ranges[symbol])
+
+# Resampled bars and indicators per (symbol, timeframe), updated incrementally across refreshes
+# and persisted with the snapshot (see persist_snapshots), so a restart extends the saved state
+TIMEFRAME_STATE_PATH = os.path.join(PANEL_DIR, 'timeframe_state.npz')
+TIMEFRAME_CACHE = TimeframeCache(TIMEFRAME_STATE_PATH)
+
+def get_timeframe_data(panel, symbol, timeframe=DEFAULT_TIMEFRAME):
+    """Returns (bars, indicators, axis) of a symbol at a timeframe, resampled from its daily panel data."""
+    daily = panel.frame(symbol)
+    axis = get_symbol_axis(panel, symbol)
+    close_valid = daily['Close'].notna().to_numpy()
+    if not close_valid.all():
+        daily = daily[close_valid]
+        axis = None
+    bars, indicators = TIMEFRAME_CACHE.get(symbol, daily, timeframe)
+    if timeframe != 'daily' or axis is None:
+        axis = DateAxis(bars.index)
+    return bars, indicators, axis
+
+def build_dashboard_snapshot(panels, drawdown_period='1y', change_period='1d', timeframe=DEFAULT_TIMEFRAME):
+    """Processes the price panels (asset class -> PricePanel) into the dashboard response payload.
+
+    Indicators, signals and histories use `timeframe` bars; the SPY baseline stays on daily closes.
+    """
     market_data = {}
     asset_data = {}
     spy_1y_change = None
-    spy_1y_cum_ret_series = None # Still calculate this for passing to assets if needed, but also store dates/values
     spy_1y_history_dates = []
     spy_1y_history_values = []
+    available_symbols = {symbol for panel in panels.values() for symbol in panel.symbols}
 
-    # --- Pre-fetch SPY data for relative performance calculation ---
-    print("API: Pre-fetching SPY for 1Y change and historical relative performance...")
+    # --- SPY for relative performance calculation (taken from the batch, no extra download) ---
     try:
-        # Fetch slightly more than 1 year to ensure enough data for calculation start point
-        spy_data_raw = yf.download('SPY', period="13mo", interval="1d", progress=False, auto_adjust=False, actions=False)
-
-        # Handle potential MultiIndex columns returned by yfinance
-        if isinstance(spy_data_raw.columns, pd.MultiIndex):
-            spy_data_raw.columns = spy_data_raw.columns.get_level_values(0)
-            spy_data_raw = spy_data_raw.loc[:,~spy_data_raw.columns.duplicated()]
-
-        if not spy_data_raw.empty and 'Close' in spy_data_raw.columns:
-            spy_close_prices = spy_data_raw['Close'].dropna()
+        if 'SPY' in available_symbols:
+            spy_panel = find_symbol_panel(panels, 'SPY')
+            spy_close_prices = spy_panel.series('SPY').astype(float)
+            spy_axis = get_symbol_axis(spy_panel, 'SPY')
+            if spy_close_prices.isna().any():
+                spy_close_prices = spy_close_prices.dropna()
+                spy_axis = None
             if len(spy_close_prices) >= 2:
-                # Calculate final 1Y change (for tooltip/backup)
-                spy_1y_change = calculate_period_change(spy_close_prices, '1y')
-                if spy_1y_change is not None and pd.notna(spy_1y_change):
-                     print(f"API: SPY 1Y Change calculated: {spy_1y_change:.2f}%")
-                else:
-                     print("API: SPY 1Y Change calculation resulted in None or NaN.")
-                     spy_1y_change = None # Ensure it's None if calculation failed
-
-                # Calculate 1Y cumulative return series (for graph)
-                spy_1y_cum_ret_series = calculate_cumulative_return(spy_close_prices, '1y')
-                if spy_1y_cum_ret_series.empty:
-                    print("API: SPY 1Y Cumulative Return series calculation failed or resulted in empty series.")
-                    spy_1y_cum_ret_series = None # Ensure it's None
-                else:
-                    print(f"API: SPY 1Y Cumulative Return series calculated with {len(spy_1y_cum_ret_series)} points.")
-                    # Store dates and values for the main response
-                    spy_1y_history_dates = spy_1y_cum_ret_series.index.strftime('%Y-%m-%d').tolist()
-                    spy_1y_history_values = [round(v, 2) for v in spy_1y_cum_ret_series.values.tolist()]
-
+                spy_1y_change = calculate_period_change(spy_close_prices, '1y', spy_axis)
+                if spy_1y_change is None or pd.isna(spy_1y_change):
+                    print("Snapshot: SPY 1Y Change calculation resulted in None or NaN.")
+                    spy_1y_change = None
+
+                spy_1y_cum_ret_series = calculate_cumulative_return(spy_close_prices, '1y', spy_axis)
+                if not spy_1y_cum_ret_series.empty:
+                    spy_1y_history_dates, spy_1y_history_values = series_to_history(spy_1y_cum_ret_series)
             else:
-                print("API: Not enough SPY data points for 1Y calculations.")
+                print("Snapshot: Not enough SPY data points for 1Y calculations.")
         else:
-            print("API: Failed to fetch SPY data or 'Close' column missing.")
+            print("Snapshot: SPY missing from batch data.")
     except Exception as e:
-        print(f"API: Error fetching/processing SPY data for relative performance: {e}")
-    # --- End SPY Pre-fetch ---
-
-
-    # --- Batch Fetching ---
-    all_symbols = list(set(list(MARKET_SYMBOLS.keys()) + SYMBOLS))
-    # Split symbols by type to avoid timezone conflicts (Stocks/ETFs are usually market-local, Crypto is UTC)
-    crypto_symbols = [s for s in all_symbols if ASSET_LIST.get(s) == 'Crypto']
-    stock_symbols = [s for s in all_symbols if ASSET_LIST.get(s) != 'Crypto']
-    
-    print(f"API: Batch fetching data for {len(stock_symbols)} stocks and {len(crypto_symbols)} crypto assets...")
-    
-    batch_data = pd.DataFrame()
-    
-    try:
-        # Fetch Stocks
-        if stock_symbols:
-            print(f"API: Fetching {len(stock_symbols)} stocks...")
-            stock_data = yf.download(stock_symbols, period=DATA_FETCH_PERIOD, interval="1d", group_by='ticker', progress=False, auto_adjust=False, actions=False)
-            if not stock_data.empty:
-                # If single symbol, yfinance doesn't return MultiIndex. Normalize it.
-                if len(stock_symbols) == 1:
-                    # Create a MultiIndex with the symbol as the top level
-                    stock_data.columns = pd.MultiIndex.from_product([stock_symbols, stock_data.columns])
-                
-                # Ensure index is timezone-aware (UTC)
-                if stock_data.index.tz is None:
-                    stock_data.index = stock_data.index.tz_localize('UTC')
-                else:
-                    stock_data.index = stock_data.index.tz_convert('UTC')
-                
-                batch_data = stock_data
-
-        # Fetch Crypto
-        if crypto_symbols:
-            print(f"API: Fetching {len(crypto_symbols)} crypto assets...")
-            crypto_data = yf.download(crypto_symbols, period=DATA_FETCH_PERIOD, interval="1d", group_by='ticker', progress=False, auto_adjust=False, actions=False)
-            if not crypto_data.empty:
-                if len(crypto_symbols) == 1:
-                    crypto_data.columns = pd.MultiIndex.from_product([crypto_symbols, crypto_data.columns])
-                
-                # Ensure index is timezone-aware (UTC)
-                if crypto_data.index.tz is None:
-                    crypto_data.index = crypto_data.index.tz_localize('UTC')
-                else:
-                    crypto_data.index = crypto_data.index.tz_convert('UTC')
-
-                if batch_data.empty:
-                    batch_data = crypto_data
-                else:
-                    # Combine. Both are now UTC.
-                    batch_data = batch_data.join(crypto_data, how='outer')
-
-    except Exception as e:
-        print(f"API: Critical error during batch fetch: {e}")
-        return jsonify({'error': 'Failed to fetch data'}), 500
+        print(f"Snapshot: Error processing SPY data for relative performance: {e}")
 
     # Process Market Data
-    print("API: Processing Market Data...")
     for symbol in MARKET_SYMBOLS.keys():
+        if symbol not in available_symbols:
+            print(f"Snapshot: No data found for {symbol}.")
+            continue
         try:
-            # Extract dataframe for the symbol
-            if len(all_symbols) == 1:
-                symbol_df = batch_data
-            else:
-                # Check if symbol is in columns (level 0)
-                if symbol in batch_data.columns.get_level_values(0):
-                    symbol_df = batch_data[symbol]
-                else:
-                    print(f"API: No data found for {symbol} in batch response.")
-                    continue
-            
-            market_data[symbol] = process_asset_data(symbol, symbol_df, drawdown_period, change_period,
-                                                           spy_1y_change=spy_1y_change,
-                                                           is_market_symbol=True)
+            bars, indicators, axis = get_timeframe_data(find_symbol_panel(panels, symbol), symbol, timeframe)
+            market_data[symbol] = process_asset_data(symbol, bars, drawdown_period, change_period,
+                                                     spy_1y_change=spy_1y_change,
+                                                     is_market_symbol=True,
+                                                     axis=axis, indicators=indicators)
         except Exception as e:
-            print(f"API: Error processing market symbol {symbol}: {e}")
+            print(f"Snapshot: Error processing market symbol {symbol}: {e}")
 
     # Process Asset Data
-    print("API: Processing Asset Data...")
     for symbol in SYMBOLS:
+        if symbol not in available_symbols:
+            print(f"Snapshot: No data found for {symbol}.")
+            continue
         try:
-             # Extract dataframe for the symbol
-            if len(all_symbols) == 1:
-                symbol_df = batch_data
-            else:
-                if symbol in batch_data.columns.get_level_values(0):
-                    symbol_df = batch_data[symbol]
-                else:
-                    print(f"API: No data found for {symbol} in batch response.")
-                    continue
-
-            asset_data[symbol] = process_asset_data(symbol, symbol_df, drawdown_period, change_period,
-                                                          spy_1y_change=spy_1y_change)
+            bars, indicators, axis = get_timeframe_data(find_symbol_panel(panels, symbol), symbol, timeframe)
+            asset_data[symbol] = process_asset_data(symbol, bars, drawdown_period, change_period,
+                                                    spy_1y_change=spy_1y_change,
+                                                    axis=axis, indicators=indicators)
         except Exception as e:
-             print(f"API: Error processing asset {symbol}: {e}")
-
-    print(f"API: Returning data for {len(market_data)} market symbols and {len(asset_data)} assets.")
-    
-    spy_1y_history = { # Add SPY history to the main response
-        'dates': spy_1y_history_dates,
-        'values': spy_1y_history_values
-    }
+            print(f"Snapshot: Error processing asset {symbol}: {e}")
 
-    response_data = {
+    return clean_nan({
         'market_data': market_data,
         'asset_data': asset_data,
-        'spy_1y_history': spy_1y_history
+        'spy_1y_history': {'dates': spy_1y_history_dates, 'values': spy_1y_history_values},
+        'timeframe': timeframe,
+        'generated_at': datetime.now(timezone.utc).isoformat()
+    })
+
+# --- Background Refresh & Snapshot Cache ---
+# Requests never download: they read the latest snapshot computed by the scheduler.
+# Snapshots for non-default period selections are computed once per data version.
+# Prices live in memory-mapped float32 panels (see price_panel.py); with RUN_SCHEDULER=0
+# a worker process only maps the panels published by the refreshing process.
+# Raw closes, split/dividend events and adjustment factors persist per asset class (see
+# corporate_actions.py): refreshes only fetch the last INCREMENTAL_FETCH_PERIOD, and a new
+# event re-adjusts just its own symbol's earlier bars before the panel is republished.
+# Between reconciles a quote job fetches only last prices and patches them into the cached
+# snapshots as a provisional last bar (see the Live Quote Overlay section).
+# The latest snapshots are persisted after each refresh; after a restart they are served
+# (marked stale) until every asset class has been refreshed again.
+# Weekly/monthly snapshots resample the daily panels; their indicators are cached per symbol
+# and timeframe and only the changed (current-period) bars are recomputed on a refresh.
+DEFAULT_DRAWDOWN_PERIOD = '1y'
+DEFAULT_CHANGE_PERIOD = '1d'
+EQUITY_REFRESH_SECONDS = int(os.environ.get('EQUITY_REFRESH_SECONDS', 15 * 60)) # Full daily-bar reconcile
+EQUITY_SETTLE_SECONDS = int(os.environ.get('EQUITY_SETTLE_SECONDS', 20 * 60)) # Settle refresh after the close
+CRYPTO_REFRESH_SECONDS = int(os.environ.get('CRYPTO_REFRESH_SECONDS', 15 * 60))
+QUOTE_REFRESH_SECONDS = int(os.environ.get('QUOTE_REFRESH_SECONDS', 60)) # Live last-price overlay
+SENTIMENT_REFRESH_SECONDS = int(os.environ.get('SENTIMENT_REFRESH_SECONDS', 5 * 60)) # Headline ingestion
+FIRST_SNAPSHOT_TIMEOUT = 120 # Seconds a request waits for the very first refresh
+RUN_SCHEDULER = os.environ.get('RUN_SCHEDULER', '1') != '0'
+ASSET_CLASSES = ('equity', 'crypto')
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', os.path.join(PANEL_DIR, 'snapshot.json'))
+INCREMENTAL_FETCH_PERIOD = os.environ.get('INCREMENTAL_FETCH_PERIOD', '1mo')
+
+_data_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+_startup_lock = threading.Lock()
+_first_snapshot = threading.Event() # Set once every asset class has been refreshed by this process
+MARKET_DATA_CACHE = {
+    'panels': {},      # asset class -> PricePanel
+    'version': 0,      # Bumped on every successful refresh
+    'snapshots': {},   # (drawdown_period, change_period, timeframe) -> payload for the current version
+    'base_snapshots': {}, # Same keys, before the live quote overlay
+    'warm_snapshots': {}, # Snapshots persisted by the previous process, served until the first refresh
+    'refreshed_classes': set(),
+    'warm_started': False,
+}
+
+def persist_snapshots():
+    """Atomically writes the current snapshots and the indicator state to disk for the next warm start."""
+    with _data_lock:
+        snapshots = dict(MARKET_DATA_CACHE['snapshots'])
+        panel_versions = {name: panel.version for name, panel in MARKET_DATA_CACHE['panels'].items()}
+    try:
+        os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+        atomic_write_json(SNAPSHOT_PATH, {
+            'saved_at': datetime.now(timezone.utc).isoformat(),
+            'panel_versions': panel_versions,
+            'snapshots': [{'drawdown_period': key[0], 'change_period': key[1], 'timeframe': key[2], 'payload': payload}
+                          for key, payload in snapshots.items()],
+        })
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Warm start: Could not persist snapshot: {e}")
+    try:
+        TIMEFRAME_CACHE.save()
+    except (OSError, ValueError) as e:
+        print(f"Warm start: Could not persist indicator state: {e}")
+
+def load_warm_start():
+    """Loads the persisted snapshots (plain JSON, no pandas import needed)."""
+    try:
+        with open(SNAPSHOT_PATH) as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warm start: No persisted snapshot ({e}).")
+        return
+    warm_snapshots = {(entry['drawdown_period'], entry['change_period'], entry.get('timeframe', DEFAULT_TIMEFRAME)): entry['payload']
+                      for entry in saved.get('snapshots', [])}
+    with _data_lock:
+        MARKET_DATA_CACHE['warm_snapshots'] = warm_snapshots
+    print(f"Warm start: Loaded {len(warm_snapshots)} snapshot(s) saved at {saved.get('saved_at')}.")
+
+def load_persisted_panels():
+    """Maps panels left on disk by a previous run for asset classes not refreshed yet."""
+    with _data_lock:
+        for asset_class in ASSET_CLASSES:
+            if asset_class not in MARKET_DATA_CACHE['panels']:
+                panel = PricePanel.open(asset_class)
+                if panel is not None:
+                    MARKET_DATA_CACHE['panels'][asset_class] = panel
+
+_bar_stores = {} # asset class -> CorporateActionStore (only touched by the scheduler thread)
+
+def update_bar_store(asset_class, symbols):
+    """Merges the latest bars and corporate actions into the class' store; returns (store, re-adjusted symbols).
+
+    Symbols without stored history get a full DATA_FETCH_PERIOD download, the rest only
+    the last INCREMENTAL_FETCH_PERIOD.
+    """
+    store = _bar_stores.get(asset_class) or CorporateActionStore.load(asset_class, PANEL_DIR)
+    # Symbols no watchlist references any more; re-watching them later fetches full history again
+    store.drop([s for s in store.symbols if s not in symbols])
+    missing = store.missing(symbols)
+    known = [s for s in symbols if s not in missing]
+    readjusted = {}
+    if missing:
+        print(f"Refresh: Fetching full history for {len(missing)} {asset_class} symbols...")
+        frame = download_history(missing)
+        if not frame.empty:
+            store.merge(frame)
+    if known:
+        print(f"Refresh: Fetching last {INCREMENTAL_FETCH_PERIOD} for {len(known)} {asset_class} symbols...")
+        frame = download_history(known, INCREMENTAL_FETCH_PERIOD)
+        if not frame.empty:
+            keep_since = pd.Timestamp(get_start_date_from_period(DATA_FETCH_PERIOD) - timedelta(days=7))
+            readjusted = store.merge(frame, keep_since=keep_since)
+    if not len(store):
+        raise RuntimeError(f"No data returned for {asset_class} symbols")
+    store.save()
+    _bar_stores[asset_class] = store
+    return store, readjusted
+
+def refresh_asset_class(asset_class):
+    """Updates one asset class' bar store, bumps the data version and recomputes the default snapshot."""
+    symbols = [s for s in get_all_symbols() if get_asset_class(s) == asset_class]
+    if not symbols:
+        return
+    # Combine fresh data with the previous run's panels for classes not refreshed yet
+    load_persisted_panels()
+    store, readjusted = update_bar_store(asset_class, symbols)
+    for symbol, since in readjusted.items():
+        # Only this symbol's history changed: drop its cached indicator state, keep everyone else's
+        TIMEFRAME_CACHE.discard(symbol)
+        print(f"Refresh: {symbol} re-adjusted for corporate actions from {since}.")
+    panel = write_panel(asset_class, store.adjusted_frame(symbols))
+
+    with _data_lock:
+        previous_panel = MARKET_DATA_CACHE['panels'].get(asset_class)
+        MARKET_DATA_CACHE['panels'][asset_class] = panel
+        for symbol in symbols:
+            QUOTE_OVERLAY.pop(symbol, None) # The reconciled bars supersede earlier quotes
+        publish_quotes()
+        MARKET_DATA_CACHE['refreshed_classes'].add(asset_class)
+        panels = dict(MARKET_DATA_CACHE['panels'])
+        MARKET_DATA_CACHE['version'] += 1
+        version = MARKET_DATA_CACHE['version']
+
+    snapshot = build_dashboard_snapshot(panels, DEFAULT_DRAWDOWN_PERIOD, DEFAULT_CHANGE_PERIOD)
+    with _data_lock:
+        if MARKET_DATA_CACHE['version'] == version:
+            MARKET_DATA_CACHE['base_snapshots'] = {}
+            MARKET_DATA_CACHE['snapshots'] = {}
+            store_snapshot((DEFAULT_DRAWDOWN_PERIOD, DEFAULT_CHANGE_PERIOD, DEFAULT_TIMEFRAME), snapshot)
+    evaluate_alerts(changed_symbols(previous_panel, panel), snapshot, panels, version)
+    try:
+        update_portfolio()
+    except Exception as e:
+        print(f"Portfolio: Update failed: {e}")
+    try:
+        update_correlations()
+    except Exception as e:
+        print(f"Correlation: Update failed: {e}")
+    # Fresh once every asset class has been fetched at least once by this process
+    if all(get_asset_class(s) in MARKET_DATA_CACHE['refreshed_classes'] for s in get_all_symbols()):
+        _first_snapshot.set()
+        MARKET_DATA_CACHE['warm_snapshots'] = {}
+    persist_snapshots()
+    print(f"Refresh: {asset_class} refreshed (data version {version}).")
+
+def get_snapshot(drawdown_period, change_period, timeframe=DEFAULT_TIMEFRAME):
+    """Returns the cached payload for a period/timeframe selection, computing it once per data version."""
+    key = (drawdown_period, change_period, timeframe)
+    with _data_lock:
+        snapshot = MARKET_DATA_CACHE['snapshots'].get(key)
+    if snapshot is not None:
+        return snapshot
+    # Serialize computation so concurrent pollers don't all build the same snapshot
+    with _snapshot_lock:
+        with _data_lock:
+            snapshot = MARKET_DATA_CACHE['snapshots'].get(key)
+            panels = dict(MARKET_DATA_CACHE['panels'])
+            version = MARKET_DATA_CACHE['version']
+        if snapshot is not None:
+            return snapshot
+        if not panels:
+            load_persisted_panels()
+            with _data_lock:
+                panels = dict(MARKET_DATA_CACHE['panels'])
+        snapshot = build_dashboard_snapshot(panels, drawdown_period, change_period, timeframe)
+        with _data_lock:
+            if MARKET_DATA_CACHE['version'] == version:
+                return store_snapshot(key, snapshot)
+        return snapshot
+
+def sync_panels_from_disk():
+    """Picks up panels published by another process (reader workers with RUN_SCHEDULER=0)."""
+    changed = False
+    with _data_lock:
+        for asset_class in ASSET_CLASSES:
+            current = MARKET_DATA_CACHE['panels'].get(asset_class)
+            panel = load_panel(asset_class, current)
+            if panel is not None and panel is not current:
+                MARKET_DATA_CACHE['panels'][asset_class] = panel
+                changed = True
+        if changed:
+            MARKET_DATA_CACHE['version'] += 1
+            MARKET_DATA_CACHE['snapshots'] = {}
+            MARKET_DATA_CACHE['base_snapshots'] = {}
+    sync_quotes_from_disk()
+    if MARKET_DATA_CACHE['panels']:
+        _first_snapshot.set()
+
+def ensure_data_source():
+    """Starts the refresh scheduler, or syncs published panels when this worker only reads."""
+    if RUN_SCHEDULER:
+        with _startup_lock:
+            if not MARKET_DATA_CACHE['warm_started']:
+                load_warm_start()
+                MARKET_DATA_CACHE['warm_started'] = True
+        refresh_scheduler.start()
+    else:
+        sync_panels_from_disk()
+
+def run_refresh(name):
+    """Scheduler callback: '<class>-quotes' runs the quote overlay, 'sentiment' the headline ingestion, '<class>' the full reconcile."""
+    if name.endswith('-quotes'):
+        refresh_quotes(name[:-len('-quotes')])
+    elif name == 'sentiment':
+        update_sentiment()
+    else:
+        refresh_asset_class(name)
+
+refresh_scheduler = RefreshScheduler([
+    RefreshSchedule('equity', equity_calendar, open_interval=EQUITY_REFRESH_SECONDS,
+                    closed_interval=None, settle_delay=EQUITY_SETTLE_SECONDS),
+    RefreshSchedule('crypto', always_open_calendar, open_interval=CRYPTO_REFRESH_SECONDS),
+    RefreshSchedule('equity-quotes', equity_calendar, open_interval=QUOTE_REFRESH_SECONDS),
+    RefreshSchedule('crypto-quotes', always_open_calendar, open_interval=QUOTE_REFRESH_SECONDS),
+    RefreshSchedule('sentiment', always_open_calendar, open_interval=SENTIMENT_REFRESH_SECONDS),
+], run_refresh)
+
+# --- Live Quote Overlay ---
+# One batched last-price request per asset class replaces the per-minute history download.
+# Each quote becomes a provisional last bar: it updates the current bar or starts the next
+# one, and only that bar's indicators are derived, from the cached recursion state. Cached
+# snapshots keep their reconciled base; patched copies share every untouched entry.
+# The scheduling process publishes the quotes atomically to QUOTES_PATH next to the panels;
+# RUN_SCHEDULER=0 readers apply them to their own snapshots when the file changes.
+QUOTE_OVERLAY = {} # symbol -> (price, UTC timestamp), cleared for a class by its reconcile
+QUOTES_PATH = os.path.join(PANEL_DIR, 'quotes.json')
+_published_quotes = {'mtime': None} # Last quotes file applied by a reader
+
+def _period_start_day(period_str, reference):
+    """UTC day number of a period start ('ytd' = January 1st) relative to `reference`."""
+    if period_str.lower() == 'ytd':
+        start = get_ytd_start_date(reference)
+    else:
+        start = get_start_date_from_period(period_str, reference)
+    return int(start.timestamp() // 86400)
+
+def _patch_tail(entry, dates_field, values_fields, label, values, replace_last, since):
+    """Replaces (or appends) the last point of history lists, dropping dates before `since` from the head."""
+    dates = entry.get(dates_field)
+    if not dates:
+        return
+    keep = len(dates) - 1 if replace_last else len(dates)
+    first = bisect.bisect_left(dates, since, 0, keep)
+    entry[dates_field] = dates[first:keep] + [label]
+    for field, value in zip(values_fields, values):
+        entry[field] = entry[field][first:keep] + [value]
+
+def overlay_entry(entry, symbol, quote, drawdown_period, change_period, timeframe):
+    """Returns a copy of a reconciled snapshot entry with a live quote applied as a provisional bar."""
+    if not entry or 'error' in entry:
+        return entry
+    price, timestamp = quote
+    bar = TIMEFRAME_CACHE.provisional(symbol, timeframe, timestamp, price)
+    if bar is None:
+        return entry
+    values, replace_last = bar['values'], bar['replace_last']
+    label = pd.Timestamp(timestamp).tz_convert('UTC').strftime('%Y-%m-%d')
+    patched = dict(entry)
+
+    def rounded(value):
+        return None if pd.isna(value) else round(float(value), 2)
+
+    # Period windows are re-anchored on the provisional bar, as process_asset_data would
+    reference = datetime.fromtimestamp(bar['day'] * 86400, tz=timezone.utc)
+    close, days = bar['close'], bar['days']
+    kept = len(close) - 1 if replace_last else len(close)
+
+    def since_label(period_str):
+        return datetime.fromtimestamp(_period_start_day(period_str, reference) * 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    # Period change against the last bar on or before the period start (as calculate_period_change)
+    baseline_day = _period_start_day('ytd' if change_period.lower() == '1y' else change_period, reference)
+    baseline = close[max(int(np.searchsorted(days, baseline_day, side='right')) - 1, 0)]
+    patched['latest_price'] = price
+    patched['daily_change_pct'] = ((price - baseline) / baseline) * 100 if baseline else 0.0
+    sparkline_start = int(np.searchsorted(days, _period_start_day(change_period, reference), side='left'))
+    patched['sparkline_data'] = close[sparkline_start:kept].tolist() + [price]
+
+    for field, column in (('ema13', 'EMA13'), ('ema21', 'EMA21'), ('ema100', 'EMA100'), ('ema200', 'EMA200'),
+                          ('rsi14', 'RSI14'), ('z_score_100', 'Z_Score_100')):
+        patched[field] = None if pd.isna(values[column]) else float(values[column])
+    for signal, date_field, short, long in (('ema_signal', 'ema_short_last_buy_date', 'EMA13', 'EMA21'),
+                                            ('ema_long_signal', 'ema_long_last_buy_date', 'EMA100', 'EMA200')):
+        patched[signal] = 'Buy' if values[short] > values[long] else ('Sell' if values[short] < values[long] else None)
+        if values[short] > values[long] and bar['previous'][short] <= bar['previous'][long]:
+            patched[date_field] = label
+
+    # Drawdown from the window's running peak, over the bars before the provisional one (a replaced
+    # bar's close is stale); the whole history is re-derived as the window start may have moved
+    if entry.get('current_drawdown_pct') is not None:
+        window_start = int(np.searchsorted(days, _period_start_day(drawdown_period, reference), side='left'))
+        window = np.append(close[window_start:kept], price)
+        running_peak = np.maximum.accumulate(window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.nan_to_num((window - running_peak) / running_peak * 100, nan=0.0, posinf=0.0, neginf=0.0)
+        if running_peak[-1] > 0:
+            patched['current_drawdown_pct'] = float(drawdown[-1])
+            _patch_tail(patched, 'drawdown_history_dates', ['drawdown_history_values'], label,
+                        [rounded(drawdown[-1])], replace_last, since_label(drawdown_period))
+            if len(patched.get('drawdown_history_values') or ()) == len(window):
+                patched['drawdown_history_values'] = np.round(drawdown, 2).tolist()
+
+    # Year-to-date performance: the cumulative history's last point and the relative performance,
+    # which stays measured against the reconciled SPY baseline (spy_1y_history is not patched)
+    def ytd_baseline(reference_day):
+        ytd_day = _period_start_day('ytd', datetime.fromtimestamp(reference_day * 86400, tz=timezone.utc))
+        return close[max(int(np.searchsorted(days, ytd_day, side='right')) - 1, 0)]
+
+    ytd_base = ytd_baseline(bar['day'])
+    if ytd_base:
+        ytd_change = ((price - ytd_base) / ytd_base) * 100
+        reconciled_baseline = ytd_baseline(days[-1])
+        if entry.get('relative_perf_1y') is not None and symbol != 'SPY' and reconciled_baseline:
+            spy_1y_change = ((close[-1] - reconciled_baseline) / reconciled_baseline) * 100 - entry['relative_perf_1y']
+            patched['relative_perf_1y'] = ytd_change - spy_1y_change
+        _patch_tail(patched, 'asset_1y_history_dates', ['asset_1y_history_values'], label, [rounded(ytd_change)],
+                    replace_last, since_label('ytd'))
+
+    history_since = since_label('1y')
+    _patch_tail(patched, 'rsi_1y_history_dates', ['rsi_1y_history_values'], label, [rounded(values['RSI14'])],
+                replace_last, history_since)
+    if not pd.isna(values['Z_Score_100']):
+        _patch_tail(patched, 'zscore_1y_history_dates', ['zscore_1y_history_values'], label,
+                    [rounded(values['Z_Score_100'])], replace_last, history_since)
+    _patch_tail(patched, 'ema_1y_history_dates', ['ema13_1y_history_values', 'ema21_1y_history_values'], label,
+                [rounded(values['EMA13']), rounded(values['EMA21'])], replace_last, history_since)
+    _patch_tail(patched, 'ema_long_1y_history_dates', ['ema100_1y_history_values', 'ema200_1y_history_values'], label,
+                [rounded(values['EMA100']), rounded(values['EMA200'])], replace_last, history_since)
+
+    patched['provisional'] = True
+    patched['quote_time'] = pd.Timestamp(timestamp).isoformat()
+    patched['last_updated'] = patched['quote_time']
+    return patched
+
+def apply_quote_overlay(base, current, key, quotes):
+    """Returns `current` with the entries of the quoted symbols re-derived from the reconciled `base`."""
+    if not quotes:
+        return current
+    payload = dict(current)
+    for section in ('market_data', 'asset_data'):
+        entries = base.get(section, {})
+        touched = [symbol for symbol in quotes if symbol in entries]
+        if touched:
+            payload[section] = dict(payload[section])
+            for symbol in touched:
+                payload[section][symbol] = overlay_entry(entries[symbol], symbol, quotes[symbol], *key)
+    return payload
+
+def store_snapshot(key, snapshot):
+    """Caches a freshly built snapshot with the current quotes applied (call with _data_lock held)."""
+    MARKET_DATA_CACHE['base_snapshots'][key] = snapshot
+    patched = apply_quote_overlay(snapshot, snapshot, key, dict(QUOTE_OVERLAY))
+    MARKET_DATA_CACHE['snapshots'][key] = patched
+    return patched
+
+def patch_cached_snapshots(quotes, rebuild=False):
+    """Re-derives the entries of the quoted symbols in every cached snapshot; returns how many were patched.
+
+    With `rebuild`, each snapshot is rebuilt from its reconciled base with every current quote
+    (used when quotes were withdrawn, so their entries revert to the reconciled bars).
+    """
+    with _data_lock:
+        cached = [(key, MARKET_DATA_CACHE['base_snapshots'][key], snapshot)
+                  for key, snapshot in MARKET_DATA_CACHE['snapshots'].items() if key in MARKET_DATA_CACHE['base_snapshots']]
+    patched = {key: (base, apply_quote_overlay(base, base if rebuild else snapshot, key, quotes)) for key, base, snapshot in cached}
+    with _data_lock:
+        for key, (base, snapshot) in patched.items():
+            if MARKET_DATA_CACHE['base_snapshots'].get(key) is base:
+                MARKET_DATA_CACHE['snapshots'][key] = snapshot
+    return len(patched)
+
+def publish_quotes():
+    """Atomically writes the current quotes for RUN_SCHEDULER=0 readers (call with _data_lock held)."""
+    try:
+        os.makedirs(os.path.dirname(QUOTES_PATH), exist_ok=True)
+        atomic_write_json(QUOTES_PATH, {symbol: [price, pd.Timestamp(timestamp).isoformat()]
+                                        for symbol, (price, timestamp) in QUOTE_OVERLAY.items()})
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Quotes: Could not publish quotes: {e}")
+
+def refresh_quotes(asset_class):
+    """Fetches last prices for one asset class and patches the changed ones into the cached snapshots."""
+    if asset_class not in MARKET_DATA_CACHE['refreshed_classes']:
+        return # Quotes only overlay reconciled bars
+    symbols = [s for s in get_all_symbols() if get_asset_class(s) == asset_class]
+    quotes = fetch_quotes(symbols)
+    with _data_lock:
+        changed = {symbol: quote for symbol, quote in quotes.items() if QUOTE_OVERLAY.get(symbol) != quote}
+        if not changed:
+            return
+        QUOTE_OVERLAY.update(changed)
+        publish_quotes()
+    patched = patch_cached_snapshots(changed)
+    print(f"Quotes: {len(changed)} {asset_class} price(s) patched into {patched} snapshot(s).")
+
+def sync_quotes_from_disk():
+    """Applies the quotes published by the scheduling process (reader workers with RUN_SCHEDULER=0)."""
+    try:
+        mtime = os.stat(QUOTES_PATH).st_mtime_ns
+    except OSError:
+        return
+    if mtime == _published_quotes['mtime']:
+        return
+    try:
+        with open(QUOTES_PATH) as f:
+            published = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Quotes: Could not read published quotes: {e}")
+        return
+    quotes = {symbol: (price, pd.Timestamp(timestamp)) for symbol, (price, timestamp) in published.items()}
+    with _data_lock:
+        _published_quotes['mtime'] = mtime
+        withdrawn = [symbol for symbol in QUOTE_OVERLAY if symbol not in quotes]
+        changed = {symbol: quote for symbol, quote in quotes.items() if QUOTE_OVERLAY.get(symbol) != quote}
+        if not changed and not withdrawn:
+            return
+        QUOTE_OVERLAY.clear()
+        QUOTE_OVERLAY.update(quotes)
+    if withdrawn:
+        patch_cached_snapshots(quotes, rebuild=True)
+    else:
+        patch_cached_snapshots(changed)
+
+# --- Chart Histories (downsampled) ---
+# Popup charts can request any window up to the full fetched history at a fixed point budget.
+# Full-resolution indicators are computed once per symbol and data version; downsampled
+# results are cached per (symbol, series, period, points, method).
+HISTORY_SERIES = ('cumulative', 'drawdown', 'rsi', 'zscore', 'ema', 'ema_long', 'price')
+HISTORY_PERIODS = ('1m', '3m', '6m', 'ytd', '1y', '2y', '3y', '4y', '5y', 'max')
+DEFAULT_HISTORY_POINTS = 500
+MAX_HISTORY_POINTS = 5000
+
+_history_lock = threading.Lock()
+HISTORY_CACHE = {
+    'version': None,
+    'indicators': {}, # symbol -> (close, indicators, axis)
+    'series': {},     # (symbol, series, period, points, method) -> payload
+}
+
+def _history_cache_for_version():
+    """Returns the history cache, cleared if the data version moved on."""
+    version = MARKET_DATA_CACHE['version']
+    if HISTORY_CACHE['version'] != version:
+        HISTORY_CACHE['version'] = version
+        HISTORY_CACHE['indicators'] = {}
+        HISTORY_CACHE['series'] = {}
+    return HISTORY_CACHE
+
+def get_symbol_indicators(symbol):
+    """Returns (close, indicators, axis) over a symbol's full history, or None if unknown."""
+    with _history_lock:
+        cached = _history_cache_for_version()['indicators'].get(symbol)
+    if cached is not None:
+        return cached
+    with _data_lock:
+        panels = dict(MARKET_DATA_CACHE['panels'])
+    panel = find_symbol_panel(panels, symbol)
+    if panel is None:
+        return None
+    bars, indicators, axis = get_timeframe_data(panel, symbol)
+    cached = (bars['Close'].astype(float), indicators, axis)
+    with _history_lock:
+        _history_cache_for_version()['indicators'][symbol] = cached
+    return cached
+
+def build_history_lines(close, indicators, axis, series_name, period):
+    """Returns (start offset, {line name: values}) for a chart series over a period window."""
+    if series_name == 'cumulative' and period != 'max':
+        # Same window as the dashboard's cumulative histories ('1y' is year-to-date)
+        start, baseline = cumulative_window(axis, period)
+        return start, {'cumulative_return': (close.iloc[start:] / close.iloc[baseline] - 1) * 100}
+    if period == 'max':
+        start = 0
+    else:
+        start = axis.start_offset(period)
+    window = close.iloc[start:]
+    if series_name == 'price':
+        return start, {'close': window}
+    if series_name == 'cumulative':
+        return start, {'cumulative_return': (window / window.iloc[0] - 1) * 100}
+    if series_name == 'drawdown':
+        running_peak = window.cummax().replace(0, np.nan)
+        return start, {'drawdown': (((window - running_peak) / running_peak) * 100).fillna(0)}
+    if series_name == 'rsi':
+        return start, {'rsi14': indicators['RSI14'].iloc[start:]}
+    if series_name == 'zscore':
+        return start, {'z_score_100': indicators['Z_Score_100'].iloc[start:]}
+    if series_name == 'ema':
+        return start, {'ema13': indicators['EMA13'].iloc[start:], 'ema21': indicators['EMA21'].iloc[start:]}
+    return start, {'ema100': indicators['EMA100'].iloc[start:], 'ema200': indicators['EMA200'].iloc[start:]}
+
+def get_downsampled_history(symbol, series_name, period, points, method):
+    """Returns a chart history payload reduced to about `points` points, cached per data version."""
+    key = (symbol, series_name, period, points, method)
+    with _history_lock:
+        cached = _history_cache_for_version()['series'].get(key)
+    if cached is not None:
+        return cached
+    symbol_data = get_symbol_indicators(symbol)
+    if symbol_data is None:
+        return None
+    close, indicators, axis = symbol_data
+    start, lines = build_history_lines(close, indicators, axis, series_name, period)
+
+    # Downsample on the first line; companion lines reuse its indices so dates stay aligned
+    primary = next(iter(lines.values())).to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(primary)) # e.g. the Z-score warm-up
+    keep = valid[downsample_indices(primary[valid], points, method)]
+    dates = axis.labels(start)
+    payload = {
+        'symbol': symbol,
+        'series': series_name,
+        'period': period,
+        'method': method,
+        'source_points': int(len(valid)),
+        'dates': [dates[i] for i in keep],
+        'values': {name: np.round(line.to_numpy(dtype=float)[keep], 2).tolist() for name, line in lines.items()},
     }
-    
-    # Sanitize response to replace NaN with None (null in JSON)
-    def clean_nan(obj):
-        if isinstance(obj, float):
-            return None if np.isnan(obj) else obj
-        elif isinstance(obj, dict):
-            return {k: clean_nan(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [clean_nan(v) for v in obj]
-        return obj
-
-    return jsonify(clean_nan(response_data))
+    payload = clean_nan(payload)
+    with _history_lock:
+        _history_cache_for_version()['series'][key] = payload
+    return payload
+
+# --- Alerts ---
+# Rules live in alert_rules.json next to the panels and are evaluated by the refreshing process
+# against the default snapshot (watchlist-only symbols against their shared per-symbol results),
+# for the symbols whose latest bar changed in that refresh only.
+ALERT_RULES_PATH = os.environ.get('ALERT_RULES_PATH', os.path.join(PANEL_DIR, 'alert_rules.json'))
+ALERT_STATE_PATH = os.path.join(os.path.dirname(ALERT_RULES_PATH), 'alert_state.json')
+ALERT_LOG_PATH = os.path.join(os.path.dirname(ALERT_RULES_PATH), 'alerts.jsonl')
+ALERT_SINKS = os.environ.get('ALERT_SINKS', 'log,print') # e.g. 'log,webhook:http://localhost:9000/hook'
+
+alert_engine = AlertEngine(ALERT_RULES_PATH, ALERT_STATE_PATH, sinks_from_spec(ALERT_SINKS, ALERT_LOG_PATH))
+
+def changed_symbols(previous_panel, panel):
+    """Returns {symbol: latest bar date} for symbols whose latest bar (date or close) changed."""
+    latest = panel.last_bars()
+    if previous_panel is None:
+        return {symbol: bar[0] for symbol, bar in latest.items()}
+    previous = previous_panel.last_bars()
+    return {symbol: bar[0] for symbol, bar in latest.items() if previous.get(symbol) != bar}
+
+def evaluate_alerts(changed, snapshot, panels, version):
+    """Runs the alert rules for the changed symbols against their snapshot or watchlist entries."""
+    if not changed:
+        return
+    entries = {}
+    for section in ('market_data', 'asset_data'):
+        for symbol, entry in snapshot.get(section, {}).items():
+            if symbol in changed:
+                entries[symbol] = entry
+    key = (DEFAULT_DRAWDOWN_PERIOD, DEFAULT_CHANGE_PERIOD, DEFAULT_TIMEFRAME)
+    for symbol in changed:
+        if symbol not in entries:
+            entry = get_symbol_result(symbol, key, panels, version, None)
+            if entry is not None:
+                entries[symbol] = entry
+    try:
+        fired = alert_engine.evaluate(entries, changed)
+    except Exception as e:
+        print(f"Alerts: Evaluation failed: {e}")
+        return
+    if fired:
+        print(f"Alerts: {len(fired)} alert(s) fired for {len(changed)} changed symbol(s).")
+
+# --- Watchlists ---
+# Per-user/team watchlists (see watchlists.py). Symbols that are only on watchlists join their
+# asset class' refresh, so each is fetched once per refresh however many lists contain it.
+# Payloads reuse the shared snapshot entries; the extra symbols are computed once per data
+# version into SYMBOL_RESULTS. When no list references an extra symbol any more, its cached
+# results, indicator state and quote are released (its stored bars at the next refresh).
+WATCHLISTS_PATH = os.environ.get('WATCHLISTS_PATH', os.path.join(PANEL_DIR, 'watchlists.json'))
+SYMBOL_RESULTS = SymbolResultCache()
+
+def release_symbols(symbols):
+    """Frees what was cached for symbols that no watchlist references any more."""
+    released = [s for s in symbols if s not in MARKET_SYMBOLS and s not in ASSET_LIST]
+    if not released:
+        return
+    SYMBOL_RESULTS.release(released)
+    for symbol in released:
+        TIMEFRAME_CACHE.discard(symbol)
+    with _data_lock:
+        for symbol in released:
+            QUOTE_OVERLAY.pop(symbol, None)
+        if RUN_SCHEDULER:
+            publish_quotes()
+    print(f"Watchlists: Released {len(released)} unwatched symbol(s): {', '.join(released)}")
+
+watchlists = WatchlistStore(WATCHLISTS_PATH, on_release=release_symbols)
+
+def get_symbol_result(symbol, key, panels, version, quote):
+    """Returns a symbol's dashboard entry for a (drawdown, change, timeframe) key, computed once per data version."""
+    entry = SYMBOL_RESULTS.get(symbol, key, version)
+    if entry is None:
+        panel = find_symbol_panel(panels, symbol)
+        if panel is None:
+            return None
+        spy_1y_change = SYMBOL_RESULTS.get('SPY', 'spy_1y_change', version)
+        if spy_1y_change is None and find_symbol_panel(panels, 'SPY') is not None:
+            spy_close = find_symbol_panel(panels, 'SPY').series('SPY').astype(float).dropna()
+            spy_1y_change = SYMBOL_RESULTS.put('SPY', 'spy_1y_change', version, calculate_period_change(spy_close, '1y'))
+        bars, indicators, axis = get_timeframe_data(panel, symbol, key[2])
+        entry = clean_nan(process_asset_data(symbol, bars, key[0], key[1], spy_1y_change=spy_1y_change,
+                                             axis=axis, indicators=indicators))
+        SYMBOL_RESULTS.put(symbol, key, version, entry)
+    if quote is None:
+        return entry
+    # The live-quote copy is shared too, until the next quote or data version
+    live_key = key + ('live',)
+    patched = SYMBOL_RESULTS.get(symbol, live_key, (version, quote))
+    if patched is None:
+        patched = SYMBOL_RESULTS.put(symbol, live_key, (version, quote), overlay_entry(entry, symbol, quote, *key))
+    return patched
+
+def build_watchlist_payload(watchlist, drawdown_period, change_period, timeframe):
+    """Assembles a dashboard payload for one watchlist from the shared snapshot and per-symbol results."""
+    key = (drawdown_period, change_period, timeframe)
+    snapshot = get_snapshot(*key)
+    with _data_lock:
+        panels = dict(MARKET_DATA_CACHE['panels'])
+        version = MARKET_DATA_CACHE['version']
+        quotes = {symbol: QUOTE_OVERLAY.get(symbol) for symbol in watchlist['symbols']}
+    asset_data, pending = {}, []
+    for symbol in watchlist['symbols']:
+        entry = snapshot['asset_data'].get(symbol) or snapshot['market_data'].get(symbol)
+        if entry is None:
+            entry = get_symbol_result(symbol, key, panels, version, quotes[symbol])
+        if entry is None:
+            pending.append(symbol) # Not fetched yet (or unknown to the data provider)
+        else:
+            asset_data[symbol] = entry
+    return dict(snapshot, asset_data=asset_data, pending=pending,
+                watchlist={'id': watchlist['id'], 'name': watchlist['name'], 'owner': watchlist['owner']})
+
+# --- Portfolio ---
+# Accounts and lots live in holdings.json next to the panels. The engine is brought up to date
+# after every refresh (only the days whose prices changed are recomputed) and on demand.
+HOLDINGS_PATH = os.environ.get('HOLDINGS_PATH', os.path.join(PANEL_DIR, 'holdings.json'))
+
+holdings = Holdings(HOLDINGS_PATH, valid_symbols=get_all_symbols)
+portfolio_engine = PortfolioEngine()
+
+def update_portfolio():
+    """Updates the portfolio engine from the current panels; returns its state (None without data)."""
+    holdings.reload_if_changed()
+    with _data_lock:
+        panels = list(MARKET_DATA_CACHE['panels'].values())
+    if not panels:
+        return None
+    return portfolio_engine.update(holdings, panels)
+
+def portfolio_account_payload(summary, i, account_id):
+    """Headline figures of one account from the vectorized summary."""
+    return {
+        'account_id': account_id,
+        'name': holdings.accounts.get(account_id, {}).get('name', account_id),
+        'value': float(summary['value'][i]),
+        'cost_basis': float(summary['cost_basis'][i]),
+        'unrealized_pnl': float(summary['unrealized_pnl'][i]),
+        'daily_pnl': float(summary['daily_pnl'][i]),
+        'ytd_pnl': float(summary['ytd_pnl'][i]),
+        'ytd_return_pct': float(summary['ytd_return_pct'][i]),
+        'current_drawdown_pct': float(summary['current_drawdown_pct'][i]),
+    }
+
+def build_account_detail(state, summary, i, account_id):
+    """Positions and 1y value/drawdown histories of one account, plus its YTD return against SPY."""
+    days, index = state['days'], state['index'][i]
+    labels = day_labels(days[1:])
+    peak = np.maximum.accumulate(index[1:])
+    payload = portfolio_account_payload(summary, i, account_id)
+    payload['positions'] = position_weights(state, i)
+    payload['value_history'] = {'dates': labels, 'values': np.round(state['value'][i, 1:], 2).tolist()}
+    payload['drawdown_history'] = {'dates': labels, 'values': np.round((index[1:] / peak - 1) * 100, 2).tolist()}
+
+    # Cumulative return on the dates of spy_1y_history, from the same first date as the SPY series
+    spy_history = get_snapshot(DEFAULT_DRAWDOWN_PERIOD, DEFAULT_CHANGE_PERIOD).get('spy_1y_history', {})
+    spy_dates = spy_history.get('dates') or labels
+    spy_days = (pd.DatetimeIndex(pd.to_datetime(spy_dates, utc=True)) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1)
+    columns = np.searchsorted(days, np.asarray(spy_days, dtype=np.int64), side='right') - 1
+    growth = index[np.clip(columns, 0, len(days) - 1)]
+    cumulative = (growth / growth[0] - 1) * 100
+    cumulative[columns < 0] = np.nan
+    payload['cumulative_vs_spy'] = {
+        'dates': list(spy_dates),
+        'portfolio': np.round(cumulative, 2).tolist(),
+        'spy': spy_history.get('values', []),
+    }
+    return clean_nan(payload)
+
+# --- Risk ---
+# Monte Carlo VaR/CVaR and drawdown over the stored 5y history (see risk.py). Results are cached
+# per panel versions and parameters; the lock only guards the cache, so concurrent requests
+# simulate side by side on risk.py's shared worker pool.
+RISK_WORKERS = int(os.environ.get('RISK_WORKERS', os.cpu_count() or 1))
+RISK_DEFAULT_PATHS = 20_000
+RISK_MAX_PATHS = 200_000
+RISK_DEFAULT_HORIZON = 21 # Trading days (about one month)
+RISK_MAX_HORIZON = 252
+RISK_CACHE = {} # (panel versions, portfolio, method, paths, horizon, seed) -> payload
+_risk_lock = threading.Lock()
+
+def panel_versions():
+    """Returns the versions of the loaded panels, the data version results are cached against."""
+    with _data_lock:
+        return tuple(sorted((name, panel.version) for name, panel in MARKET_DATA_CACHE['panels'].items()))
+
+def run_risk(weights, method, paths, horizon, seed, portfolio_key):
+    """Returns the cached risk payload for a {symbol: weight} portfolio, simulating on a miss."""
+    versions = panel_versions()
+    key = (versions, portfolio_key, method, paths, horizon, seed)
+    with _risk_lock:
+        if key in RISK_CACHE:
+            return RISK_CACHE[key]
+    with _data_lock:
+        panels = list(MARKET_DATA_CACHE['panels'].values())
+    started = datetime.now(timezone.utc)
+    symbols, excluded, returns = return_matrix(panels, list(weights))
+    vector = np.array([weights[symbol] for symbol in symbols], dtype=float)
+    if not symbols or not vector.sum() > 0:
+        return None
+    model = build_model(returns, vector / vector.sum(), method)
+    summary = risk_summary(*simulate(model, paths, horizon, seed, RISK_WORKERS))
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    print(f"Risk: {paths} {method} paths x {horizon}d over {len(symbols)} symbols in {elapsed:.2f}s")
+    payload = clean_nan(dict(summary, symbols=symbols, excluded=excluded, history_days=len(returns),
+                             method=method, paths=paths, horizon_days=horizon, seed=seed))
+    with _risk_lock:
+        # Results for older panel versions can never be served again
+        for stale in [k for k in RISK_CACHE if k[0] != versions]:
+            del RISK_CACHE[stale]
+        RISK_CACHE[key] = payload
+    return payload
+
+# --- Correlation ---
+# One RollingCovariance per requested period over the whole panel universe (see correlation.py).
+# Engines are moved forward after every refresh; extracted matrices are cached per panel versions.
+DEFAULT_CORRELATION_PERIOD = '1y'
+CORRELATION_ENGINES = {} # period -> RollingCovariance
+CORRELATION_CACHE = {}   # (panel versions, period, symbols) -> payload
+_correlation_lock = threading.Lock()
+
+def update_correlation(period):
+    """Brings the period's engine up to date with the current panels and returns it (None without data)."""
+    with _data_lock:
+        panels = list(MARKET_DATA_CACHE['panels'].values())
+    if not panels:
+        return None
+    engine = CORRELATION_ENGINES.get(period)
+    symbols, days, returns = window_returns(panels, period, engine.reread_since() if engine else None)
+    if engine is None or engine.symbols != symbols:
+        engine = CORRELATION_ENGINES[period] = RollingCovariance(symbols)
+    mode = engine.update(days, returns)
+    if mode is None: # Only recent days were read, and the engine does not hold the others
+        mode = engine.update(*window_returns(panels, period)[1:])
+    if mode != 'unchanged':
+        print(f"Correlation: {mode} update of {period} window ({len(days)} days x {len(symbols)} symbols)")
+    return engine
+
+def update_correlations():
+    """Moves every engine built so far forward to the latest bars."""
+    with _correlation_lock:
+        for period in list(CORRELATION_ENGINES):
+            update_correlation(period)
+
+def get_correlation_payload(period, symbols):
+    """Returns the correlation/covariance payload for `symbols` (None = all), cached per panel versions."""
+    versions = panel_versions()
+    key = (versions, period, tuple(symbols) if symbols else None)
+    with _correlation_lock:
+        if key in CORRELATION_CACHE:
+            return CORRELATION_CACHE[key]
+        engine = update_correlation(period)
+        if engine is None:
+            return None
+        symbols = [s for s in symbols if s in engine.symbols] if symbols else engine.symbols
+        row_of = {symbol: i for i, symbol in enumerate(engine.symbols)}
+        correlation, covariance, observations = engine.matrices([row_of[s] for s in symbols])
+        payload = clean_nan({
+            'period': period,
+            'as_of': day_labels(engine.days[-1:])[0] if len(engine.days) else None,
+            'symbols': symbols,
+            'correlation': np.round(correlation, 4).tolist(),
+            'covariance': covariance.tolist(), # Daily log returns
+            'observations': observations.astype(int).tolist(),
+        })
+        for stale in [k for k in CORRELATION_CACHE if k[0] != versions]:
+            del CORRELATION_CACHE[stale]
+        CORRELATION_CACHE[key] = payload
+        return payload
+
+# --- Backtests ---
+# EMA-crossover sweeps over the stored daily panels (see backtest.py), per panel calendar so crypto
+# trades on weekends. Results are cached per panel versions, grid, period and symbols; the lock
+# only guards the cache, so concurrent sweeps share backtest.py's worker pool.
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', os.cpu_count() or 1))
+DEFAULT_BACKTEST_PERIOD = '3y' # Leaves two years of warm-up for EMA200 within the 5y history
+BACKTEST_MAX_PAIRS = 400
+BACKTEST_MAX_SPAN = 400
+BACKTEST_CACHE = {} # (panel versions, pairs, period, symbols) -> (symbols, results)
+_backtest_lock = threading.Lock()
+
+def run_backtests(pairs, period, symbols):
+    """Returns (symbols backtested, {metric: (pairs, symbols) array}), cached per panel versions."""
+    versions = panel_versions()
+    key = (versions, tuple(pairs), period, tuple(symbols))
+    with _backtest_lock:
+        if key in BACKTEST_CACHE:
+            return BACKTEST_CACHE[key]
+    with _data_lock:
+        panels = list(MARKET_DATA_CACHE['panels'].values())
+    started = datetime.now(timezone.utc)
+    tested, blocks = [], []
+    for panel in panels:
+        panel_symbols = [s for s in symbols if s in panel and s not in tested]
+        if not panel_symbols or len(panel.dates) < 2:
+            continue
+        days = panel_days(panel)
+        start = max(int(np.searchsorted(days, days[-1] - BACKTEST_PERIODS[period], side='right')), 1)
+        blocks.append(run_backtest(asof_closes(panel, panel_symbols, days), pairs, start, BACKTEST_WORKERS))
+        tested.extend(panel_symbols)
+    if not blocks:
+        return None
+    results = {metric: np.concatenate([block[metric] for block in blocks], axis=1) for metric in METRICS}
+    results['buy_hold'] = np.concatenate([block['buy_hold'] for block in blocks])
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    print(f"Backtest: {len(pairs)} span pairs x {len(tested)} symbols over {period} in {elapsed:.2f}s")
+    with _backtest_lock:
+        for stale in [k for k in BACKTEST_CACHE if k[0] != versions]:
+            del BACKTEST_CACHE[stale]
+        BACKTEST_CACHE[key] = (tested, results)
+    return tested, results
+
+# --- Sentiment ---
+# Headlines from the JSONL files in SENTIMENT_SOURCE_DIR (see sentiment.py) are ingested on their
+# own schedule: only lines appended since the last run are read, each distinct text is scored
+# once and each article counts once per symbol. The monthly rollup overrides the hand-maintained
+# sentiment_data.json month by month and is added to the dashboard payloads as 'sentiment' when
+# they are served, so new headlines never invalidate the price snapshots. Reader workers pick up
+# the rollup from the state file.
+SENTIMENT_SOURCE_DIR = os.environ.get('SENTIMENT_SOURCE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'news'))
+SENTIMENT_PATH = os.environ.get('SENTIMENT_PATH', SENTIMENT_DATA_PATH)
+sentiment_pipeline = SentimentPipeline(os.environ.get('SENTIMENT_STATE_PATH', SENTIMENT_STATE_PATH))
+sentiment_source = JsonlHeadlineSource(SENTIMENT_SOURCE_DIR)
+SENTIMENT_CACHE = {'key': None, 'scores': {}} # Merged scores for (rollup version, sentiment_data.json mtime)
+
+def update_sentiment():
+    """Scheduler callback: ingests new headlines into the rollup."""
+    stats = sentiment_pipeline.ingest(sentiment_source)
+    if stats['read']:
+        print(f"Sentiment: Read {stats['read']} article(s): {stats['scored']} scored, {stats['cached']} cached, "
+              f"{stats['duplicates']} duplicate(s), {stats['skipped']} skipped.")
+
+def get_sentiment(symbols):
+    """Returns {symbol: {month: score}} for the given symbols, re-merged only when an input changed."""
+    sentiment_pipeline.reload_if_changed()
+    try:
+        data_mtime = os.stat(SENTIMENT_PATH).st_mtime_ns
+    except OSError:
+        data_mtime = None
+    key = (sentiment_pipeline.version, data_mtime)
+    with _data_lock:
+        scores = SENTIMENT_CACHE['scores'] if SENTIMENT_CACHE['key'] == key else None
+    if scores is None:
+        scores = merge_monthly_scores(load_monthly_scores(SENTIMENT_PATH), sentiment_pipeline.monthly_scores())
+        with _data_lock:
+            SENTIMENT_CACHE.update(key=key, scores=scores)
+    return {symbol: scores[symbol] for symbol in symbols if symbol in scores}
+
+def with_sentiment(payload):
+    """Adds the monthly sentiment of the payload's assets to a (shared, unmodified) dashboard payload."""
+    return dict(payload, sentiment=get_sentiment(payload.get('asset_data', {})))
+
+# --- API Endpoints ---
+@app.route('/api/dashboard-data')
+def get_dashboard_data():
+    """API endpoint to get processed data for market and asset symbols."""
+    drawdown_period = request.args.get('drawdown_period', default=DEFAULT_DRAWDOWN_PERIOD, type=str)
+    change_period = request.args.get('change_period', default=DEFAULT_CHANGE_PERIOD, type=str) # Get change_period
+    timeframe = request.args.get('timeframe', default=DEFAULT_TIMEFRAME, type=str).lower()
+    if timeframe not in TIMEFRAMES:
+        return jsonify({'error': f"Unknown timeframe '{timeframe}'", 'valid': list(TIMEFRAMES)}), 400
+
+    ensure_data_source()
+    if not _first_snapshot.is_set() and MARKET_DATA_CACHE['warm_snapshots']:
+        # Restarted: answer immediately with the previous run's data while the first refresh completes
+        key = (drawdown_period, change_period, timeframe)
+        snapshot = MARKET_DATA_CACHE['snapshots'].get(key) or MARKET_DATA_CACHE['warm_snapshots'].get(key)
+        if snapshot is None:
+            snapshot = get_snapshot(drawdown_period, change_period, timeframe)
+        return jsonify(dict(with_sentiment(snapshot), stale=True))
+
+    wait_timeout = FIRST_SNAPSHOT_TIMEOUT if RUN_SCHEDULER else 0
+    if not _first_snapshot.wait(timeout=wait_timeout) and not MARKET_DATA_CACHE['panels']:
+        return jsonify({'error': 'Data not available yet'}), 503
+
+    return jsonify(with_sentiment(get_snapshot(drawdown_period, change_period, timeframe)))
+
+@app.route('/api/watchlists')
+def list_watchlists():
+    """API endpoint listing the watchlists (of one user or team with ?owner=)."""
+    return jsonify({'watchlists': watchlists.all(request.args.get('owner'))})
+
+@app.route('/api/watchlists/<watchlist_id>', methods=['PUT'])
+def put_watchlist(watchlist_id):
+    """API endpoint creating or replacing a watchlist, e.g. {"name": "Chips", "owner": "team-a", "symbols": ["AMD", "NVDA"]}."""
+    try:
+        watchlist, created = watchlists.put(watchlist_id, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with _data_lock:
+        panels = dict(MARKET_DATA_CACHE['panels'])
+    new_classes = {get_asset_class(s) for s in watchlist['symbols'] if find_symbol_panel(panels, s) is None}
+    if RUN_SCHEDULER:
+        for asset_class in sorted(new_classes):
+            refresh_scheduler.trigger(asset_class) # Fetch the new symbols now rather than at the next refresh
+    return jsonify(watchlist), 201 if created else 200
+
+@app.route('/api/watchlists/<watchlist_id>', methods=['DELETE'])
+def delete_watchlist(watchlist_id):
+    """API endpoint deleting a watchlist."""
+    if not watchlists.remove(watchlist_id):
+        return jsonify({'error': f"Unknown watchlist '{watchlist_id}'"}), 404
+    return jsonify({'deleted': watchlist_id})
+
+@app.route('/api/watchlists/<watchlist_id>/dashboard-data')
+def get_watchlist_dashboard_data(watchlist_id):
+    """API endpoint with the dashboard payload restricted to one watchlist's symbols."""
+    drawdown_period = request.args.get('drawdown_period', default=DEFAULT_DRAWDOWN_PERIOD, type=str)
+    change_period = request.args.get('change_period', default=DEFAULT_CHANGE_PERIOD, type=str)
+    timeframe = request.args.get('timeframe', default=DEFAULT_TIMEFRAME, type=str).lower()
+    if timeframe not in TIMEFRAMES:
+        return jsonify({'error': f"Unknown timeframe '{timeframe}'", 'valid': list(TIMEFRAMES)}), 400
+    watchlist = watchlists.get(watchlist_id)
+    if watchlist is None:
+        return jsonify({'error': f"Unknown watchlist '{watchlist_id}'"}), 404
+
+    ensure_data_source()
+    wait_timeout = FIRST_SNAPSHOT_TIMEOUT if RUN_SCHEDULER else 0
+    if not _first_snapshot.wait(timeout=wait_timeout) and not MARKET_DATA_CACHE['panels']:
+        return jsonify({'error': 'Data not available yet'}), 503
+    return jsonify(with_sentiment(build_watchlist_payload(watchlist, drawdown_period, change_period, timeframe)))
+
+@app.route('/api/refresh-status')
+def get_refresh_status():
+    """API endpoint describing the background refresh schedule per asset class."""
+    ensure_data_source()
+    with _data_lock:
+        version = MARKET_DATA_CACHE['version']
+    return jsonify({'data_version': version, 'asset_classes': refresh_scheduler.status()})
+
+@app.route('/api/history/<symbol>')
+def get_history(symbol):
+    """API endpoint returning a downsampled chart history (e.g. ?series=cumulative&period=5y&points=500)."""
+    series_name = request.args.get('series', default='cumulative', type=str).lower()
+    period = request.args.get('period', default='1y', type=str).lower()
+    points = request.args.get('points', default=DEFAULT_HISTORY_POINTS, type=int)
+    method = request.args.get('method', default='lttb', type=str).lower()
+    if series_name not in HISTORY_SERIES:
+        return jsonify({'error': f"Unknown series '{series_name}'", 'valid': list(HISTORY_SERIES)}), 400
+    if period not in HISTORY_PERIODS:
+        return jsonify({'error': f"Unknown period '{period}'", 'valid': list(HISTORY_PERIODS)}), 400
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({'error': f"Unknown method '{method}'", 'valid': list(DOWNSAMPLE_METHODS)}), 400
+    points = max(3, min(points, MAX_HISTORY_POINTS))
+
+    ensure_data_source()
+    if not MARKET_DATA_CACHE['panels']:
+        load_persisted_panels()
+    payload = get_downsampled_history(symbol.upper(), series_name, period, points, method)
+    if payload is None:
+        return jsonify({'error': f"No data for {symbol}"}), 404
+    return jsonify(payload)
+
+@app.route('/api/alerts')
+def get_alerts():
+    """API endpoint listing the alert rules and the most recently fired alerts."""
+    limit = request.args.get('limit', default=50, type=int)
+    return jsonify({'rules': alert_engine.rules(), 'recent': alert_engine.recent_alerts(max(1, limit))})
+
+@app.route('/api/alerts/rules', methods=['POST'])
+def add_alert_rule():
+    """API endpoint creating (or replacing, by id) an alert rule, e.g. {"metric": "rsi14", "op": "<", "threshold": 30}."""
+    try:
+        rule = alert_engine.add_rule(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(rule), 201
+
+@app.route('/api/alerts/rules/<rule_id>', methods=['DELETE'])
+def delete_alert_rule(rule_id):
+    """API endpoint deleting an alert rule."""
+    if not alert_engine.remove_rule(rule_id):
+        return jsonify({'error': f"Unknown rule '{rule_id}'"}), 404
+    return jsonify({'deleted': rule_id})
+
+@app.route('/api/portfolio')
+def get_portfolio():
+    """API endpoint summarizing every account (value, daily/YTD P&L, return, drawdown) and the totals."""
+    ensure_data_source()
+    state = update_portfolio()
+    if state is None:
+        return jsonify({'error': 'Data not available yet'}), 503
+    summary = summarize(state)
+    if summary is None:
+        return jsonify({'accounts': [], 'totals': {}})
+    accounts = [portfolio_account_payload(summary, i, account_id) for i, account_id in enumerate(state['accounts'])]
+    totals = {field: float(np.sum(summary[field])) for field in ('value', 'cost_basis', 'unrealized_pnl', 'daily_pnl', 'ytd_pnl')}
+    return jsonify(clean_nan({'as_of': summary['as_of'], 'accounts': accounts, 'totals': totals}))
+
+@app.route('/api/portfolio/<account_id>')
+def get_portfolio_account(account_id):
+    """API endpoint with one account's positions, weights and histories."""
+    ensure_data_source()
+    state = update_portfolio()
+    if state is None:
+        return jsonify({'error': 'Data not available yet'}), 503
+    if account_id not in state['accounts']:
+        return jsonify({'error': f"Unknown account '{account_id}'"}), 404
+    summary = summarize(state)
+    return jsonify(build_account_detail(state, summary, state['accounts'].index(account_id), account_id))
+
+@app.route('/api/portfolio/<account_id>/lots', methods=['POST'])
+def add_portfolio_lot(account_id):
+    """API endpoint adding a lot, e.g. {"symbol": "NVDA", "quantity": 10, "cost_basis": 1200, "acquired": "2024-03-01"}."""
+    try:
+        lot = holdings.add_lot(account_id, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(lot), 201
+
+@app.route('/api/portfolio/<account_id>/lots/<lot_id>', methods=['DELETE'])
+def delete_portfolio_lot(account_id, lot_id):
+    """API endpoint deleting a lot."""
+    if not holdings.remove_lot(account_id, lot_id):
+        return jsonify({'error': f"Unknown lot '{lot_id}' in account '{account_id}'"}), 404
+    return jsonify({'deleted': lot_id})
+
+@app.route('/api/correlation')
+def get_correlation():
+    """API endpoint with the pairwise return correlation and covariance matrices, e.g. ?period=1y&symbols=AMD,NVDA,QCOM."""
+    ensure_data_source()
+    period = request.args.get('period', DEFAULT_CORRELATION_PERIOD)
+    if period not in CORRELATION_PERIODS:
+        return jsonify({'error': f"Unknown period '{period}'", 'valid': list(CORRELATION_PERIODS)}), 400
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    valid_symbols = get_all_symbols()
+    unknown = [s for s in symbols if s not in valid_symbols]
+    if unknown:
+        return jsonify({'error': f"Unknown symbols: {', '.join(unknown)}", 'valid': valid_symbols}), 400
+    payload = get_correlation_payload(period, list(dict.fromkeys(symbols)))
+    if payload is None:
+        return jsonify({'error': 'Data not available yet'}), 503
+    return jsonify(payload)
+
+@app.route('/api/backtest')
+def get_backtest():
+    """API endpoint with EMA-crossover backtests over a span grid, e.g. ?fast=5,13&slow=21,200&period=3y.
+
+    Returns per-pair aggregates across symbols and, per symbol, the best pair and the
+    buy-and-hold return (every pair when `symbols` is given).
+    """
+    ensure_data_source()
+    period = request.args.get('period', DEFAULT_BACKTEST_PERIOD)
+    if period not in BACKTEST_PERIODS:
+        return jsonify({'error': f"Unknown period '{period}'", 'valid': list(BACKTEST_PERIODS)}), 400
+    try:
+        fast = [int(v) for v in request.args.get('fast', '').split(',') if v.strip()] or list(DEFAULT_FAST_SPANS)
+        slow = [int(v) for v in request.args.get('slow', '').split(',') if v.strip()] or list(DEFAULT_SLOW_SPANS)
+    except ValueError:
+        return jsonify({'error': 'fast and slow must be comma-separated integers'}), 400
+    pairs = span_pairs(fast, slow)
+    if not pairs or not all(2 <= span <= BACKTEST_MAX_SPAN for span in fast + slow) or len(pairs) > BACKTEST_MAX_PAIRS:
+        return jsonify({'error': f'Need 1..{BACKTEST_MAX_PAIRS} pairs with fast < slow and spans in 2..{BACKTEST_MAX_SPAN}'}), 400
+    requested = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    valid_symbols = get_all_symbols()
+    unknown = [s for s in requested if s not in valid_symbols]
+    if unknown:
+        return jsonify({'error': f"Unknown symbols: {', '.join(unknown)}", 'valid': valid_symbols}), 400
+
+    result = run_backtests(pairs, period, list(dict.fromkeys(requested)) or valid_symbols)
+    if result is None:
+        return jsonify({'error': 'Data not available yet'}), 503
+    symbols, results = result
+    return jsonify(clean_nan({
+        'period': period,
+        'pairs': summarize_pairs(pairs, results),
+        'symbols': symbol_results(symbols, pairs, results, detail=bool(requested)),
+    }))
+
+@app.route('/api/risk')
+def get_risk():
+    """API endpoint with Monte Carlo VaR/CVaR and drawdown risk.
+
+    The portfolio is an account (?account=<id>, weighted by position value), a symbol list
+    (?symbols=NVDA,AMD, equal weights) or, by default, the whole watchlist equally weighted.
+    Parameters: method (bootstrap|normal), paths, horizon (trading days), seed.
+    """
+    ensure_data_source()
+    method = request.args.get('method', 'bootstrap')
+    if method not in RISK_METHODS:
+        return jsonify({'error': f"Unknown method '{method}'", 'valid': list(RISK_METHODS)}), 400
+    try:
+        paths = int(request.args.get('paths', RISK_DEFAULT_PATHS))
+        horizon = int(request.args.get('horizon', RISK_DEFAULT_HORIZON))
+        seed = int(request.args.get('seed', 0))
+    except ValueError:
+        return jsonify({'error': 'paths, horizon and seed must be integers'}), 400
+    if not (1 <= paths <= RISK_MAX_PATHS and 1 <= horizon <= RISK_MAX_HORIZON and seed >= 0):
+        return jsonify({'error': f'paths must be 1..{RISK_MAX_PATHS}, horizon 1..{RISK_MAX_HORIZON}, seed >= 0'}), 400
+
+    account_id = request.args.get('account')
+    if account_id:
+        state = update_portfolio()
+        if state is None or account_id not in state['accounts']:
+            return jsonify({'error': f"Unknown account '{account_id}'"}), 404
+        weights = {position['symbol']: position['value'] for position in position_weights(state, state['accounts'].index(account_id))}
+        portfolio_key = ('account', account_id, holdings.version)
+    else:
+        valid_symbols = get_all_symbols()
+        symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()] or valid_symbols
+        unknown = [s for s in symbols if s not in valid_symbols]
+        if unknown:
+            return jsonify({'error': f"Unknown symbols: {', '.join(unknown)}", 'valid': valid_symbols}), 400
+        weights = dict.fromkeys(symbols, 1.0)
+        portfolio_key = ('symbols', tuple(sorted(weights)))
+
+    payload = run_risk(weights, method, paths, horizon, seed, portfolio_key)
+    if payload is None:
+        return jsonify({'error': 'Not enough price history for this portfolio'}), 503
+    return jsonify(dict(payload, account=account_id))
 
 # --- Static File Serving ---
 @app.route('/')
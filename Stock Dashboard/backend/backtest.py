@@ -0,0 +1,158 @@
+"""Vectorized EMA-crossover backtests over a grid of (fast, slow) span pairs.
+
+The strategy is the dashboard's signal: long while EMA(fast) > EMA(slow), flat
+otherwise, acting on the next bar's return. EMAs for every span in the grid are
+computed in one pass over the full stored history (so they are warmed up) while
+returns are only counted inside the backtest window. Every metric is computed
+for a block of symbols and every pair at once; a trade is a run of consecutive
+long days.
+
+Symbol blocks are independent, so large sweeps are spread across a process pool,
+created on first use and shared by every later sweep. The close matrix reaches
+each worker once per sweep through shared memory and tasks only name their rows
+(see process_pool.py).
+"""
+import warnings
+
+from lazy_imports import lazy_import
+from process_pool import SharedArrays, WorkerPool, attach
+
+np = lazy_import('numpy')
+
+DEFAULT_FAST_SPANS = (5, 8, 10, 13, 20, 30, 50, 100)
+DEFAULT_SLOW_SPANS = (21, 26, 50, 100, 150, 200, 250)
+BACKTEST_PERIODS = {'1y': 365, '2y': 730, '3y': 1095, '5y': 1825} # Calendar days
+METRICS = ('total_return', 'max_drawdown', 'trades', 'hit_rate')
+SYMBOLS_PER_TASK = 500
+
+def span_pairs(fast_spans, slow_spans):
+    """Returns the (fast, slow) pairs of the grid with fast < slow."""
+    return [(fast, slow) for fast in sorted(set(fast_spans)) for slow in sorted(set(slow_spans)) if fast < slow]
+
+def ema_matrix(closes, spans):
+    """EMAs (adjust=False, as in the indicator engine) of a (days, symbols) matrix for every span at once.
+
+    Returns (days, spans, symbols) float32. Each EMA starts at the symbol's first close.
+    """
+    alphas = (2.0 / (np.asarray(spans, dtype=float) + 1.0))[:, None]
+    emas = np.empty((len(closes), len(spans), closes.shape[1]), dtype=np.float32)
+    state = np.full((len(spans), closes.shape[1]), np.nan)
+    for t, price in enumerate(closes):
+        state = np.where(np.isnan(state), price, alphas * price + (1.0 - alphas) * state)
+        emas[t] = state
+    return emas
+
+def backtest_block(closes, pairs, start):
+    """Backtests every pair on a (symbols, days) block of forward-filled closes.
+
+    Returns {metric: (pairs, symbols) array} for the returns from bar `start` on, plus
+    'buy_hold' (symbols,). Returns are fractions; NaN marks symbols without data.
+
+    One pass over the days advances all (pair, symbol) books at once: the cumulative
+    log return, its running peak and worst drawdown, and the log return at which the
+    open trade was entered (to score it as a win or a loss when it exits).
+    """
+    closes = np.ascontiguousarray(closes.T, dtype=float) # Days x symbols: time steps are contiguous rows
+    n_days, n_symbols = closes.shape
+    spans = sorted({span for pair in pairs for span in pair})
+    emas = ema_matrix(closes, spans)
+    fast = [spans.index(pair[0]) for pair in pairs]
+    slow = [spans.index(pair[1]) for pair in pairs]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.diff(np.log(closes), axis=0, prepend=np.nan).astype(np.float32) # Return of bar t
+    has_data = ~np.isnan(log_returns)
+    log_returns[~has_data] = 0.0
+
+    shape = (len(pairs), n_symbols)
+    equity, peak, worst, entry_equity = (np.zeros(shape, dtype=np.float32) for _ in range(4))
+    trades, wins = np.zeros(shape), np.zeros(shape)
+    was_held = np.zeros(shape, dtype=bool)
+    for t in range(start, n_days):
+        # Position held over bar t is the signal at the close of bar t-1
+        day = emas[t - 1]
+        held = (day[fast] > day[slow]) & has_data[t]
+        step = np.where(held, log_returns[t], np.float32(0.0))
+        closed = was_held & ~held
+        wins += closed & (equity > entry_equity) # Trades that ended on bar t-1
+        entered = held & ~was_held
+        trades += entered
+        np.copyto(entry_equity, equity, where=entered)
+        equity += step
+        np.maximum(peak, equity, out=peak)
+        np.minimum(worst, equity - peak, out=worst)
+        was_held = held
+    wins += was_held & (equity > entry_equity) # Trades still open on the last bar
+
+    in_window = has_data[start:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results = {'total_return': np.expm1(equity.astype(float)), 'max_drawdown': np.expm1(worst.astype(float)),
+                   'trades': trades, 'hit_rate': wins / trades,
+                   'buy_hold': np.expm1(log_returns[start:].sum(axis=0, dtype=float))}
+    no_data = ~in_window.any(axis=0)
+    for metric in METRICS:
+        results[metric][:, no_data] = np.nan
+    results['buy_hold'][no_data] = np.nan
+    return results
+
+_pool = WorkerPool()
+
+def _run_shared_task(task):
+    """Worker entry point: backtests one block of rows of the shared close matrix."""
+    shared, rows, pairs, start = task
+    return backtest_block(attach(shared)['closes'][rows], pairs, start)
+
+def run_backtest(closes, pairs, start, workers=1):
+    """Backtests all symbols in blocks of SYMBOLS_PER_TASK, across `workers` processes when > 1."""
+    rows = [slice(i, i + SYMBOLS_PER_TASK) for i in range(0, len(closes), SYMBOLS_PER_TASK)]
+    if workers > 1 and len(rows) > 1:
+        with SharedArrays({'closes': np.asarray(closes)}) as shared:
+            blocks = _pool.map(_run_shared_task, [(shared, block, pairs, start) for block in rows], workers)
+    else:
+        blocks = [backtest_block(closes[block], pairs, start) for block in rows]
+    results = {metric: np.concatenate([block[metric] for block in blocks], axis=1) for metric in METRICS}
+    results['buy_hold'] = np.concatenate([block['buy_hold'] for block in blocks])
+    return results
+
+def summarize_pairs(pairs, results):
+    """Per-pair aggregates across symbols, best median return first."""
+    with np.errstate(invalid='ignore'):
+        beats_hold = (results['total_return'] > results['buy_hold']).sum(axis=1)
+    summary = []
+    for p, (fast, slow) in enumerate(pairs):
+        total_return = results['total_return'][p]
+        if np.isnan(total_return).all():
+            continue
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning) # Hit rate is NaN where a pair never traded
+            hit_rate = np.nanmean(results['hit_rate'][p])
+        summary.append({
+            'fast': fast,
+            'slow': slow,
+            'mean_return_pct': float(np.nanmean(total_return) * 100),
+            'median_return_pct': float(np.nanmedian(total_return) * 100),
+            'hit_rate_pct': float(hit_rate * 100),
+            'mean_max_drawdown_pct': float(np.nanmean(results['max_drawdown'][p]) * 100),
+            'trades': int(np.nansum(results['trades'][p])),
+            'symbols_beating_buy_hold': int(beats_hold[p]),
+        })
+    return sorted(summary, key=lambda row: -row['median_return_pct'])
+
+def symbol_results(symbols, pairs, results, detail=False):
+    """Per-symbol results: the best pair (or every pair with `detail`) and the buy-and-hold return."""
+    output = {}
+    for i, symbol in enumerate(symbols):
+        if np.isnan(results['buy_hold'][i]):
+            continue
+        rows = [{'fast': fast, 'slow': slow,
+                 'return_pct': float(results['total_return'][p, i] * 100),
+                 'max_drawdown_pct': float(results['max_drawdown'][p, i] * 100),
+                 'trades': int(results['trades'][p, i]),
+                 'hit_rate_pct': float(results['hit_rate'][p, i] * 100)}
+                for p, (fast, slow) in enumerate(pairs)]
+        entry = {'buy_hold_return_pct': float(results['buy_hold'][i] * 100)}
+        if detail:
+            entry['pairs'] = rows
+        elif rows:
+            entry['best'] = max(rows, key=lambda row: row['return_pct'])
+        output[symbol] = entry
+    return output
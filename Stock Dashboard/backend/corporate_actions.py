@@ -0,0 +1,219 @@
+"""Raw daily bars plus split/dividend events, with adjustment factors kept separately.
+
+The store holds unadjusted closes and, per symbol, two cumulative factor rows: the
+split factor (product of 1/ratio over later splits) and the dividend factor
+(product of 1 - dividend/previous close over later ex-dates). The adjusted close
+that feeds the panels is raw * split factor * dividend factor. A new event only
+rescales the factor row of its own symbol, and only for bars before its date, so
+the rest of the universe (and its cached indicator state) is untouched.
+
+Providers differ in whether history before a split is already split-adjusted
+(yfinance's Close is). Downloaded closes are normalized back to raw prices
+first: if a split date shows no price cliff, the bars before it are scaled up by
+the split ratio.
+"""
+import json
+import os
+
+from lazy_imports import lazy_import
+from price_panel import atomic_write_json
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+ADJUST_DIVIDENDS = os.environ.get('ADJUST_DIVIDENDS', '1') != '0'
+
+def _date_label(timestamp):
+    return timestamp.strftime('%Y-%m-%d')
+
+def split_already_applied(close, index, ratio):
+    """True if the closes around a split at `index` show no cliff, i.e. the history was pre-adjusted."""
+    if index <= 0 or not (close[index - 1] > 0 and close[index] > 0):
+        return True
+    jump = np.log(close[index - 1] / close[index])
+    return abs(jump) < abs(np.log(ratio)) / 2
+
+def normalize_to_raw(close, splits):
+    """Undoes provider split adjustment: scales bars before each un-cliffed split by its ratio."""
+    close = close.copy()
+    for index, ratio in splits:
+        if split_already_applied(close, index, ratio):
+            close[:index] *= ratio
+    return close
+
+class CorporateActionStore:
+    """Persistent raw closes, events and factors for one asset class (e.g. 'equity')."""
+
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        self.symbols = []
+        self.dates = None    # UTC DatetimeIndex
+        self.raw = None      # (symbols, dates) float64 unadjusted closes
+        self.split_factor = None
+        self.dividend_factor = None
+        self.events = {}     # symbol -> [{'date', 'type', 'ratio' | 'amount' + 'factor'}]
+
+    @property
+    def _data_path(self):
+        return os.path.join(self.directory, f'{self.name}.bars.npz')
+
+    @property
+    def _events_path(self):
+        return os.path.join(self.directory, f'{self.name}.events.json')
+
+    @classmethod
+    def load(cls, name, directory):
+        """Loads the persisted store, or returns an empty one."""
+        store = cls(name, directory)
+        try:
+            with open(store._events_path) as f:
+                meta = json.load(f)
+            with np.load(store._data_path) as data:
+                store.raw = data['raw']
+                store.split_factor = data['split_factor']
+                store.dividend_factor = data['dividend_factor']
+            store.symbols = meta['symbols']
+            store.events = meta['events']
+            store.dates = pd.DatetimeIndex(pd.to_datetime(np.asarray(meta['dates'], dtype=np.int64), unit='s', utc=True))
+        except (OSError, ValueError, KeyError):
+            return cls(name, directory)
+        if store.raw.shape != (len(store.symbols), len(store.dates)):
+            return cls(name, directory)
+        return store
+
+    def save(self):
+        """Writes the arrays and the events/manifest JSON (data first, so the JSON never points ahead)."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self._data_path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, raw=self.raw, split_factor=self.split_factor, dividend_factor=self.dividend_factor)
+        os.replace(tmp_path, self._data_path)
+        atomic_write_json(self._events_path, {
+            'symbols': self.symbols,
+            'dates': ((self.dates - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).tolist(),
+            'events': self.events,
+        })
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def missing(self, symbols):
+        """Symbols without stored history (they need a full-period download)."""
+        known = set(self.symbols)
+        return [s for s in symbols if s not in known]
+
+    # --- Ingestion ---
+    def _reindex(self, dates, symbols):
+        """Grows the arrays to cover `dates` x `symbols` (new cells: NaN prices, unit factors)."""
+        dates = dates if self.dates is None else self.dates.union(dates)
+        symbols = self.symbols + [s for s in symbols if s not in self.symbols]
+        shape = (len(symbols), len(dates))
+        raw = np.full(shape, np.nan)
+        split_factor = np.ones(shape)
+        dividend_factor = np.ones(shape)
+        if self.dates is not None and len(self.symbols):
+            columns = dates.get_indexer(self.dates)
+            rows = slice(0, len(self.symbols))
+            raw[rows, columns] = self.raw
+            split_factor[rows, columns] = self.split_factor
+            dividend_factor[rows, columns] = self.dividend_factor
+            # Bars appended after the last stored bar sit after every known event: factor 1 is right
+        self.dates, self.symbols = dates, symbols
+        self.raw, self.split_factor, self.dividend_factor = raw, split_factor, dividend_factor
+
+    def merge(self, batch_data, keep_since=None):
+        """Ingests a ticker-grouped download with Close, 'Stock Splits' and 'Dividends' columns.
+
+        Overwrites the raw closes of the downloaded dates, records new events and rescales
+        only the factor rows they affect. Returns {symbol: earliest new event date} for the
+        symbols whose earlier bars were re-adjusted.
+        """
+        symbols = list(dict.fromkeys(batch_data.columns.get_level_values(0)))
+        self._reindex(batch_data.index, symbols)
+        columns = self.dates.get_indexer(batch_data.index)
+        row_of = {symbol: i for i, symbol in enumerate(self.symbols)}
+        adjusted = {}
+        for symbol in symbols:
+            frame = batch_data[symbol]
+            if 'Close' not in frame.columns:
+                continue
+            close = frame['Close'].to_numpy(dtype=float, na_value=np.nan)
+            splits = frame['Stock Splits'].to_numpy(dtype=float, na_value=0.0) if 'Stock Splits' in frame.columns else np.zeros(len(close))
+            dividends = frame['Dividends'].to_numpy(dtype=float, na_value=0.0) if 'Dividends' in frame.columns else np.zeros(len(close))
+            split_points = [(int(i), float(splits[i])) for i in np.flatnonzero(splits > 0)]
+            quoted = close # The provider's own closes, in the same (split-adjusted) units as its dividends
+            close = normalize_to_raw(close, split_points)
+
+            row = row_of[symbol]
+            valid = ~np.isnan(close)
+            self.raw[row, columns[valid]] = close[valid]
+
+            known = {(event['date'], event['type']) for event in self.events.get(symbol, [])}
+            # Splits first, so the fallback previous close below already reflects later splits of the batch
+            for i in np.flatnonzero(splits > 0):
+                label = _date_label(batch_data.index[i])
+                if (label, 'split') not in known:
+                    self.events.setdefault(symbol, []).append({'date': label, 'type': 'split', 'ratio': float(splits[i])})
+                    self.split_factor[row, :int(columns[i])] /= splits[i]
+                    adjusted[symbol] = min(adjusted.get(symbol, label), label)
+            for i in np.flatnonzero(dividends > 0):
+                label = _date_label(batch_data.index[i])
+                column = int(columns[i])
+                if (label, 'dividend') in known:
+                    continue
+                earlier = np.flatnonzero(~np.isnan(quoted[:i]))
+                if earlier.size:
+                    previous_close = quoted[earlier[-1]]
+                else:
+                    # Ex-date on the first downloaded bar: use the stored close, split-consistent with the amount
+                    previous = self.raw[row, :column]
+                    previous = previous[~np.isnan(previous)]
+                    if not previous.size:
+                        continue
+                    previous_close = previous[-1] * self.split_factor[row, column - 1]
+                # Unit-free factor, fixed at ingestion time
+                factor = 1.0 - dividends[i] / previous_close if previous_close > dividends[i] else 1.0
+                self.events.setdefault(symbol, []).append({'date': label, 'type': 'dividend',
+                                                           'amount': float(dividends[i]), 'factor': float(factor)})
+                self.dividend_factor[row, :column] *= factor
+                adjusted[symbol] = min(adjusted.get(symbol, label), label)
+            if symbol in adjusted:
+                self.events[symbol].sort(key=lambda event: event['date'])
+        if keep_since is not None:
+            self._trim(keep_since)
+        return adjusted
+
+    def drop(self, symbols):
+        """Forgets symbols (rows and events), e.g. once nothing references them any more."""
+        drop = set(symbols)
+        keep = [i for i, symbol in enumerate(self.symbols) if symbol not in drop]
+        if len(keep) == len(self.symbols):
+            return
+        self.symbols = [self.symbols[i] for i in keep]
+        self.raw, self.split_factor, self.dividend_factor = self.raw[keep], self.split_factor[keep], self.dividend_factor[keep]
+        self.events = {symbol: events for symbol, events in self.events.items() if symbol not in drop}
+
+    def _trim(self, keep_since):
+        """Drops bars before `keep_since` (events stay recorded; factors are already cumulative)."""
+        start = int(self.dates.searchsorted(keep_since, side='left'))
+        if start > 0:
+            self.dates = self.dates[start:]
+            self.raw = self.raw[:, start:]
+            self.split_factor = self.split_factor[:, start:]
+            self.dividend_factor = self.dividend_factor[:, start:]
+
+    # --- Output ---
+    def adjusted_close(self):
+        """Returns the (symbols, dates) adjusted close matrix."""
+        factor = self.split_factor * self.dividend_factor if ADJUST_DIVIDENDS else self.split_factor
+        return self.raw * factor
+
+    def adjusted_frame(self, symbols=None):
+        """Returns the adjusted closes as a ticker-grouped DataFrame (the download layout write_panel takes)."""
+        rows = range(len(self.symbols)) if symbols is None else [self.symbols.index(s) for s in symbols if s in self.symbols]
+        adjusted = self.adjusted_close()
+        return pd.concat({self.symbols[i]: pd.DataFrame({'Close': adjusted[i]}, index=self.dates) for i in rows}, axis=1)
+
+    def symbol_events(self, symbol):
+        """Returns the recorded events of a symbol, oldest first."""
+        return list(self.events.get(symbol, []))
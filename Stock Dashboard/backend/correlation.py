@@ -0,0 +1,142 @@
+"""Rolling return correlation/covariance over the panel universe, updated per new bar.
+
+For one period window the engine keeps four symbols x symbols sums over the daily
+log returns, with pairwise-complete masks (a pair only uses the days on which both
+symbols have a return, like pandas `.corr()`):
+
+    count[i, j]  = sum m_i m_j        sum[i, j]    = sum x_i m_j
+    sum_sq[i, j] = sum x_i^2 m_j      cross[i, j]  = sum x_i x_j
+
+When the window moves by a bar, the dropped day is subtracted and the new one added
+(rank-1 updates), so a refresh costs O(symbols^2) per changed day instead of a
+rebuild over the whole window. Sums are accumulated, and matrices extracted, in
+blocks of symbols to bound the temporaries for universes of thousands of symbols.
+
+The sums, like the panel closes they come from, are float32 (counts are exact up
+to 2^24 days), which halves the four matrices: about 144MB per period at 3000
+symbols. A refresh only re-reads the returns of the last REVISION_DAYS; earlier
+days of the window are taken from the engine's own copy.
+"""
+import threading
+
+from lazy_imports import lazy_import
+from portfolio import trading_calendar, trading_day_closes
+
+np = lazy_import('numpy')
+
+CORRELATION_PERIODS = {'1m': 30, '3m': 91, '6m': 182, '1y': 365, '2y': 730, '3y': 1095, '5y': 1825} # Calendar days
+BLOCK_SIZE = 512
+MAX_INCREMENTAL_UPDATES = 250 # Rebuild from scratch after this many updates to bound rounding drift
+# Bars are only revised by the incremental refresh (the last month); a split or dividend
+# re-adjustment rescales older closes, which leaves their log returns unchanged
+REVISION_DAYS = 35
+
+def window_returns(panels, period, since_day=None):
+    """Returns (symbols, days, (days, symbols) float32 log returns) for the last `period` of every panel symbol.
+
+    Returns are NaN where a symbol has no close on a day or the day before. With `since_day`,
+    only the returns of the window days from it on are read: they are the last rows of `days`.
+    """
+    symbols = list(dict.fromkeys(symbol for panel in panels for symbol in panel.symbols))
+    days = trading_calendar(panels, symbols)
+    if len(days) < 2:
+        return symbols, days[:0], np.empty((0, len(symbols)), dtype=np.float32)
+    start = max(int(np.searchsorted(days, days[-1] - CORRELATION_PERIODS[period], side='right')), 1)
+    first = start if since_day is None else max(start, int(np.searchsorted(days, since_day, side='left')))
+    # One bar before the first day read is the base of its return
+    _, symbols, closes = trading_day_closes(panels, symbols, days[first - 1:])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(closes), axis=1).astype(np.float32)
+    returns[~np.isfinite(returns)] = np.nan
+    return symbols, days[start:], np.ascontiguousarray(returns.T)
+
+class RollingCovariance:
+    """Pairwise-complete covariance sums of one return window, moved by adding and removing days."""
+
+    def __init__(self, symbols):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.days = np.empty(0, dtype=np.int64)
+        self.returns = np.empty((0, n), dtype=np.float32)
+        self.count, self.sum, self.sum_sq, self.cross = (np.zeros((n, n), dtype=np.float32) for _ in range(4))
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def _accumulate(self, returns, sign):
+        """Adds (sign=1) or removes (sign=-1) the given days, one block of symbol rows at a time."""
+        if not len(returns):
+            return
+        valid = ~np.isnan(returns)
+        x = np.where(valid, returns, np.float32(0.0))
+        m = valid.astype(np.float32)
+        xx = x * x
+        for start in range(0, len(self.symbols), BLOCK_SIZE):
+            block = slice(start, start + BLOCK_SIZE)
+            self.count[block] += sign * (m[:, block].T @ m)
+            self.sum[block] += sign * (x[:, block].T @ m)
+            self.sum_sq[block] += sign * (xx[:, block].T @ m)
+            self.cross[block] += sign * (x[:, block].T @ x)
+
+    def reread_since(self):
+        """Returns the first day whose returns the next update needs (None: the whole window)."""
+        with self._lock:
+            if not len(self.days) or self.updates >= MAX_INCREMENTAL_UPDATES:
+                return None
+            return int(self.days[-1]) - REVISION_DAYS
+
+    def update(self, days, returns):
+        """Moves the window to `days`/`returns`; returns 'full', 'incremental' or 'unchanged'.
+
+        `returns` may only hold the last days of the window (see `reread_since`); the days
+        before them are taken from the current window, or None is returned when they are not
+        all in it. Days that left the window, and days whose returns changed (a corrected
+        bar), are subtracted; new and changed days are added.
+        """
+        with self._lock:
+            kept = days[:len(days) - len(returns)]
+            if len(kept):
+                rows = np.searchsorted(self.days, kept)
+                if rows[-1] >= len(self.days) or not np.array_equal(self.days[rows], kept):
+                    return None
+                returns = np.concatenate([self.returns[rows], returns])
+            _, old_rows, new_rows = np.intersect1d(self.days, days, assume_unique=True, return_indices=True)
+            old, new = self.returns[old_rows], returns[new_rows]
+            same = ((old == new) | (np.isnan(old) & np.isnan(new))).all(axis=1)
+            removed = np.setdiff1d(np.arange(len(self.days)), old_rows[same])
+            added = np.setdiff1d(np.arange(len(days)), new_rows[same])
+            if not len(removed) and not len(added):
+                return 'unchanged'
+            if len(removed) + len(added) > len(days) // 2 or self.updates >= MAX_INCREMENTAL_UPDATES:
+                for matrix in (self.count, self.sum, self.sum_sq, self.cross):
+                    matrix.fill(0.0)
+                self._accumulate(returns, 1.0)
+                self.updates, mode = 0, 'full'
+            else:
+                self._accumulate(self.returns[removed], -1.0)
+                self._accumulate(returns[added], 1.0)
+                self.updates, mode = self.updates + 1, 'incremental'
+            self.days, self.returns = np.array(days, dtype=np.int64), np.array(returns, dtype=np.float32)
+            return mode
+
+    def matrices(self, rows):
+        """Returns (correlation, covariance, observations) for the given symbol rows, block by block."""
+        rows = np.asarray(rows, dtype=np.int64)
+        k = len(rows)
+        correlation, covariance, observations = np.empty((k, k)), np.empty((k, k)), np.empty((k, k))
+        with self._lock:
+            for start in range(0, k, BLOCK_SIZE):
+                block = slice(start, start + BLOCK_SIZE)
+                ix, iy = np.ix_(rows[block], rows), np.ix_(rows, rows[block])
+                n = self.count[ix].astype(float)
+                sx, sy = self.sum[ix].astype(float), self.sum[iy].T.astype(float)
+                sxx, syy = self.sum_sq[ix].astype(float), self.sum_sq[iy].T.astype(float)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    cov = np.where(n > 1, (self.cross[ix] - sx * sy / n) / (n - 1), np.nan)
+                    var_x = (sxx - sx * sx / n) / (n - 1)
+                    var_y = (syy - sy * sy / n) / (n - 1)
+                    corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+                corr[~(var_x > 0) | ~(var_y > 0)] = np.nan
+                correlation[block], covariance[block], observations[block] = corr, cov, n
+        diagonal = np.arange(k)
+        correlation[diagonal, diagonal] = np.where(np.diag(covariance) > 0, 1.0, np.nan)
+        return correlation, covariance, observations
@@ -0,0 +1,59 @@
+"""Point-budget downsampling for chart histories.
+
+Both methods return the *indices* to keep, so several lines sharing one date
+axis (e.g. EMA13/EMA21) can be reduced with the indices of their primary line.
+"""
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+def lttb_indices(y, n_out, x=None):
+    """Largest-Triangle-Three-Buckets: keeps the points that best preserve the visual shape."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    every = (n - 2) / (n_out - 2)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        range_start = int(np.floor(i * every)) + 1
+        range_end = int(np.floor((i + 1) * every)) + 1
+        areas = np.abs((x[a] - avg_x) * (y[range_start:range_end] - y[a])
+                       - (x[a] - x[range_start:range_end]) * (avg_y - y[a]))
+        a = range_start + int(np.argmax(areas))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+def minmax_indices(y, n_out):
+    """Min/max bucketing: keeps each bucket's extremes (never hides a spike), fully vectorized."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    bucket_size = int(np.ceil(n / ((n_out - 2) // 2)))
+    n_buckets = int(np.ceil(n / bucket_size))
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+    offsets = np.arange(n_buckets) * bucket_size
+    picks = np.concatenate(([0, n - 1], offsets + np.nanargmin(buckets, axis=1), offsets + np.nanargmax(buckets, axis=1)))
+    return np.unique(picks)
+
+def downsample_indices(y, n_out, method='lttb'):
+    """Returns the indices of `y` to keep for a budget of about `n_out` points."""
+    if method == 'minmax':
+        return minmax_indices(y, n_out)
+    return lttb_indices(y, n_out)
@@ -0,0 +1,141 @@
+"""Indicator engine: EMA13/21/100/200, RSI14 and the 100-bar log Z-score.
+
+`calculate_indicators` computes everything for a price frame. The array API
+(`compute_indicator_arrays` / `extend_indicator_arrays`) keeps the recursive
+state (EMAs, RSI average gain/loss) so that when only the last few bars change,
+just those bars are recomputed from the state of the bar before them.
+"""
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+EMA_SPANS = (13, 21, 100, 200)
+RSI_COM = 13 # RSI14 smoothing (alpha = 1/14)
+ZSCORE_WINDOW = 100
+INDICATOR_COLUMNS = ['EMA13', 'EMA21', 'EMA100', 'EMA200', 'RSI14', 'Z_Score_100']
+STATE_COLUMNS = ['_avg_gain', '_avg_loss'] # RSI recursion state, not part of the payload
+MAX_INCREMENTAL_BARS = 32 # Beyond this a vectorized full recompute is cheaper
+
+def calculate_indicators(df):
+    """Calculates EMA13, EMA21, EMA100, EMA200, and RSI14 for a given DataFrame."""
+    if df.empty or 'Close' not in df.columns:
+        return pd.DataFrame({'EMA13': [], 'EMA21': [], 'EMA100': [], 'EMA200': [], 'RSI14': []})
+
+    result = pd.DataFrame(index=df.index)
+    close_series = df['Close'].astype(float)
+
+    result['EMA13'] = close_series.ewm(span=13, adjust=False).mean()
+    result['EMA21'] = close_series.ewm(span=21, adjust=False).mean()
+    result['EMA100'] = close_series.ewm(span=100, adjust=False).mean()
+    result['EMA200'] = close_series.ewm(span=200, adjust=False).mean()
+
+    # Logarithmic Z-Score Calculation (100-day)
+    # Drop NaNs to ensure rolling window doesn't fail due to a single missing value
+    clean_close_series = close_series.dropna()
+    log_close = np.log(clean_close_series)
+    sma100_log = log_close.rolling(window=100).mean()
+    std100_log = log_close.rolling(window=100).std()
+    z_score_series = (log_close - sma100_log) / std100_log
+    # Reindex to match the original result DataFrame's index
+    result['Z_Score_100'] = z_score_series.reindex(result.index)
+
+    delta = close_series.diff()
+    gain = delta.where(delta > 0, 0.0)
+    loss = -delta.where(delta < 0, 0.0)
+    avg_gain = gain.ewm(com=13, adjust=False).mean()
+    avg_loss = loss.ewm(com=13, adjust=False).mean()
+    rs = avg_gain / avg_loss
+    result['RSI14'] = 100.0 - (100.0 / (1.0 + rs.replace(np.inf, np.nan)))
+    result['RSI14'] = result['RSI14'].fillna(50)
+
+    return result[['EMA13', 'EMA21', 'EMA100', 'EMA200', 'RSI14', 'Z_Score_100']]
+
+# --- Incremental Array API (NaN-free closes) ---
+def compute_indicator_arrays(close):
+    """Computes indicator and state arrays for a NaN-free float64 close array."""
+    close_series = pd.Series(close, copy=False)
+    arrays = {column: values.to_numpy() for column, values in calculate_indicators(close_series.to_frame('Close')).items()}
+    delta = close_series.diff()
+    arrays['_avg_gain'] = delta.where(delta > 0, 0.0).ewm(com=RSI_COM, adjust=False).mean().to_numpy()
+    arrays['_avg_loss'] = (-delta.where(delta < 0, 0.0)).ewm(com=RSI_COM, adjust=False).mean().to_numpy()
+    return arrays
+
+def extend_indicator_arrays(close, previous, start):
+    """Recomputes indicators for bars `start:` of `close`, reusing `previous` for the bars before.
+
+    `previous` must have been computed for a close array identical to `close[:start]`.
+    Falls back to a full vectorized recompute when too many bars changed.
+    """
+    n = len(close)
+    if previous is None or start <= 0 or n - start > MAX_INCREMENTAL_BARS or start > len(previous['EMA13']):
+        return compute_indicator_arrays(close)
+    arrays = {}
+    for column in INDICATOR_COLUMNS + STATE_COLUMNS:
+        arrays[column] = np.empty(n)
+        arrays[column][:start] = previous[column][:start]
+
+    log_offset = max(start - ZSCORE_WINDOW + 1, 0)
+    log_close = np.log(close[log_offset:])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for t in range(start, n):
+            state = {column: arrays[column][t - 1] for column in STATE_COLUMNS + INDICATOR_COLUMNS[:4]}
+            for column, value in _step(state, close[t - 1], close[t]).items():
+                arrays[column][t] = value
+            if t + 1 >= ZSCORE_WINDOW:
+                arrays['Z_Score_100'][t] = _zscore(log_close[t + 1 - ZSCORE_WINDOW - log_offset:t + 1 - log_offset])
+            else:
+                arrays['Z_Score_100'][t] = np.nan
+    return arrays
+
+def _step(state, previous_close, price):
+    """Advances the EMA/RSI recursion by one bar from the previous bar's values."""
+    values = {}
+    for span in EMA_SPANS:
+        alpha = 2.0 / (span + 1)
+        column = f'EMA{span}'
+        values[column] = alpha * price + (1 - alpha) * state[column]
+    rsi_alpha = 1.0 / (1 + RSI_COM)
+    delta = price - previous_close
+    avg_gain = (1 - rsi_alpha) * state['_avg_gain'] + rsi_alpha * max(delta, 0.0)
+    avg_loss = (1 - rsi_alpha) * state['_avg_loss'] + rsi_alpha * max(-delta, 0.0)
+    values['_avg_gain'] = avg_gain
+    values['_avg_loss'] = avg_loss
+    # Same conventions as calculate_indicators: gains without losses read as 100, no movement as 50
+    if avg_loss > 0:
+        values['RSI14'] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    else:
+        values['RSI14'] = 100.0 if avg_gain > 0 else 50.0
+    return values
+
+def _zscore(log_window):
+    return (log_window[-1] - log_window.mean()) / log_window.std(ddof=1)
+
+def provisional_values(close, arrays, price, replace_last):
+    """Indicator values of a provisional bar at `price` that replaces (or follows) the last bar.
+
+    Only the recursion state of the bar before it and the last Z-score window are read,
+    so the cost does not depend on the history length and nothing is copied.
+    """
+    t = len(close) - 1 if replace_last else len(close)
+    if t < 1:
+        return None
+    state = {column: arrays[column][t - 1] for column in STATE_COLUMNS + INDICATOR_COLUMNS[:4]}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = _step(state, close[t - 1], price)
+        if t + 1 >= ZSCORE_WINDOW:
+            values['Z_Score_100'] = _zscore(np.log(np.append(close[t + 1 - ZSCORE_WINDOW:t], price)))
+        else:
+            values['Z_Score_100'] = np.nan
+    return values
+
+def first_changed_bar(old_keys, old_close, new_keys, new_close):
+    """Returns the first bar index where two (key, close) sequences differ (len if identical)."""
+    common = min(len(old_keys), len(new_keys))
+    differs = (old_keys[:common] != new_keys[:common]) | (old_close[:common] != new_close[:common])
+    changed = np.flatnonzero(differs)
+    return int(changed[0]) if changed.size else common
+
+def indicator_frame(arrays, index):
+    """Wraps indicator arrays as the DataFrame returned by calculate_indicators."""
+    return pd.DataFrame({column: arrays[column] for column in INDICATOR_COLUMNS}, index=index, copy=False)
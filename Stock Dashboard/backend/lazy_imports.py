@@ -0,0 +1,34 @@
+"""Deferred imports for heavy libraries.
+
+pandas, numpy and yfinance take seconds to import on a cold start. Modules bind
+them through `lazy_import` so the server can answer from the persisted snapshot
+before any of them are loaded; the real import happens on first attribute access.
+"""
+import importlib
+import threading
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module if self._module is not None else self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_import(name):
+    """Returns a proxy for module `name` that imports it on first use."""
+    return LazyModule(name)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Local load-testing harness for the dashboard API.
+
+Launches app.py in a subprocess against a stubbed, latency-configurable data
+provider, simulates N dashboards polling on the frontend's 60-second cadence
+(plus occasional popup/period-switch requests), and writes a JSON report with
+throughput, p50/p95/p99 latency, error rate and server RSS over time.
+
+    python loadtest.py run --clients 200 --duration 300 --label baseline
+    python loadtest.py run --clients 200 --interval 5 --env RUN_SCHEDULER=0 --label readers
+    python loadtest.py compare loadtest_reports/a.json loadtest_reports/b.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_DIR = os.path.join(BACKEND_DIR, 'loadtest_reports')
+POLL_PATH = '/api/dashboard-data'
+# What a popup/period switch in the UI costs the server: a non-default drawdown window,
+# or a downsampled multi-year chart history ({symbol} is filled in per request)
+POPUP_PATHS = [
+    '/api/dashboard-data?drawdown_period=3m',
+    '/api/dashboard-data?drawdown_period=5y',
+    '/api/history/{symbol}?series=cumulative&period=5y&points=500',
+    '/api/history/{symbol}?series=drawdown&period=3y&points=500',
+    '/api/history/{symbol}?series=ema&period=2y&points=500',
+]
+POPUP_SYMBOLS = ['SPY', 'AAPL', 'NVDA', 'TSLA', 'BTC-USD']
+
+# --- Stub Data Provider (server side) ---
+def make_stub_download(latency_ms, jitter_ms):
+    """Returns a drop-in for app.download_history serving synthetic random walks after a delay."""
+    import numpy as np
+    import pandas as pd
+
+    def stub_download(symbols, period='5y'):
+        time.sleep(max(latency_ms + random.uniform(-jitter_ms, jitter_ms), 0) / 1000.0)
+        # Shorter periods are the tail of the same 5y walk, so incremental fetches line up
+        years = {'y': 1.0, 'mo': 1 / 12, 'd': 1 / 365}
+        unit = next(u for u in years if period.endswith(u))
+        fraction = int(period[:-len(unit)]) * years[unit] / 5
+        end = pd.Timestamp.now(tz='UTC').normalize()
+        frames = {}
+        for symbol in symbols:
+            crypto = symbol.endswith('-USD')
+            index = pd.date_range(end=end, periods=(365 if crypto else 252) * 5, freq='D' if crypto else 'B')
+            rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+            close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(index))))
+            frame = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                                  'Adj Close': close, 'Volume': 1e6, 'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+            frames[symbol] = frame.iloc[-max(int(len(index) * fraction), 1):]
+        return pd.concat(frames, axis=1)
+
+    return stub_download
+
+def make_stub_quotes(latency_ms, jitter_ms):
+    """Returns a drop-in for app.fetch_quotes: the stub walk's last close plus a little noise, stamped now."""
+    import pandas as pd
+    stub_download = make_stub_download(0, 0)
+
+    def stub_quotes(symbols):
+        time.sleep(max(latency_ms + random.uniform(-jitter_ms, jitter_ms), 0) / 1000.0)
+        last = stub_download(symbols, '1d')
+        now = pd.Timestamp.now(tz='UTC')
+        return {symbol: (float(last[symbol]['Close'].iloc[-1]) * random.uniform(0.99, 1.01), now) for symbol in symbols}
+
+    return stub_quotes
+
+def serve(args):
+    """Runs the Flask app with the stub provider (invoked as a subprocess by `run`)."""
+    sys.path.insert(0, BACKEND_DIR)
+    import app as dashboard_app
+    from scheduler import always_open_calendar
+    from werkzeug.serving import make_server
+
+    dashboard_app.download_history = make_stub_download(args.latency_ms, args.jitter_ms)
+    dashboard_app.fetch_quotes = make_stub_quotes(args.latency_ms, args.jitter_ms)
+    if args.always_open:
+        # Keep equities refreshing regardless of the real market calendar
+        for schedule in dashboard_app.refresh_scheduler.schedules.values():
+            schedule.calendar = always_open_calendar
+    server = make_server('127.0.0.1', args.port, dashboard_app.app, threaded=not args.single_threaded)
+    print(f"Load test server listening on 127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
+
+# --- Measurements (client side) ---
+def read_rss_kb(pid):
+    """Returns the resident set size of a process in kB (Linux /proc, else psutil if installed)."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss // 1024
+    except Exception:
+        return None
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(samples, duration):
+    """Builds throughput/latency/error stats from (kind, started, latency_ms, ok) samples."""
+    summary = {}
+    for kind in sorted({s[0] for s in samples}) + ['all']:
+        kind_samples = [s for s in samples if kind == 'all' or s[0] == kind]
+        latencies = sorted(s[2] for s in kind_samples)
+        errors = sum(1 for s in kind_samples if not s[3])
+        summary[kind] = {
+            'requests': len(kind_samples),
+            'throughput_rps': round(len(kind_samples) / duration, 3) if duration else None,
+            'error_rate': round(errors / len(kind_samples), 4) if kind_samples else None,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1] if latencies else None,
+        }
+    return summary
+
+def wait_for_server(base_url, proc, timeout):
+    """Waits until the server accepts connections (the first API response may still be slow)."""
+    host, port = base_url.split('//')[1].split(':')
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            with socket.create_connection((host, int(port)), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+def client_loop(base_url, args, stop_at, samples, lock, client_id):
+    """One simulated dashboard: polls on the frontend cadence, sometimes opening a popup."""
+    rng = random.Random(args.seed + client_id)
+    next_poll = time.monotonic() + rng.uniform(0, args.interval) # Dashboards are not synchronized
+    while True:
+        now = time.monotonic()
+        if now >= stop_at:
+            return
+        if now < next_poll:
+            time.sleep(min(next_poll - now, stop_at - now))
+            continue
+        requests_to_send = [('poll', POLL_PATH)]
+        if rng.random() < args.popup_rate:
+            requests_to_send.append(('popup', rng.choice(POPUP_PATHS).format(symbol=rng.choice(POPUP_SYMBOLS))))
+        for kind, path in requests_to_send:
+            started = time.monotonic()
+            ok = False
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=args.timeout) as response:
+                    response.read()
+                    ok = 200 <= response.status < 300
+            except (urllib.error.URLError, OSError):
+                ok = False
+            latency_ms = round((time.monotonic() - started) * 1000, 2)
+            with lock:
+                samples.append((kind, started, latency_ms, ok))
+        next_poll += args.interval
+
+def run(args):
+    """Starts the stubbed server, drives the simulated clients and writes the report."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    base_url = f'http://127.0.0.1:{port}'
+
+    env = dict(os.environ)
+    env.setdefault('PANEL_DIR', tempfile.mkdtemp(prefix='loadtest-cache-'))
+    env['EQUITY_REFRESH_SECONDS'] = str(args.refresh_seconds)
+    env['CRYPTO_REFRESH_SECONDS'] = str(args.refresh_seconds)
+    env['QUOTE_REFRESH_SECONDS'] = str(args.quote_seconds)
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+    server_cmd = [sys.executable, os.path.abspath(__file__), 'serve', '--port', str(port),
+                  '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms)]
+    if args.always_open:
+        server_cmd.append('--always-open')
+    if args.single_threaded:
+        server_cmd.append('--single-threaded')
+    os.makedirs(env['PANEL_DIR'], exist_ok=True) # A fresh PANEL_DIR (or one passed via --env) may not exist yet
+    server_log = open(os.path.join(env['PANEL_DIR'], 'server.log'), 'w')
+    proc = subprocess.Popen(server_cmd, cwd=BACKEND_DIR, env=env, stdout=server_log, stderr=subprocess.STDOUT)
+
+    samples = []
+    rss_timeline = []
+    lock = threading.Lock()
+    try:
+        wait_for_server(base_url, proc, timeout=60)
+        if args.warmup:
+            # One blocking request so the first refresh is not counted as client latency
+            urllib.request.urlopen(base_url + POLL_PATH, timeout=args.timeout).read()
+        print(f"Load test: {args.clients} clients, {args.interval}s cadence, {args.duration}s, "
+              f"provider latency {args.latency_ms}ms")
+        started = time.monotonic()
+        stop_at = started + args.duration
+        threads = [threading.Thread(target=client_loop, args=(base_url, args, stop_at, samples, lock, i), daemon=True)
+                   for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        while time.monotonic() < stop_at:
+            rss_timeline.append({'t': round(time.monotonic() - started, 1), 'rss_kb': read_rss_kb(proc.pid)})
+            time.sleep(args.rss_interval)
+        for thread in threads:
+            thread.join(timeout=args.timeout + 1)
+        duration = time.monotonic() - started
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        server_log.close()
+
+    rss_values = [point['rss_kb'] for point in rss_timeline if point['rss_kb'] is not None]
+    report = {
+        'label': args.label,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'clients': args.clients, 'interval': args.interval, 'duration': args.duration,
+            'popup_rate': args.popup_rate, 'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms,
+            'refresh_seconds': args.refresh_seconds,
+            'quote_seconds': args.quote_seconds, 'always_open': args.always_open,
+            'single_threaded': args.single_threaded, 'env': args.env,
+        },
+        'summary': summarize(samples, duration),
+        'rss': {
+            'start_kb': rss_values[0] if rss_values else None,
+            'peak_kb': max(rss_values) if rss_values else None,
+            'end_kb': rss_values[-1] if rss_values else None,
+            'timeline': rss_timeline,
+        },
+    }
+    os.makedirs(args.report_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    report_path = os.path.join(args.report_dir, f'{stamp}-{args.label}.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"Report written to {report_path}")
+
+# --- Reporting ---
+def print_summary(report):
+    """Prints one line per request kind plus RSS figures."""
+    print(f"\n[{report['label']}]")
+    print(f"{'kind':<8}{'reqs':>8}{'rps':>9}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for kind, stats in report['summary'].items():
+        err = f"{stats['error_rate'] * 100:.2f}" if stats['error_rate'] is not None else '-'
+        print(f"{kind:<8}{stats['requests']:>8}{stats['throughput_rps'] or 0:>9.2f}{err:>8}"
+              f"{stats['p50_ms'] or 0:>9.1f}{stats['p95_ms'] or 0:>9.1f}{stats['p99_ms'] or 0:>9.1f}")
+    rss = report['rss']
+    if rss['peak_kb'] is not None:
+        print(f"RSS: start {rss['start_kb'] / 1024:.1f} MB, peak {rss['peak_kb'] / 1024:.1f} MB, end {rss['end_kb'] / 1024:.1f} MB")
+
+def compare(args):
+    """Prints the summaries of several reports side by side."""
+    reports = []
+    for path in args.reports:
+        with open(path) as f:
+            reports.append(json.load(f))
+    metrics = ['throughput_rps', 'error_rate', 'p50_ms', 'p95_ms', 'p99_ms']
+    print(f"{'metric':<22}" + ''.join(f"{r['label'][:16]:>18}" for r in reports))
+    for metric in metrics:
+        values = [r['summary'].get('all', {}).get(metric) for r in reports]
+        print(f"{metric:<22}" + ''.join(f"{v if v is not None else '-':>18}" for v in values))
+    peaks = [r['rss']['peak_kb'] for r in reports]
+    print(f"{'rss_peak_mb':<22}" + ''.join(f"{round(p / 1024, 1) if p else '-':>18}" for p in peaks))
+
+# --- Main Execution ---
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run a load test and write a report')
+    run_parser.add_argument('--clients', type=int, default=50, help='Simulated dashboards')
+    run_parser.add_argument('--interval', type=float, default=60, help='Poll cadence in seconds (frontend uses 60)')
+    run_parser.add_argument('--duration', type=float, default=180, help='Test duration in seconds')
+    run_parser.add_argument('--popup-rate', type=float, default=0.1, help='Chance per poll of a popup/period-switch request')
+    run_parser.add_argument('--latency-ms', type=float, default=500, help='Stub provider latency per download')
+    run_parser.add_argument('--jitter-ms', type=float, default=100, help='Stub provider latency jitter')
+    run_parser.add_argument('--refresh-seconds', type=int, default=60, help='Scheduler cadence for both asset classes')
+    run_parser.add_argument('--quote-seconds', type=int, default=60, help='Live quote overlay cadence')
+    run_parser.add_argument('--always-open', action='store_true', help='Ignore the market calendar in the server')
+    run_parser.add_argument('--single-threaded', action='store_true', help='Serve requests on one thread')
+    run_parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE', help='Extra server environment')
+    run_parser.add_argument('--timeout', type=float, default=30, help='Client request timeout in seconds')
+    run_parser.add_argument('--rss-interval', type=float, default=1.0, help='Seconds between RSS samples')
+    run_parser.add_argument('--no-warmup', dest='warmup', action='store_false', help='Count the first refresh in the results')
+    run_parser.add_argument('--seed', type=int, default=0, help='Client randomness seed')
+    run_parser.add_argument('--label', default='run', help='Report label')
+    run_parser.add_argument('--report-dir', default=REPORT_DIR, help='Where reports are written')
+    run_parser.set_defaults(func=run)
+
+    serve_parser = subparsers.add_parser('serve', help=argparse.SUPPRESS)
+    serve_parser.add_argument('--port', type=int, required=True)
+    serve_parser.add_argument('--latency-ms', type=float, default=500)
+    serve_parser.add_argument('--jitter-ms', type=float, default=100)
+    serve_parser.add_argument('--always-open', action='store_true')
+    serve_parser.add_argument('--single-threaded', action='store_true')
+    serve_parser.set_defaults(func=serve)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare saved reports')
+    compare_parser.add_argument('reports', nargs='+')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+"""Portfolio holdings (accounts -> lots) and a vectorized P&L engine.
+
+A lot is a quantity of one symbol bought on a date for a total cost basis. The
+engine lays every lot against one aligned, forward-filled close matrix
+(symbols x calendar days) and aggregates lots into accounts with
+`np.add.reduceat`, so a refresh costs a few array operations over
+lots x changed days, never a Python loop per position.
+
+Returns are time-weighted: the day-t return of an account is the P&L of the
+lots it held at t-1 divided by their t-1 value, so buying a lot is a cash flow,
+not a gain. Quantities and costs are per current share (the panels are
+split-adjusted).
+"""
+import json
+import math
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from lazy_imports import lazy_import
+from price_panel import atomic_write_json
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+HISTORY_DAYS = 366 # Calendar days of value/return/drawdown history kept per account
+
+def _day_number(date_str):
+    return int((pd.Timestamp(date_str, tz='UTC') - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1))
+
+def _day_label(day):
+    return datetime.fromtimestamp(int(day) * 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+
+def day_labels(days):
+    """Formats UTC day numbers as 'YYYY-MM-DD' labels."""
+    return pd.to_datetime(np.asarray(days, dtype=np.int64), unit='D').strftime('%Y-%m-%d').tolist()
+
+# --- Holdings ---
+class Holdings:
+    """Accounts and their lots, persisted as one JSON file.
+
+    `valid_symbols` is a callable returning the symbols a lot may use, asked on every
+    `add_lot` so symbols added to the tracked universe later are accepted.
+    """
+
+    def __init__(self, path, valid_symbols=None):
+        self.path = path
+        self.valid_symbols = valid_symbols
+        self.accounts = {} # account id -> {'name', 'lots': [lot dicts]}
+        self.version = 0   # Bumped on every change; the engine recomputes fully when it moves
+        self._mtime = None
+        self._arrays = None # (version, lot_arrays() result)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path) as f:
+                self.accounts = json.load(f).get('accounts', {})
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.path):
+                print(f"Portfolio: Could not load holdings: {e}")
+        self.version += 1
+
+    def reload_if_changed(self):
+        """Picks up holdings edited by another worker process."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                self._load()
+
+    def _save(self):
+        atomic_write_json(self.path, {'accounts': self.accounts})
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self.version += 1
+
+    def add_lot(self, account_id, data):
+        """Validates and stores a lot ({symbol, quantity, cost_basis, acquired?}); returns it."""
+        if not isinstance(data, dict):
+            raise ValueError("A lot must be a JSON object")
+        symbol = str(data.get('symbol', '')).upper()
+        if not symbol or (self.valid_symbols is not None and symbol not in self.valid_symbols()):
+            raise ValueError(f"Unknown symbol '{symbol}'")
+        try:
+            quantity = float(data['quantity'])
+            cost_basis = float(data['cost_basis'])
+        except KeyError as e:
+            raise ValueError(f"Missing field {e}") from None
+        except (TypeError, ValueError):
+            raise ValueError("quantity and cost_basis must be numbers") from None
+        if not (math.isfinite(quantity) and quantity > 0 and math.isfinite(cost_basis) and cost_basis >= 0):
+            raise ValueError("quantity must be a finite number > 0 and cost_basis a finite number >= 0")
+        acquired = data.get('acquired') or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        try:
+            acquired = pd.Timestamp(acquired).strftime('%Y-%m-%d')
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid acquired date '{acquired}'") from None
+        lot = {'id': data.get('id') or uuid.uuid4().hex[:12], 'symbol': symbol, 'quantity': quantity,
+               'cost_basis': cost_basis, 'acquired': acquired}
+        self.reload_if_changed()
+        with self._lock:
+            account = self.accounts.setdefault(account_id, {'name': data.get('account_name') or account_id, 'lots': []})
+            account['lots'] = [existing for existing in account['lots'] if existing['id'] != lot['id']] + [lot]
+            self._save()
+        return lot
+
+    def remove_lot(self, account_id, lot_id):
+        """Deletes a lot (and the account once empty); returns False if it did not exist."""
+        self.reload_if_changed()
+        with self._lock:
+            account = self.accounts.get(account_id)
+            if account is None or not any(lot['id'] == lot_id for lot in account['lots']):
+                return False
+            account['lots'] = [lot for lot in account['lots'] if lot['id'] != lot_id]
+            if not account['lots']:
+                del self.accounts[account_id]
+            self._save()
+        return True
+
+    def lot_arrays(self):
+        """Returns (account ids, symbols, per-lot arrays) with lots grouped by account (cached per version)."""
+        cached = self._arrays
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        with self._lock:
+            version = self.version
+            accounts = sorted(account_id for account_id, account in self.accounts.items() if account['lots'])
+            lots = [(i, lot) for i, account_id in enumerate(accounts) for lot in self.accounts[account_id]['lots']]
+        symbols = sorted({lot['symbol'] for _, lot in lots})
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        arrays = {
+            'account': np.array([i for i, _ in lots], dtype=np.int64),
+            'symbol': np.array([symbol_index[lot['symbol']] for _, lot in lots], dtype=np.int64),
+            'quantity': np.array([lot['quantity'] for _, lot in lots], dtype=float),
+            'cost': np.array([lot['cost_basis'] for _, lot in lots], dtype=float),
+            'acquired': np.array([_day_number(lot['acquired']) for _, lot in lots], dtype=np.int64),
+        }
+        self._arrays = (version, (accounts, symbols, arrays))
+        return accounts, symbols, arrays
+
+# --- Price alignment ---
+def panel_days(panel):
+    """Returns the panel's bar dates as UTC day numbers."""
+    return np.asarray((panel.dates - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1), dtype=np.int64)
+
+def asof_closes(panel, symbols, days):
+    """Returns a (symbols, days) matrix of each symbol's last valid close on or before each day (NaN before its first).
+
+    Only the panel bars from the one in effect on the first day onwards are read.
+    """
+    field = panel.fields.index('Close')
+    rows = [panel.symbols.index(symbol) for symbol in symbols]
+    # The last bar on or before each day (-1 = none yet)
+    position = np.searchsorted(panel_days(panel), days, side='right') - 1
+    first = max(int(position.min()), 0) if len(position) else 0
+    values = np.asarray(panel.data[rows, field, first:], dtype=float)
+    # A gap on the first bar read is filled from the symbol's last close before it
+    if first:
+        for i in np.flatnonzero(np.isnan(values[:, 0])):
+            earlier = np.asarray(panel.data[rows[i], field, :first], dtype=float)
+            earlier = earlier[~np.isnan(earlier)]
+            if len(earlier):
+                values[i, 0] = earlier[-1]
+    # Forward fill each symbol over its own panel calendar first (skips NaN gaps)
+    valid = ~np.isnan(values)
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(values.shape[1]), -1), axis=1)
+    filled = np.take_along_axis(values, np.maximum(last_valid, 0), axis=1)
+    filled[last_valid < 0] = np.nan
+    picked = filled[:, np.maximum(position - first, 0)]
+    picked[:, position < 0] = np.nan
+    return picked
+
+def _calendar_panel(panels, symbols):
+    """Returns (non-empty panels, symbols held by each, index of the panel holding most of `symbols`)."""
+    panels = [panel for panel in panels if len(panel.dates)]
+    held = [[symbol for symbol in symbols if symbol in panel] for panel in panels]
+    return panels, held, max(range(len(panels)), key=lambda i: len(held[i])) if any(held) else None
+
+def trading_calendar(panels, symbols):
+    """Returns the day numbers of the panel holding most of `symbols`, the calendar closes are aligned on."""
+    panels, _, calendar = _calendar_panel(panels, symbols)
+    return np.empty(0, dtype=np.int64) if calendar is None else panel_days(panels[calendar])
+
+def trading_day_closes(panels, symbols, days=None):
+    """Returns (days, symbols found, closes) on the calendar of the panel holding most of `symbols`.
+
+    Symbols of the other panels are sampled as of each of its dates (crypto closes on equity
+    trading days); symbols found in no panel are left out. `days` restricts the axis to part
+    of that calendar (see `trading_calendar`).
+    """
+    panels, held, calendar = _calendar_panel(panels, symbols)
+    if calendar is None:
+        return np.empty(0, dtype=np.int64), [], np.empty((0, 0))
+    if days is None:
+        days = panel_days(panels[calendar])
+    found, closes = [], []
+    for panel, panel_symbols in zip(panels, held):
+        panel_symbols = [symbol for symbol in panel_symbols if symbol not in found]
+        if panel_symbols:
+            found.extend(panel_symbols)
+            closes.append(asof_closes(panel, panel_symbols, days))
+    return days, found, np.vstack(closes)
+
+def align_closes(panels, symbols, since_day):
+    """Returns (days, closes): a calendar-day axis from `since_day` and a forward-filled (symbols, days) matrix.
+
+    Equities are carried over weekends and holidays so they line up with 24/7 crypto.
+    Symbols missing from every panel stay NaN (unpriced).
+    """
+    last_days = [int(panel_days(panel)[-1]) for panel in panels if len(panel.dates)]
+    if not last_days:
+        return np.empty(0, dtype=np.int64), np.empty((len(symbols), 0))
+    end_day = max(last_days)
+    # One bar of history before the window is needed as the first return's base
+    days = np.arange(min(since_day, end_day) - 1, end_day + 1, dtype=np.int64)
+    closes = np.full((len(symbols), len(days)), np.nan)
+    for panel in panels:
+        rows = [i for i, symbol in enumerate(symbols) if symbol in panel]
+        if rows:
+            closes[rows] = asof_closes(panel, [symbols[i] for i in rows], days)
+    return days, closes
+
+# --- Engine ---
+class PortfolioEngine:
+    """Per-account value, time-weighted return and drawdown histories, updated incrementally."""
+
+    def __init__(self):
+        self._state = None
+        self._lock = threading.Lock()
+
+    def update(self, holdings, panels, now_day=None):
+        """Recomputes from the first calendar day whose prices changed (everything if the holdings did)."""
+        accounts, symbols, lots = holdings.lot_arrays()
+        if now_day is None:
+            now_day = int(datetime.now(timezone.utc).timestamp() // 86400)
+        days, closes = align_closes(panels, symbols, now_day - HISTORY_DAYS)
+        with self._lock:
+            state = self._state
+        start = 1
+        if (state is not None and state['holdings_version'] == holdings.version and state['symbols'] == symbols
+                and len(state['days']) and len(days) and days[0] >= state['days'][0]):
+            start = self._first_changed_day(state, days, closes)
+            if start >= len(days):
+                return state
+        state = self._compute(state, accounts, symbols, lots, days, closes, start)
+        state['holdings_version'] = holdings.version
+        with self._lock:
+            self._state = state
+        return state
+
+    @staticmethod
+    def _first_changed_day(state, days, closes):
+        """First column of the new grid whose prices differ from (or extend past) the cached grid."""
+        offset = int(days[0] - state['days'][0])
+        overlap = min(len(state['days']) - offset, len(days))
+        if overlap <= 1:
+            return 1
+        old = state['closes'][:, offset:offset + overlap]
+        new = closes[:, :overlap]
+        differs = ~((old == new) | (np.isnan(old) & np.isnan(new)))
+        changed = np.flatnonzero(differs.any(axis=0))
+        return max(int(changed[0]) if changed.size else overlap, 1)
+
+    @staticmethod
+    def _compute(state, accounts, symbols, lots, days, closes, start):
+        """Fills value, P&L and return columns `start:`; earlier columns come from the cached state."""
+        n_accounts, n_days = len(accounts), len(days)
+        value = np.zeros((n_accounts, n_days))
+        pnl = np.zeros((n_accounts, n_days))
+        prev_value = np.zeros((n_accounts, n_days))
+        if start > 1:
+            offset = int(days[0] - state['days'][0])
+            for name, target in (('value', value), ('pnl', pnl), ('prev_value', prev_value)):
+                target[:, :start] = state[name][:, offset:offset + start]
+            pnl[:, 0] = prev_value[:, 0] = 0.0 # The first column has no prior day once the window rolls
+
+        if len(lots['account']) and n_days:
+            group_starts = np.flatnonzero(np.r_[True, lots['account'][1:] != lots['account'][:-1]])
+            group_accounts = lots['account'][group_starts]
+            window = slice(start - 1, n_days)
+            prices = np.nan_to_num(closes[lots['symbol'], window]) # (lots, days) from the day before `start`
+            held = lots['acquired'][:, None] <= days[None, window]
+            lot_value = lots['quantity'][:, None] * prices * held
+            # Day-t P&L of the lots already held at t-1 (new lots are flows, not gains)
+            lot_pnl = lots['quantity'][:, None] * np.diff(prices, axis=1) * held[:, :-1]
+            value[group_accounts, start - 1:] = np.add.reduceat(lot_value, group_starts, axis=0)
+            pnl[group_accounts, start:] = np.add.reduceat(lot_pnl, group_starts, axis=0)
+            prev_value[group_accounts, start:] = np.add.reduceat(lot_value[:, :-1], group_starts, axis=0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            daily_return = np.where(prev_value > 0, pnl / prev_value, 0.0)
+        daily_return[:, 0] = 0.0
+        index = np.cumprod(1.0 + daily_return, axis=1) # Time-weighted growth of 1
+        return {'accounts': accounts, 'symbols': symbols, 'lots': lots, 'days': days, 'closes': closes,
+                'value': value, 'pnl': pnl, 'prev_value': prev_value, 'index': index}
+
+def _baseline_column(days, start_day):
+    """Last column on or before `start_day` (0 if the window starts later)."""
+    return max(int(np.searchsorted(days, start_day, side='right')) - 1, 0)
+
+def summarize(state):
+    """Returns per-account summary arrays (all accounts at once) for the last calendar day."""
+    days, lots = state['days'], state['lots']
+    n_accounts = len(state['accounts'])
+    if not len(days):
+        return None
+    last = len(days) - 1
+    last_day = int(days[last])
+    year_start = _day_number(f"{_day_label(last_day)[:4]}-01-01")
+    ytd_base = _baseline_column(days, year_start - 1)
+    value, index = state['value'], state['index']
+
+    def per_account(weights):
+        return np.bincount(lots['account'], weights=weights, minlength=n_accounts) if len(lots['account']) else np.zeros(n_accounts)
+
+    held = lots['acquired'] <= last_day
+    cost = per_account(lots['cost'] * held)
+    flows_today = per_account(lots['cost'] * (lots['acquired'] == last_day))
+    flows_ytd = per_account(lots['cost'] * held * (lots['acquired'] > int(days[ytd_base])))
+    peak = np.maximum.accumulate(index, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'value': value[:, last],
+            'cost_basis': cost,
+            'unrealized_pnl': value[:, last] - cost,
+            'daily_pnl': value[:, last] - (value[:, last - 1] if last else 0.0) - flows_today,
+            'ytd_pnl': value[:, last] - value[:, ytd_base] - flows_ytd,
+            'ytd_return_pct': (index[:, last] / index[:, ytd_base] - 1) * 100,
+            'current_drawdown_pct': (index[:, last] / peak[:, last] - 1) * 100,
+            'as_of': _day_label(last_day),
+            'ytd_base': ytd_base,
+        }
+
+def position_weights(state, account):
+    """Returns [{symbol, quantity, value, cost_basis, weight_pct}] for one account on the last day."""
+    lots = state['lots']
+    mask = (lots['account'] == account) & (lots['acquired'] <= state['days'][-1])
+    symbols = lots['symbol'][mask]
+    prices = np.nan_to_num(state['closes'][symbols, -1])
+    n_symbols = len(state['symbols'])
+    quantity = np.bincount(symbols, weights=lots['quantity'][mask], minlength=n_symbols)
+    value = np.bincount(symbols, weights=lots['quantity'][mask] * prices, minlength=n_symbols)
+    cost = np.bincount(symbols, weights=lots['cost'][mask], minlength=n_symbols)
+    total = value.sum()
+    positions = []
+    for i in np.flatnonzero(quantity > 0):
+        positions.append({
+            'symbol': state['symbols'][i],
+            'quantity': float(quantity[i]),
+            'price': None if np.isnan(state['closes'][i, -1]) else float(state['closes'][i, -1]),
+            'value': float(value[i]),
+            'cost_basis': float(cost[i]),
+            'unrealized_pnl': float(value[i] - cost[i]),
+            'weight_pct': float(value[i] / total * 100) if total > 0 else 0.0,
+        })
+    return sorted(positions, key=lambda position: -position['value'])
@@ -0,0 +1,151 @@
+"""Memory-mapped float32 price panels shared across workers.
+
+One panel per trading calendar (equities, crypto) so 24/7 crypto dates never add
+NaN rows to equity columns. The data file is a float32 `.npy` array of shape
+(symbols, fields, dates) holding only the fields the dashboard uses; each symbol
+has an explicit [start, end) validity range on the panel's date axis. A small
+JSON manifest names the current data file and is swapped atomically, so readers
+in other processes always see a complete panel and read it zero-copy.
+"""
+import glob
+import json
+import os
+import time
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# --- Configuration ---
+PANEL_DIR = os.environ.get('PANEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache'))
+PANEL_FIELDS = ('Close',) # Only Close feeds the indicators, returns and charts
+PANEL_DTYPE = 'float32'
+KEEP_OLD_PANELS = 2 # Old data files kept around for readers still mapping them
+
+def _manifest_path(name, directory):
+    return os.path.join(directory, f'{name}.panel.json')
+
+def atomic_write_json(path, payload, indent=None):
+    """Writes JSON to a temp file and renames it over `path`."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=indent)
+    os.replace(tmp_path, path)
+
+# --- Writing ---
+def write_panel(name, batch_data, directory=PANEL_DIR, fields=PANEL_FIELDS):
+    """Writes a ticker-grouped batch DataFrame to a new panel file and publishes it.
+
+    Returns the opened PricePanel.
+    """
+    os.makedirs(directory, exist_ok=True)
+    symbols = [s for s in dict.fromkeys(batch_data.columns.get_level_values(0))]
+    dates = batch_data.index
+    version = time.time_ns()
+    data_file = f'{name}.{version}.npy'
+    data_path = os.path.join(directory, data_file)
+
+    data = np.lib.format.open_memmap(data_path + '.tmp', mode='w+', dtype=PANEL_DTYPE,
+                                     shape=(len(symbols), len(fields), len(dates)))
+    ranges = {}
+    for i, symbol in enumerate(symbols):
+        symbol_df = batch_data[symbol]
+        for j, field in enumerate(fields):
+            if field in symbol_df.columns:
+                data[i, j, :] = symbol_df[field].to_numpy(dtype=PANEL_DTYPE, na_value=np.nan)
+            else:
+                data[i, j, :] = np.nan
+        # Validity range: first..last bar with a Close
+        valid = np.flatnonzero(~np.isnan(data[i, fields.index('Close'), :]))
+        ranges[symbol] = [int(valid[0]), int(valid[-1]) + 1] if valid.size else [0, 0]
+    data.flush()
+    del data
+    os.replace(data_path + '.tmp', data_path)
+
+    atomic_write_json(_manifest_path(name, directory), {
+        'name': name,
+        'version': version,
+        'data_file': data_file,
+        'fields': list(fields),
+        'symbols': symbols,
+        'ranges': ranges,
+        'dates': ((dates - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).tolist(), # UTC seconds (unit-independent)
+    })
+    _cleanup_old_panels(name, directory, keep=data_file)
+    return PricePanel.open(name, directory)
+
+def _cleanup_old_panels(name, directory, keep):
+    """Deletes all but the newest few data files (open maps of deleted files stay valid on POSIX)."""
+    files = sorted(glob.glob(os.path.join(directory, f'{name}.*.npy')), key=os.path.getmtime)
+    for path in files[:-KEEP_OLD_PANELS]:
+        if os.path.basename(path) != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# --- Reading ---
+class PricePanel:
+    """Read-only, zero-copy view of a published panel."""
+
+    def __init__(self, manifest, data, manifest_mtime=None):
+        self.manifest_mtime = manifest_mtime
+        self.name = manifest['name']
+        self.version = manifest['version']
+        self.fields = manifest['fields']
+        self.symbols = manifest['symbols']
+        self.ranges = {symbol: tuple(r) for symbol, r in manifest['ranges'].items()}
+        self.dates = pd.DatetimeIndex(pd.to_datetime(np.asarray(manifest['dates'], dtype=np.int64), unit='s', utc=True))
+        self.data = data
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def open(cls, name, directory=PANEL_DIR):
+        """Opens the currently published panel, or returns None if there is none."""
+        path = _manifest_path(name, directory)
+        try:
+            manifest_mtime = os.stat(path).st_mtime_ns
+            with open(path) as f:
+                manifest = json.load(f)
+            data = np.load(os.path.join(directory, manifest['data_file']), mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(manifest, data, manifest_mtime)
+
+    def __contains__(self, symbol):
+        return symbol in self._symbol_index
+
+    def values(self, symbol, field='Close'):
+        """Returns the raw float32 values of a field over the symbol's validity range (a view)."""
+        start, end = self.ranges[symbol]
+        return self.data[self._symbol_index[symbol], self.fields.index(field), start:end]
+
+    def series(self, symbol, field='Close'):
+        """Returns a field as a Series backed directly by the memory map."""
+        start, end = self.ranges[symbol]
+        return pd.Series(np.asarray(self.values(symbol, field)), index=self.dates[start:end], name=field, copy=False)
+
+    def frame(self, symbol):
+        """Returns all stored fields of a symbol as a DataFrame backed by the memory map."""
+        return pd.DataFrame({field: self.series(symbol, field) for field in self.fields}, copy=False)
+
+    def last_bars(self, field='Close'):
+        """Returns {symbol: (date label, value)} of every symbol's latest stored bar (symbols without bars are left out)."""
+        rows = [i for i, symbol in enumerate(self.symbols) if self.ranges[symbol][1] > self.ranges[symbol][0]]
+        if not rows:
+            return {}
+        ends = np.array([self.ranges[self.symbols[i]][1] - 1 for i in rows], dtype=np.int64)
+        values = self.data[rows, self.fields.index(field), ends].astype(float)
+        labels = self.dates[ends].strftime('%Y-%m-%d')
+        return {self.symbols[i]: (label, value) for i, label, value in zip(rows, labels, values.tolist())}
+
+def load_panel(name, current=None, directory=PANEL_DIR):
+    """Returns the published panel, reusing `current` if its manifest has not changed."""
+    try:
+        manifest_mtime = os.stat(_manifest_path(name, directory)).st_mtime_ns
+    except OSError:
+        return current
+    if current is not None and current.manifest_mtime == manifest_mtime:
+        return current
+    return PricePanel.open(name, directory) or current
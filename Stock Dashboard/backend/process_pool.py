@@ -0,0 +1,96 @@
+"""Lazily started worker processes that read a job's arrays from shared memory.
+
+The server is multi-threaded, so workers are not forked from it (a forked child
+can inherit a lock another thread was holding): they come from a fork server,
+or are spawned where that is unavailable. A job copies its input arrays once
+into a shared memory block and its tasks only carry the block's descriptor;
+each worker maps the block on its first task and reuses the mapping for every
+later task, so the inputs cross the process boundary once per job instead of
+being pickled into every task.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+ATTACHED_BLOCKS = 4 # Blocks a worker keeps mapped (those of the most recent jobs)
+ALIGNMENT = 64
+
+def _view(buffer, offset, shape, dtype):
+    """An ndarray over part of a shared buffer."""
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+
+class SharedArrays:
+    """Named arrays copied into one shared memory block, unlinked when the `with` block ends.
+
+    `descriptor` (block name and per-array offset, shape and dtype) is what tasks carry;
+    workers turn it back into arrays with `attach`.
+    """
+
+    def __init__(self, arrays):
+        layout, size = {}, 0
+        for name, array in arrays.items():
+            offset = -(-size // ALIGNMENT) * ALIGNMENT
+            layout[name] = (offset, array.shape, array.dtype.str)
+            size = offset + array.nbytes
+        self._block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, array in arrays.items():
+            _view(self._block.buf, *layout[name])[...] = array
+        self.descriptor = (self._block.name, layout)
+
+    def __enter__(self):
+        return self.descriptor
+
+    def __exit__(self, *exc_info):
+        self._block.close()
+        self._block.unlink()
+
+_attached = {} # Worker side: block name -> (SharedMemory, {name: read-only array}), oldest first
+
+def attach(descriptor):
+    """Returns the arrays of a shared block, mapping it on the first task of a job in this worker."""
+    name, layout = descriptor
+    if name not in _attached:
+        while len(_attached) >= ATTACHED_BLOCKS:
+            block, arrays = _attached.pop(next(iter(_attached)))
+            arrays.clear()
+            try:
+                block.close()
+            except BufferError:
+                pass # A view is still referenced; the mapping goes with it
+        block = shared_memory.SharedMemory(name=name)
+        arrays = {}
+        for key, spec in layout.items():
+            arrays[key] = _view(block.buf, *spec)
+            arrays[key].flags.writeable = False
+        _attached[name] = (block, arrays)
+    return _attached[name][1]
+
+class WorkerPool:
+    """A process pool started on first use and shared by every later job; a broken pool is replaced."""
+
+    def __init__(self):
+        self.executor = None
+        self._lock = threading.Lock()
+
+    def map(self, fn, tasks, workers):
+        """Runs `fn` over `tasks` on the pool (started with `workers` processes) and returns the results in order."""
+        with self._lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context(START_METHOD))
+            executor = self.executor
+        try:
+            return list(executor.map(fn, tasks))
+        except BrokenProcessPool:
+            with self._lock:
+                if self.executor is executor:
+                    self.executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
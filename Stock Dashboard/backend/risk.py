@@ -0,0 +1,140 @@
+"""Monte Carlo VaR/CVaR and drawdown estimates from the stored price panels.
+
+Daily log returns of the selected symbols are taken over the whole stored history
+(aligned on the trading calendar of the panel holding most of them). Paths are
+either bootstrapped (whole historical days are resampled, which keeps the
+cross-asset dependence and fat tails) or drawn from a multivariate normal with
+the sample mean and a factor model of the covariance (the top principal
+components plus a diagonal residual, so the sampling cost grows with symbols x
+factors instead of symbols^2). Each path is a buy-and-hold portfolio: the value
+at day h is sum(weight * exp(cumulative log return)).
+
+Paths are simulated in fixed-size chunks, each seeded from its own
+`SeedSequence` child, so a given seed gives the same result whether the chunks
+run inline or across any number of worker processes. The worker pool is created
+on first use and shared by every later simulation; the model's arrays reach each
+worker once per simulation through shared memory (see process_pool.py).
+"""
+from lazy_imports import lazy_import
+from portfolio import trading_day_closes
+from process_pool import SharedArrays, WorkerPool, attach
+
+np = lazy_import('numpy')
+
+RISK_METHODS = ('bootstrap', 'normal')
+CONFIDENCE_LEVELS = (0.95, 0.99)
+DRAWDOWN_THRESHOLDS = (10, 20, 30) # Percent, for the probability of a worse drawdown within the horizon
+MIN_HISTORY_DAYS = 252 # Symbols with less return history are left out of the model
+MAX_FACTORS = 20
+CHUNK_ELEMENTS = 4_000_000 # paths x horizon x symbols per chunk (float32, ~16MB)
+
+def return_matrix(panels, symbols):
+    """Returns (symbols kept, excluded symbols, (days, symbols) float32 log returns).
+
+    Closes are aligned on one trading calendar (see `trading_day_closes`). The window
+    starts where every kept symbol has data.
+    """
+    days, rows, closes = trading_day_closes(panels, symbols)
+    if not rows:
+        return [], list(symbols), np.empty((0, 0), dtype=np.float32)
+    first_valid = np.argmax(~np.isnan(closes), axis=1)
+    first_valid[np.isnan(closes).all(axis=1)] = len(days)
+    keep = (len(days) - 1 - first_valid) >= MIN_HISTORY_DAYS
+    kept = [symbol for symbol, k in zip(rows, keep) if k]
+    excluded = [symbol for symbol in symbols if symbol not in kept]
+    if not kept:
+        return [], excluded, np.empty((0, 0), dtype=np.float32)
+    start = int(first_valid[keep].max())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.diff(np.log(closes[keep, start:]), axis=1)
+    log_returns = np.nan_to_num(log_returns, nan=0.0, posinf=0.0, neginf=0.0)
+    return kept, excluded, np.ascontiguousarray(log_returns.T, dtype=np.float32)
+
+def build_model(returns, weights, method):
+    """Precomputes what the sampler needs: the return rows (bootstrap) or mean, factors and residuals (normal)."""
+    model = {'method': method, 'weights': np.asarray(weights, dtype=np.float32)}
+    if method == 'bootstrap':
+        model['returns'] = returns
+        return model
+    sample = returns.astype(float)
+    covariance = np.atleast_2d(np.cov(sample, rowvar=False))
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance) # Ascending
+    k = min(MAX_FACTORS, len(eigenvalues))
+    loadings = eigenvectors[:, -k:] * np.sqrt(np.clip(eigenvalues[-k:], 0.0, None))
+    # Residual variance keeps every symbol's total variance exact
+    residual = np.clip(np.diag(covariance) - (loadings ** 2).sum(axis=1), 0.0, None)
+    model.update(mean=sample.mean(axis=0).astype(np.float32), loadings=loadings.T.astype(np.float32),
+                 residual_sd=np.sqrt(residual).astype(np.float32))
+    return model
+
+def _sample_returns(model, rng, paths, horizon):
+    """Returns (paths, horizon, symbols) float32 daily log returns."""
+    if model['method'] == 'bootstrap':
+        returns = model['returns']
+        return returns[rng.integers(len(returns), size=(paths, horizon))]
+    factors = rng.standard_normal((paths, horizon, model['loadings'].shape[0]), dtype=np.float32)
+    returns = rng.standard_normal((paths, horizon, len(model['mean'])), dtype=np.float32)
+    returns *= model['residual_sd']
+    returns += model['mean']
+    returns += factors @ model['loadings']
+    return returns
+
+_pool = WorkerPool()
+
+def _simulate_chunk(task, model):
+    """Simulates one chunk; returns (horizon returns, first-day returns, max drawdowns) as fractions."""
+    seed, paths, horizon = task
+    rng = np.random.default_rng(seed)
+    log_returns = _sample_returns(model, rng, paths, horizon)
+    for day in range(1, horizon): # Cumulative sum over days, on contiguous (paths, symbols) slices
+        log_returns[:, day] += log_returns[:, day - 1]
+    np.exp(log_returns, out=log_returns)
+    values = log_returns @ model['weights'] # (paths, horizon) portfolio value, starting from 1
+    peak = np.maximum(np.maximum.accumulate(values, axis=1), 1.0)
+    drawdown = (values / peak - 1.0).min(axis=1)
+    return values[:, -1] - 1.0, values[:, 0] - 1.0, np.minimum(drawdown, 0.0)
+
+def _simulate_shared_chunk(task):
+    """Worker entry point: simulates a chunk of a model whose arrays are in shared memory."""
+    shared, method, chunk = task
+    return _simulate_chunk(chunk, dict(attach(shared), method=method))
+
+def simulate(model, paths, horizon, seed, workers=1):
+    """Runs `paths` simulations of `horizon` days in deterministic chunks; returns the concatenated results."""
+    n_symbols = len(model['weights'])
+    chunk = max(1, CHUNK_ELEMENTS // (horizon * n_symbols))
+    sizes = [min(chunk, paths - start) for start in range(0, paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(child, size, horizon) for child, size in zip(seeds, sizes)]
+    if workers > 1 and len(tasks) > 1:
+        with SharedArrays({name: value for name, value in model.items() if name != 'method'}) as shared:
+            results = _pool.map(_simulate_shared_chunk, [(shared, model['method'], task) for task in tasks], workers)
+    else:
+        results = [_simulate_chunk(task, model) for task in tasks]
+    return tuple(np.concatenate([result[i] for result in results]).astype(float) for i in range(3))
+
+def _var_cvar(returns, confidence):
+    """Value at risk and expected shortfall, as positive loss percentages."""
+    cutoff = np.quantile(returns, 1.0 - confidence)
+    tail = returns[returns <= cutoff]
+    return -cutoff * 100, -tail.mean() * 100
+
+def risk_summary(horizon_returns, one_day_returns, drawdowns):
+    """Aggregates simulated paths into VaR/CVaR per confidence level and drawdown statistics."""
+    summary = {'expected_return_pct': float(horizon_returns.mean() * 100),
+               'var': {}, 'cvar': {}}
+    for confidence in CONFIDENCE_LEVELS:
+        label = f'{confidence * 100:g}'
+        var_horizon, cvar_horizon = _var_cvar(horizon_returns, confidence)
+        var_day, cvar_day = _var_cvar(one_day_returns, confidence)
+        summary['var'][label] = {'one_day_pct': float(var_day), 'horizon_pct': float(var_horizon)}
+        summary['cvar'][label] = {'one_day_pct': float(cvar_day), 'horizon_pct': float(cvar_horizon)}
+    drawdown_pct = -drawdowns * 100
+    summary['max_drawdown'] = {
+        'median_pct': float(np.median(drawdown_pct)),
+        'p95_pct': float(np.quantile(drawdown_pct, 0.95)),
+        'p99_pct': float(np.quantile(drawdown_pct, 0.99)),
+        'probability_exceeding': {str(threshold): float((drawdown_pct > threshold).mean())
+                                  for threshold in DRAWDOWN_THRESHOLDS},
+    }
+    return summary
@@ -0,0 +1,248 @@
+"""Market-calendar-aware background refresh scheduler.
+
+Each asset class refreshes on its own cadence: fast while its session is open,
+slow or suspended while it is closed, plus one settle refresh shortly after the
+close so the final daily bar is captured.
+"""
+import threading
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# --- Configuration ---
+EXCHANGE_TZ = ZoneInfo('America/New_York')
+EQUITY_OPEN_TIME = dtime(9, 30)
+EQUITY_CLOSE_TIME = dtime(16, 0)
+EQUITY_EARLY_CLOSE_TIME = dtime(13, 0)
+MAX_SLEEP_SECONDS = 300 # Re-evaluate the calendar at least this often
+
+# --- NYSE Calendar ---
+def _easter_sunday(year):
+    """Returns Easter Sunday for a given year (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def _nth_weekday(year, month, weekday, n):
+    """Returns the n-th given weekday of a month (n=-1 for the last one)."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(day):
+    """Shifts a fixed-date holiday falling on a weekend to the observed weekday."""
+    if day.weekday() == 5: return day - timedelta(days=1)
+    if day.weekday() == 6: return day + timedelta(days=1)
+    return day
+
+_holiday_cache = {}
+
+def nyse_holidays(year):
+    """Returns the set of full-day NYSE holidays for a year."""
+    if year in _holiday_cache:
+        return _holiday_cache[year]
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),             # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),             # Presidents' Day
+        _easter_sunday(year) - timedelta(days=2), # Good Friday
+        _nth_weekday(year, 5, 0, -1),            # Memorial Day
+        _observed(date(year, 7, 4)),             # Independence Day
+        _nth_weekday(year, 9, 0, 1),             # Labor Day
+        _nth_weekday(year, 11, 3, 4),            # Thanksgiving
+        _observed(date(year, 12, 25)),           # Christmas
+    }
+    # NYSE does not observe New Year's Day on the prior Friday when it falls on a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19))) # Juneteenth
+    _holiday_cache[year] = holidays
+    return holidays
+
+def is_equity_trading_day(day):
+    """Returns True if the NYSE is open on the given date."""
+    return day.weekday() < 5 and day not in nyse_holidays(day.year)
+
+def _is_early_close(day):
+    """Returns True for the scheduled 1pm closes (Jul 3, day after Thanksgiving, Dec 24)."""
+    if day == _nth_weekday(day.year, 11, 3, 4) + timedelta(days=1):
+        return True
+    if (day.month, day.day) in ((7, 3), (12, 24)):
+        return is_equity_trading_day(day)
+    return False
+
+def equity_session(day):
+    """Returns the (open, close) UTC datetimes for a trading date, or None if the market is closed."""
+    if not is_equity_trading_day(day):
+        return None
+    close_time = EQUITY_EARLY_CLOSE_TIME if _is_early_close(day) else EQUITY_CLOSE_TIME
+    session_open = datetime.combine(day, EQUITY_OPEN_TIME, tzinfo=EXCHANGE_TZ)
+    session_close = datetime.combine(day, close_time, tzinfo=EXCHANGE_TZ)
+    return session_open.astimezone(timezone.utc), session_close.astimezone(timezone.utc)
+
+def equity_calendar(now):
+    """Returns (is_open, last_close, next_open) for the US equity session relative to `now` (UTC)."""
+    today = now.astimezone(EXCHANGE_TZ).date()
+    is_open = False
+    last_close = None
+    next_open = None
+    session = equity_session(today)
+    if session is not None:
+        is_open = session[0] <= now < session[1]
+        if now >= session[1]:
+            last_close = session[1]
+        elif now < session[0]:
+            next_open = session[0]
+    # Walk back/forward over weekends and holidays (never more than a few days)
+    day = today
+    while last_close is None:
+        day -= timedelta(days=1)
+        session = equity_session(day)
+        if session is not None:
+            last_close = session[1]
+    day = today
+    while next_open is None:
+        day += timedelta(days=1)
+        session = equity_session(day)
+        if session is not None:
+            next_open = session[0]
+    return is_open, last_close, next_open
+
+def always_open_calendar(now):
+    """Calendar for 24/7 markets (crypto): always open, never closes."""
+    return True, None, None
+
+# --- Schedules ---
+class RefreshSchedule:
+    """Refresh cadence for one asset class.
+
+    `open_interval` applies while the session is open. `closed_interval` applies while it
+    is closed (None suspends refreshes). `settle_delay` schedules one extra refresh that
+    long after each close.
+    """
+
+    def __init__(self, name, calendar, open_interval, closed_interval=None, settle_delay=None):
+        self.name = name
+        self.calendar = calendar
+        self.open_interval = timedelta(seconds=open_interval)
+        self.closed_interval = timedelta(seconds=closed_interval) if closed_interval else None
+        self.settle_delay = timedelta(seconds=settle_delay) if settle_delay is not None else None
+
+    def next_run(self, now, last_run):
+        """Returns when this class should next refresh given the time of its last refresh."""
+        if last_run is None:
+            return now # Always bootstrap once, open or not
+        is_open, last_close, next_open = self.calendar(now)
+        if is_open:
+            return last_run + self.open_interval
+        candidates = []
+        if self.settle_delay is not None and last_close is not None:
+            settle_at = last_close + self.settle_delay
+            if last_run < settle_at:
+                candidates.append(settle_at)
+        if self.closed_interval is not None:
+            candidates.append(last_run + self.closed_interval)
+        if next_open is not None:
+            candidates.append(max(next_open, last_run + self.open_interval))
+        return min(candidates) if candidates else None
+
+# --- Scheduler ---
+class RefreshScheduler:
+    """Background thread that runs `refresh_fn(asset_class)` whenever a schedule is due."""
+
+    def __init__(self, schedules, refresh_fn):
+        self.schedules = {schedule.name: schedule for schedule in schedules}
+        self.refresh_fn = refresh_fn
+        self.last_run = {name: None for name in self.schedules}
+        self.last_error = {name: None for name in self.schedules}
+        self.refresh_count = {name: 0 for name in self.schedules}
+        self._forced = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Starts the scheduler thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the scheduler thread after the refresh in progress, if any."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def trigger(self, name=None):
+        """Forces an immediate refresh of one asset class (or all of them)."""
+        with self._lock:
+            self._forced.update([name] if name else self.schedules.keys())
+        self._wake.set()
+
+    def status(self):
+        """Returns a JSON-serializable summary of the schedule state."""
+        now = datetime.now(timezone.utc)
+        summary = {}
+        for name, schedule in self.schedules.items():
+            last_run = self.last_run[name]
+            next_run = schedule.next_run(now, last_run)
+            summary[name] = {
+                'session_open': schedule.calendar(now)[0],
+                'last_run': last_run.isoformat() if last_run else None,
+                'next_run': next_run.isoformat() if next_run else None,
+                'refresh_count': self.refresh_count[name],
+                'last_error': self.last_error[name],
+            }
+        return summary
+
+    def _due(self, now):
+        with self._lock:
+            forced, self._forced = self._forced, set()
+        due = []
+        for name, schedule in self.schedules.items():
+            next_run = schedule.next_run(now, self.last_run[name])
+            if name in forced or (next_run is not None and next_run <= now):
+                due.append(name)
+        return due
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = datetime.now(timezone.utc)
+            for name in self._due(now):
+                started = datetime.now(timezone.utc)
+                try:
+                    self.refresh_fn(name)
+                    self.last_error[name] = None
+                except Exception as e:
+                    print(f"Scheduler: Error refreshing {name}: {e}")
+                    self.last_error[name] = str(e)
+                self.last_run[name] = started
+                self.refresh_count[name] += 1
+                if self._stop.is_set():
+                    return
+
+            now = datetime.now(timezone.utc)
+            next_runs = [schedule.next_run(now, self.last_run[name]) for name, schedule in self.schedules.items()]
+            next_runs = [run for run in next_runs if run is not None]
+            sleep_seconds = MAX_SLEEP_SECONDS
+            if next_runs:
+                sleep_seconds = min(sleep_seconds, max((min(next_runs) - now).total_seconds(), 0))
+            if sleep_seconds > 0:
+                self._wake.wait(sleep_seconds)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Headline sentiment ingestion, rolled up into per-symbol monthly scores.
+
+Articles come from a pluggable source; `JsonlHeadlineSource` reads a directory
+of JSONL files standing in for a news feed, one article per line:
+
+    {"symbols": ["NVDA", "AMD"], "published": "2025-04-17", "headline": "...", "summary": "..."}
+
+Each source keeps a cursor (here: size, mtime and byte offset per file), so a
+run only reads what was appended since the last one and an unchanged corpus
+costs one stat per file. New texts are scored in vectorized batches; scores
+are cached by a hash of the normalized text, so a syndicated or re-sent article
+is never scored twice, and each (article, symbol) counts once in the rollup.
+The rollup keeps a running sum and count per symbol and month; its means have
+the structure of the hand-maintained sentiment_data.json ({symbol: {"YYYY-MM":
+score}}), which they override month by month.
+
+    python sentiment.py --source ../news              # Updates ../sentiment_data.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+
+from lazy_imports import lazy_import
+from price_panel import PANEL_DIR, atomic_write_json
+
+np = lazy_import('numpy')
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SENTIMENT_DATA_PATH = os.path.join(os.path.dirname(BACKEND_DIR), 'sentiment_data.json')
+SENTIMENT_STATE_PATH = os.path.join(PANEL_DIR, 'sentiment_state.json')
+SCORE_BATCH_SIZE = 1024
+MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}')
+TOKEN_PATTERN = re.compile(r"[a-z][a-z'\-]*")
+
+# Finance headline lexicon: +1 reads bullish, -1 bearish
+POSITIVE_WORDS = (
+    'beat', 'beats', 'surge', 'surges', 'surged', 'soar', 'soars', 'soared', 'rally', 'rallies', 'rallied',
+    'gain', 'gains', 'gained', 'jump', 'jumps', 'jumped', 'climb', 'climbs', 'rise', 'rises', 'record',
+    'upgrade', 'upgrades', 'upgraded', 'outperform', 'outperforms', 'bullish', 'strong', 'stronger',
+    'growth', 'grows', 'profit', 'profits', 'profitable', 'raise', 'raises', 'raised', 'boost', 'boosts',
+    'expand', 'expands', 'expansion', 'approval', 'approved', 'wins', 'win', 'partnership', 'exceeds',
+    'tops', 'buyback', 'dividend', 'rebound', 'rebounds', 'optimism', 'optimistic', 'breakthrough',
+)
+NEGATIVE_WORDS = (
+    'miss', 'misses', 'missed', 'plunge', 'plunges', 'plunged', 'fall', 'falls', 'fell', 'drop', 'drops',
+    'dropped', 'slump', 'slumps', 'sink', 'sinks', 'tumble', 'tumbles', 'decline', 'declines', 'declined',
+    'downgrade', 'downgrades', 'downgraded', 'underperform', 'bearish', 'weak', 'weaker', 'loss', 'losses',
+    'cut', 'cuts', 'layoffs', 'lawsuit', 'probe', 'investigation', 'recall', 'recalls', 'warn', 'warns',
+    'warning', 'fraud', 'bankruptcy', 'default', 'delay', 'delays', 'delayed', 'halt', 'halts', 'fine',
+    'fined', 'crash', 'crashes', 'sell-off', 'selloff', 'concern', 'concerns', 'pessimism', 'grounded',
+)
+NEGATORS = ('not', 'no', 'never', "isn't", "didn't", "doesn't", "won't", 'without', 'fails', 'failed')
+SMOOTHING = 1.0 # Damps scores of headlines with a single sentiment word
+
+def normalize_text(text):
+    """Lowercases and collapses whitespace, so re-sent copies of an article hash alike."""
+    return ' '.join(text.lower().split())
+
+def content_hash(text):
+    """Hash of the normalized article text."""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+class LexiconScorer:
+    """Scores texts in [-1, 1] as (positive - negative) / (positive + negative + SMOOTHING) word counts.
+
+    A sentiment word right after a negator counts with the opposite sign. `name` is stored
+    with the cached scores; changing the lexicon or formula should change it.
+    """
+    name = 'lexicon-v1'
+
+    def __init__(self):
+        self.weights = dict.fromkeys(POSITIVE_WORDS, 1.0)
+        self.weights.update(dict.fromkeys(NEGATIVE_WORDS, -1.0))
+        self.negators = frozenset(NEGATORS)
+
+    def score_batch(self, texts):
+        """Returns a float array with one score per text."""
+        token_lists = [TOKEN_PATTERN.findall(text.lower()) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        documents = np.repeat(np.arange(len(token_lists)), lengths)
+        flat = [token for tokens in token_lists for token in tokens]
+        if not flat:
+            return np.zeros(len(texts))
+        # Look every distinct token up once, then broadcast back to the token positions
+        vocabulary, inverse = np.unique(np.array(flat), return_inverse=True)
+        weights = np.array([self.weights.get(word, 0.0) for word in vocabulary.tolist()])[inverse]
+        negator = np.array([word in self.negators for word in vocabulary.tolist()])[inverse]
+        negated = np.zeros(len(flat), dtype=bool)
+        negated[1:] = negator[:-1] & (documents[1:] == documents[:-1])
+        weights[negated] *= -1.0
+        positive = np.bincount(documents, weights=np.clip(weights, 0.0, None), minlength=len(texts))
+        negative = np.bincount(documents, weights=np.clip(-weights, 0.0, None), minlength=len(texts))
+        return (positive - negative) / (positive + negative + SMOOTHING)
+
+class JsonlHeadlineSource:
+    """Articles from the *.jsonl files of a directory, read incrementally by byte offset."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def read(self, cursor):
+        """Returns (records, new cursor, malformed line count) for what was added since `cursor`.
+
+        A file that shrank or was rewritten in place is read again from the start (articles
+        already counted are skipped by hash). Only complete lines are consumed.
+        """
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.jsonl'))
+        except OSError:
+            return [], {}, 0
+        records, new_cursor, malformed = [], {}, 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            previous = cursor.get(name) or {}
+            offset = previous.get('offset', 0)
+            if previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime_ns:
+                new_cursor[name] = previous
+                continue
+            if stat.st_size <= offset:
+                offset = 0
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+            complete = chunk.rfind(b'\n') + 1
+            for line in chunk[:complete].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    malformed += 1
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+                else:
+                    malformed += 1
+            new_cursor[name] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'offset': offset + complete}
+        return records, new_cursor, malformed
+
+def article_fields(record):
+    """Returns (text, symbols, month) of a source record, or None if it lacks any of them."""
+    text = ' '.join(str(record.get(field) or '') for field in ('headline', 'summary')).strip()
+    symbols = record.get('symbols', record.get('symbol'))
+    if isinstance(symbols, str):
+        symbols = symbols.split(',')
+    published = str(record.get('published') or '')
+    if not text or not isinstance(symbols, list) or not MONTH_PATTERN.match(published):
+        return None
+    symbols = [s for s in dict.fromkeys(str(symbol).strip().upper() for symbol in symbols) if s]
+    return (text, symbols, published[:7]) if symbols else None
+
+class SentimentPipeline:
+    """Score cache, per-article dedupe and monthly rollup, persisted as one JSON state file."""
+
+    def __init__(self, path=SENTIMENT_STATE_PATH, scorer=None):
+        self.path = path
+        self.scorer = scorer or LexiconScorer()
+        self.version = 0
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.cursor = {}   # Source cursor
+        self.scores = {}   # content hash -> score
+        self.counted = {}  # content hash -> symbols it was rolled up for
+        self.rollup = {}   # symbol -> {month: [score sum, article count]}
+
+    def _load(self):
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.path):
+                print(f"Sentiment: Could not load state: {e}")
+            return
+        self._reset()
+        if state.get('scorer') != self.scorer.name:
+            print(f"Sentiment: Scorer changed to {self.scorer.name}; rescoring the corpus.")
+            return
+        self.cursor = state.get('cursor', {})
+        self.scores = state.get('scores', {})
+        self.counted = state.get('counted', {})
+        self.rollup = state.get('rollup', {})
+        self.version += 1
+
+    def reload_if_changed(self):
+        """Picks up state written by another process (e.g. the ingestion CLI)."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                self._load()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write_json(self.path, {'scorer': self.scorer.name, 'cursor': self.cursor, 'scores': self.scores,
+                                      'counted': self.counted, 'rollup': self.rollup})
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def ingest(self, source):
+        """Reads new articles from `source`, scores unseen texts and rolls them up.
+
+        Returns counts of what happened: 'read', 'scored' (new texts), 'cached' (score
+        reused), 'duplicates' (article already counted for the symbol) and 'skipped'.
+        """
+        self.reload_if_changed()
+        with self._lock:
+            records, cursor, malformed = source.read(self.cursor)
+            stats = {'read': len(records), 'scored': 0, 'cached': 0, 'duplicates': 0, 'skipped': malformed}
+            articles = []
+            for record in records:
+                fields = article_fields(record)
+                if fields is None:
+                    stats['skipped'] += 1
+                else:
+                    articles.append((content_hash(fields[0]),) + fields)
+
+            pending = {digest: text for digest, text, _, _ in articles if digest not in self.scores}
+            digests = list(pending)
+            for start in range(0, len(digests), SCORE_BATCH_SIZE):
+                batch = digests[start:start + SCORE_BATCH_SIZE]
+                scores = self.scorer.score_batch([pending[digest] for digest in batch])
+                self.scores.update(zip(batch, (round(float(score), 6) for score in scores)))
+            stats['scored'] = len(digests)
+
+            for digest, _, symbols, month in articles:
+                counted = self.counted.setdefault(digest, [])
+                for symbol in symbols:
+                    if symbol in counted:
+                        stats['duplicates'] += 1
+                        continue
+                    counted.append(symbol)
+                    bucket = self.rollup.setdefault(symbol, {}).setdefault(month, [0.0, 0])
+                    bucket[0] += self.scores[digest]
+                    bucket[1] += 1
+            stats['cached'] = len(articles) - len(digests)
+
+            if cursor != self.cursor or articles:
+                self.cursor = cursor
+                self._save()
+                self.version += 1
+        return stats
+
+    def monthly_scores(self):
+        """Returns the rollup as {symbol: {month: mean score}}."""
+        with self._lock:
+            return {symbol: {month: round(total / count, 4) for month, (total, count) in sorted(months.items()) if count}
+                    for symbol, months in self.rollup.items()}
+
+def load_monthly_scores(path=SENTIMENT_DATA_PATH):
+    """Reads a {symbol: {month: score}} file; returns {} if it is missing or invalid."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        if os.path.exists(path):
+            print(f"Sentiment: Could not load {path}: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def merge_monthly_scores(base, scores):
+    """Overlays `scores` on `base` month by month; months only in `base` are kept."""
+    merged = {symbol: dict(months) for symbol, months in base.items()}
+    for symbol, months in scores.items():
+        merged.setdefault(symbol, {}).update(months)
+    return {symbol: dict(sorted(months.items(), reverse=True)) for symbol, months in merged.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', required=True, help='Directory of *.jsonl article files')
+    parser.add_argument('--state', default=SENTIMENT_STATE_PATH, help='Score cache and rollup state file')
+    parser.add_argument('--output', default=SENTIMENT_DATA_PATH, help='Monthly scores file to merge the rollup into')
+    args = parser.parse_args()
+
+    pipeline = SentimentPipeline(args.state)
+    stats = pipeline.ingest(JsonlHeadlineSource(args.source))
+    print(f"Sentiment: {stats}")
+    current = load_monthly_scores(args.output)
+    merged = merge_monthly_scores(current, pipeline.monthly_scores())
+    if merged != current:
+        atomic_write_json(args.output, merged, indent=4)
+        print(f"Sentiment: Updated {args.output}")
+
+if __name__ == '__main__':
+    main()
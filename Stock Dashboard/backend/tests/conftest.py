@@ -0,0 +1,59 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Backend modules import each other by flat module name, as when app.py runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Every store defaults to a file under PANEL_DIR: keep the tests (and `import app`) out of backend/cache
+os.environ['PANEL_DIR'] = tempfile.mkdtemp(prefix='dashboard-tests-')
+os.environ['RUN_SCHEDULER'] = '0'
+atexit.register(shutil.rmtree, os.environ['PANEL_DIR'], True)
+
+from price_panel import write_panel
+
+def _random_closes(dates, symbols, seed=0, missing=0.0):
+    """A (dates x symbols) frame of geometric random walks, with a fraction of bars knocked out."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.02, size=(len(dates), len(symbols)))
+    closes = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates, columns=symbols)
+    if missing:
+        gaps = rng.random(closes.shape) < missing
+        gaps[0] = False
+        closes = closes.mask(gaps)
+    return closes
+
+@pytest.fixture
+def random_closes():
+    """`random_closes(dates, symbols, seed=0, missing=0.0)`: seeded random-walk closes."""
+    return _random_closes
+
+@pytest.fixture
+def make_panel(tmp_path):
+    """Writes a (dates x symbols) close frame as a PricePanel and returns it opened."""
+    def make(name, closes):
+        batch = pd.concat({symbol: closes[[symbol]].rename(columns={symbol: 'Close'}) for symbol in closes.columns}, axis=1)
+        return write_panel(name, batch, directory=str(tmp_path / 'panels'))
+    return make
+
+
+@pytest.fixture(scope='session')
+def backend_app():
+    """The Flask app module, imported once with PANEL_DIR pointing at the scratch directory."""
+    import app
+    return app
+
+@pytest.fixture(scope='session')
+def generate_data():
+    """The static generator module (generate_data.py, next to backend/)."""
+    import importlib.util
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'generate_data.py')
+    spec = importlib.util.spec_from_file_location('generate_data', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,98 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from alerts import AlertEngine
+
+START = datetime(2025, 1, 6, 14, 0, tzinfo=timezone.utc)
+
+def make_engine(tmp_path):
+    return AlertEngine(str(tmp_path / 'rules.json'), str(tmp_path / 'state.json'))
+
+def reference_alerts(values, threshold, cooldown_seconds):
+    """Naive replay: fire on a False -> True transition, once per bar, outside the cooldown."""
+    fired, active, last_fired, last_bar = [], False, None, None
+    for step, (bar, value, now) in enumerate(values):
+        matched = value < threshold
+        if matched and not active and bar != last_bar and (
+                last_fired is None or (now - last_fired).total_seconds() >= cooldown_seconds):
+            fired.append(step)
+            last_fired, last_bar = now, bar
+        active = matched
+    return fired
+
+def test_transitions_match_reference(tmp_path):
+    rng = random.Random(0)
+    engine = make_engine(tmp_path)
+    engine.add_rule({'id': 'oversold', 'metric': 'rsi14', 'op': '<', 'threshold': 30,
+                     'symbols': ['AAPL'], 'cooldown_seconds': 3 * 3600})
+    values, fired = [], []
+    for step in range(500):
+        # Several evaluations per bar (quote ticks) with the RSI wandering around the threshold
+        bar = f'bar-{step // 4}'
+        now = START + timedelta(minutes=45 * step)
+        value = 30 + rng.uniform(-5, 5)
+        values.append((bar, value, now))
+        if engine.evaluate({'AAPL': {'rsi14': value}}, {'AAPL': bar}, now=now):
+            fired.append(step)
+    expected = reference_alerts(values, 30, 3 * 3600)
+    assert fired == expected
+    assert expected # The sequence exercises transitions, not just the quiet case
+
+def test_only_rules_of_changed_symbols_run(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.add_rule({'id': 'aapl', 'metric': 'latest_price', 'op': '>', 'threshold': 100, 'symbols': ['AAPL']})
+    engine.add_rule({'id': 'any', 'metric': 'daily_change_pct', 'op': '<=', 'threshold': -5})
+    fired = engine.evaluate({'MSFT': {'latest_price': 500, 'daily_change_pct': -6}}, {'MSFT': '2025-01-06'}, now=START)
+    assert [(alert['rule_id'], alert['symbol']) for alert in fired] == [('any', 'MSFT')]
+    fired = engine.evaluate({'AAPL': {'latest_price': 150, 'daily_change_pct': 1}}, {'AAPL': '2025-01-06'}, now=START)
+    assert [(alert['rule_id'], alert['symbol']) for alert in fired] == [('aapl', 'AAPL')]
+
+def test_state_survives_restart(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.add_rule({'id': 'signal', 'metric': 'ema_signal', 'op': '==', 'threshold': 'Buy', 'cooldown_seconds': 0})
+    assert engine.evaluate({'AMD': {'ema_signal': 'Buy'}}, {'AMD': '2025-01-06'}, now=START)
+    # Still active after a restart: no second alert for the same condition
+    restarted = make_engine(tmp_path)
+    assert not restarted.evaluate({'AMD': {'ema_signal': 'Buy'}}, {'AMD': '2025-01-07'}, now=START + timedelta(days=1))
+    assert not restarted.evaluate({'AMD': {'ema_signal': 'Sell'}}, {'AMD': '2025-01-08'}, now=START + timedelta(days=2))
+    assert restarted.evaluate({'AMD': {'ema_signal': 'Buy'}}, {'AMD': '2025-01-09'}, now=START + timedelta(days=3))
+
+INVALID_RULES = [
+    None,
+    ['rsi14', '<', 30],
+    {'op': '<', 'threshold': 30},
+    {'metric': 'rsi14', 'op': ['<'], 'threshold': 30},
+    {'metric': 'rsi14', 'threshold': float('nan')},
+    {'metric': 'rsi14', 'threshold': 30, 'cooldown_seconds': [1]},
+    {'metric': 'rsi14', 'threshold': 30, 'cooldown_seconds': 'soon'},
+    {'metric': 'rsi14', 'threshold': 30, 'cooldown_seconds': -1},
+    {'metric': 'rsi14', 'threshold': 30, 'cooldown_seconds': float('inf')},
+    {'metric': 'rsi14', 'threshold': 30, 'symbols': 5},
+    {'metric': 'rsi14', 'threshold': 30, 'symbols': ['AAPL', 7]},
+    {'metric': 'rsi14', 'threshold': 30, 'id': {'nested': True}},
+]
+
+@pytest.mark.parametrize('rule', INVALID_RULES)
+def test_invalid_rules_are_rejected_with_400(backend_app, rule):
+    client = backend_app.app.test_client()
+    before = client.get('/api/alerts').get_json()['rules']
+    response = client.post('/api/alerts/rules', json=rule)
+    assert response.status_code == 400
+    assert response.get_json()['error']
+    assert client.get('/api/alerts').get_json()['rules'] == before
+
+def test_valid_rule_round_trips_through_the_api(backend_app):
+    client = backend_app.app.test_client()
+    response = client.post('/api/alerts/rules', json={'id': 'dip', 'metric': 'current_drawdown_pct', 'op': '<',
+                                                      'threshold': -20, 'symbols': 'nvda', 'cooldown_seconds': 0})
+    assert response.status_code == 201
+    assert response.get_json()['symbols'] == ['NVDA']
+    assert client.delete('/api/alerts/rules/dip').status_code == 200
+
+def test_store_directory_is_created_on_first_save(tmp_path):
+    engine = AlertEngine(str(tmp_path / 'new' / 'rules.json'), str(tmp_path / 'new' / 'state.json'))
+    assert not (tmp_path / 'new').exists()
+    engine.add_rule({'metric': 'rsi14', 'threshold': 30})
+    assert (tmp_path / 'new' / 'rules.json').exists()
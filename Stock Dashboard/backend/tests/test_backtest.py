@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+from backtest import METRICS, backtest_block, run_backtest, span_pairs
+
+PAIRS = span_pairs((3, 5, 10), (8, 20))
+
+@pytest.fixture
+def sample_closes(random_closes):
+    """`sample_closes(symbols)`: (symbols, days) forward-filled closes; one symbol lists late and one has no data."""
+    def make(symbols=5):
+        dates = pd.bdate_range('2024-01-01', periods=260)
+        closes = random_closes(dates, [f'S{i}' for i in range(symbols)], seed=8).T.to_numpy(copy=True)
+        closes[1, :120] = np.nan
+        closes[-1] = np.nan
+        return closes
+    return make
+
+def naive_backtest(close, fast, slow, start):
+    """One symbol and pair: pandas EMAs, then a day-by-day book of the long/flat strategy."""
+    series = pd.Series(close)
+    fast_ema = series.ewm(span=fast, adjust=False).mean().to_numpy()
+    slow_ema = series.ewm(span=slow, adjust=False).mean().to_numpy()
+    log_returns = np.log(series).diff().to_numpy()
+    equity = peak = worst = entry = 0.0
+    trades = wins = 0
+    held_before = False
+    for t in range(start, len(close)):
+        held = bool(fast_ema[t - 1] > slow_ema[t - 1]) and np.isfinite(log_returns[t])
+        if held_before and not held:
+            wins += equity > entry
+        if held and not held_before:
+            trades += 1
+            entry = equity
+        if held:
+            equity += log_returns[t]
+        peak = max(peak, equity)
+        worst = min(worst, equity - peak)
+        held_before = held
+    if held_before:
+        wins += equity > entry
+    return {'total_return': np.expm1(equity), 'max_drawdown': np.expm1(worst), 'trades': trades,
+            'hit_rate': wins / trades if trades else np.nan}
+
+def test_block_matches_loop_reference(sample_closes):
+    closes = sample_closes()
+    start = 60
+    results = backtest_block(closes, PAIRS, start)
+    for i, close in enumerate(closes):
+        if np.isnan(close).all():
+            assert all(np.isnan(results[metric][:, i]).all() for metric in METRICS)
+            assert np.isnan(results['buy_hold'][i])
+            continue
+        for p, (fast, slow) in enumerate(PAIRS):
+            expected = naive_backtest(close, fast, slow, start)
+            assert results['trades'][p, i] == expected['trades']
+            for metric in ('total_return', 'max_drawdown', 'hit_rate'):
+                np.testing.assert_allclose(results[metric][p, i], expected[metric], rtol=1e-4, atol=1e-6)
+        returns = np.log(pd.Series(close)).diff().iloc[start:]
+        np.testing.assert_allclose(results['buy_hold'][i], np.expm1(returns.sum()), rtol=1e-5)
+
+def test_pooled_blocks_match_inline(monkeypatch, sample_closes):
+    monkeypatch.setattr(backtest, 'SYMBOLS_PER_TASK', 2)
+    closes = sample_closes(symbols=7)
+    inline = run_backtest(closes, PAIRS, 60, workers=1)
+    pooled = run_backtest(closes, PAIRS, 60, workers=2)
+    for metric in METRICS + ('buy_hold',):
+        np.testing.assert_array_equal(pooled[metric], inline[metric])
+    executor = backtest._pool.executor
+    assert executor is not None
+    run_backtest(closes, PAIRS, 100, workers=2)
+    assert backtest._pool.executor is executor # Reused, not recreated per call
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from corporate_actions import CorporateActionStore
+
+def download(closes, splits=None, dividends=None, symbol='XYZ'):
+    """A ticker-grouped frame like yf.download(..., actions=True) returns, on consecutive days."""
+    index = pd.date_range('2024-01-01', periods=len(closes), freq='D', tz='UTC')
+    frame = pd.DataFrame({'Close': closes,
+                          'Dividends': dividends or [0.0] * len(closes),
+                          'Stock Splits': splits or [0.0] * len(closes)}, index=index)
+    return pd.concat({symbol: frame}, axis=1)
+
+def test_dividend_then_split_in_one_batch(tmp_path):
+    # Provider history is split-adjusted: raw 300 before the 3:1 split, quoted as 100,
+    # and the dividend of 3.00 per pre-split share is quoted as 1.00
+    batch = download([100.0, 100.0, 100.0, 100.0, 101.0],
+                     splits=[0, 0, 0, 3.0, 0], dividends=[0, 1.0, 0, 0, 0])
+    store = CorporateActionStore('equity', str(tmp_path))
+    adjusted = store.merge(batch)
+
+    assert adjusted == {'XYZ': '2024-01-02'}
+    dividend = [event for event in store.symbol_events('XYZ') if event['type'] == 'dividend'][0]
+    assert dividend['factor'] == pytest.approx(0.99)
+    np.testing.assert_allclose(store.raw[0], [300.0, 300.0, 300.0, 100.0, 101.0])
+    np.testing.assert_allclose(store.adjusted_close()[0], [99.0, 100.0, 100.0, 100.0, 101.0])
+
+def test_dividend_on_first_bar_of_incremental_batch(tmp_path):
+    store = CorporateActionStore('equity', str(tmp_path))
+    store.merge(download([100.0, 100.0, 100.0]))
+    # The next download starts on the ex-date and also carries a later 2:1 split
+    index = pd.date_range('2024-01-04', periods=3, freq='D', tz='UTC')
+    frame = pd.DataFrame({'Close': [50.0, 50.0, 50.0], 'Dividends': [0.5, 0.0, 0.0],
+                          'Stock Splits': [0.0, 2.0, 0.0]}, index=index)
+    store.merge(pd.concat({'XYZ': frame}, axis=1))
+
+    dividend = [event for event in store.symbol_events('XYZ') if event['type'] == 'dividend'][0]
+    assert dividend['factor'] == pytest.approx(0.99) # 0.50 on the previous close of 100 / 2
+    np.testing.assert_allclose(store.adjusted_close()[0], [49.5, 49.5, 49.5, 50.0, 50.0, 50.0])
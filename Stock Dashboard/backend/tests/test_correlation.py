@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlation
+from correlation import RollingCovariance, window_returns
+
+SYMBOLS = [f'S{i}' for i in range(7)]
+
+def sample_returns(days=120, seed=4):
+    """Correlated daily returns with scattered gaps and one symbol that starts late."""
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.01, size=(days, 1))
+    returns = common + rng.normal(0, 0.01, size=(days, len(SYMBOLS)))
+    returns[rng.random(returns.shape) < 0.1] = np.nan
+    returns[:40, 3] = np.nan
+    return np.arange(20000, 20000 + days), returns.astype(np.float32)
+
+def assert_matches_pandas(engine, returns):
+    # The engine sums in float32: compare with pandas' float64 statistics of the same returns
+    frame = pd.DataFrame(returns.astype(float), columns=SYMBOLS)
+    corr, cov, observations = engine.matrices(range(len(SYMBOLS)))
+    np.testing.assert_allclose(corr, frame.corr().to_numpy(), rtol=0, atol=1e-5)
+    np.testing.assert_allclose(cov, frame.cov().to_numpy(), rtol=1e-4, atol=1e-9)
+    present = frame.notna().to_numpy().astype(int)
+    np.testing.assert_array_equal(observations, present.T @ present)
+
+def test_full_window_matches_pandas(monkeypatch):
+    monkeypatch.setattr(correlation, 'BLOCK_SIZE', 3) # Several blocks of symbol rows
+    days, returns = sample_returns()
+    engine = RollingCovariance(SYMBOLS)
+    assert engine.update(days, returns) == 'full'
+    assert_matches_pandas(engine, returns)
+    # Reordered rows: the matrices follow the requested order
+    rows = [4, 0, 6]
+    corr, _, _ = engine.matrices(rows)
+    expected = pd.DataFrame(returns.astype(float), columns=SYMBOLS).iloc[:, rows].corr().to_numpy()
+    np.testing.assert_allclose(corr, expected, rtol=0, atol=1e-5)
+
+def test_rolling_updates_match_a_rebuild(monkeypatch):
+    monkeypatch.setattr(correlation, 'BLOCK_SIZE', 3)
+    days, returns = sample_returns(days=160)
+    window = 100
+    engine = RollingCovariance(SYMBOLS)
+    engine.update(days[:window], returns[:window])
+    for end in range(window + 1, len(days) + 1):
+        current = returns[end - window:end].copy()
+        if end % 10 == 0:
+            current[-2, 1] += np.float32(0.003) # A corrected bar inside the window
+        assert engine.update(days[end - window:end], current) == 'incremental'
+        assert_matches_pandas(engine, current)
+    assert engine.update(days[-window:], current) == 'unchanged'
+
+@pytest.fixture
+def sample_panels(make_panel, random_closes):
+    """`sample_panels(end)`: an equity and a crypto panel of the 2024 random walks up to `end`."""
+    dates = pd.bdate_range('2024-01-01', '2024-12-31').tz_localize('UTC')
+    equity = random_closes(dates, ['AAPL', 'MSFT', 'SPY'], seed=5, missing=0.05)
+    equity.iloc[:200, 1] = np.nan # MSFT listed late in the year
+    crypto = random_closes(pd.date_range('2024-01-01', '2024-12-31').tz_localize('UTC'), ['BTC-USD'], seed=6)
+
+    def make(end='2024-12-31'):
+        end = pd.Timestamp(end, tz='UTC')
+        return dates[dates <= end], [make_panel('equity', equity[:end]), make_panel('crypto', crypto[:end])]
+    return make
+
+def test_window_returns_match_pandas(sample_panels):
+    dates, panels = sample_panels()
+    symbols, days, returns = window_returns(panels, '3m')
+    assert symbols == ['AAPL', 'MSFT', 'SPY', 'BTC-USD']
+    # Closes as of each equity trading day, then log returns over the last 91 calendar days
+    closes = pd.concat([panel.series(symbol).astype(float).rename(symbol) for panel in panels for symbol in panel.symbols],
+                       axis=1, sort=True)
+    closes = closes.ffill().reindex(dates)
+    expected = np.log(closes[symbols]).diff()
+    expected = expected[expected.index > dates[-1] - pd.Timedelta(days=91)]
+    np.testing.assert_array_equal(days, (expected.index - pd.Timestamp(0, tz='UTC')).days)
+    np.testing.assert_allclose(returns, expected.to_numpy(), rtol=1e-5, atol=1e-7, equal_nan=True)
+    # Reading only the recent days gives the last rows of the same matrix
+    _, _, recent = window_returns(panels, '3m', since_day=int(days[-10]))
+    np.testing.assert_array_equal(recent, returns[-10:])
+
+def test_refreshes_only_reread_recent_days(sample_panels):
+    _, panels = sample_panels('2024-12-02')
+    symbols, days, returns = window_returns(panels, '1y')
+    engine = RollingCovariance(symbols)
+    assert engine.update(days, returns) == 'full'
+    assert engine.reread_since() == days[-1] - correlation.REVISION_DAYS
+
+    _, panels = sample_panels('2024-12-31') # Four more weeks of bars
+    symbols, days, recent = window_returns(panels, '1y', engine.reread_since())
+    assert len(recent) < len(days)
+    assert engine.update(days, recent) == 'incremental'
+    _, _, returns = window_returns(panels, '1y')
+    np.testing.assert_array_equal(engine.returns, returns)
+    rebuilt = RollingCovariance(symbols)
+    rebuilt.update(days, returns)
+    for actual, expected in zip(engine.matrices(range(len(symbols))), rebuilt.matrices(range(len(symbols)))):
+        np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-8)
+
+def test_recent_days_alone_cannot_start_a_window():
+    days, returns = sample_returns()
+    engine = RollingCovariance(SYMBOLS)
+    assert engine.update(days, returns[-10:]) is None # The earlier days are not in the window yet
+    assert engine.update(days, returns) == 'full'
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from app import DateAxis, get_start_date_from_period, get_ytd_start_date
+
+PERIODS = ('1d', '1w', '1m', '3m', '6m', '1y', '2y', '3y', '5y', 'ytd')
+
+def mask_start(index, period):
+    """The date-mask slicing DateAxis replaced: the first bar on or after the period start."""
+    reference = index[-1]
+    start = get_ytd_start_date(reference) if period == 'ytd' else get_start_date_from_period(period, reference)
+    return int((index < pd.Timestamp(start)).sum()), pd.Timestamp(start)
+
+def sample_index(end='2025-03-17'):
+    """Weekdays with holes, so period starts often fall on missing days."""
+    index = pd.bdate_range(end=end, periods=1400, tz='UTC')
+    return index.delete(range(5, len(index), 7))
+
+@pytest.mark.parametrize('period', PERIODS)
+def test_offsets_match_date_masks(period):
+    index = sample_index()
+    axis = DateAxis(index)
+    start, start_date = mask_start(index, period)
+    assert axis.start_offset(period) == start
+    assert index[start:].equals(index[index >= start_date])
+    # The baseline is the last bar on or before the start (the first bar when there is none)
+    before = index[index <= start_date]
+    assert axis.baseline_offset(period) == (len(before) - 1 if len(before) else 0)
+
+def test_naive_and_converted_indexes_are_normalized_to_utc():
+    index = sample_index()
+    naive, eastern = DateAxis(index.tz_localize(None)), DateAxis(index.tz_convert('America/New_York'))
+    for period in PERIODS:
+        assert naive.start_offset(period) == eastern.start_offset(period) == DateAxis(index).start_offset(period)
+
+@pytest.mark.parametrize('period', PERIODS)
+def test_sub_axes_share_their_parents_offsets(period):
+    index = sample_index()
+    parent = DateAxis(index)
+    for start in (0, 17, 900, 1190):
+        child = parent.sub_axis(start, len(index))
+        assert child.start_offset(period) == DateAxis(index[start:]).start_offset(period)
+        assert child.baseline_offset(period) == DateAxis(index[start:]).baseline_offset(period)
+        assert child.labels() == index[start:].strftime('%Y-%m-%d').tolist()
+    # A slice that ends earlier has its own reference date, so it resolves its own offsets
+    shorter = parent.sub_axis(0, len(index) - 30)
+    assert shorter.start_offset(period) == mask_start(index[:-30], period)[0]
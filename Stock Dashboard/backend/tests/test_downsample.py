@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import pytest
+
+from downsample import downsample_indices, lttb_indices, minmax_indices
+
+def naive_lttb(y, n_out):
+    """Textbook LTTB with plain loops: one point per bucket, maximizing the triangle area."""
+    n = len(y)
+    every = (n - 2) / (n_out - 2)
+    selected, a = [0], 0
+    for i in range(n_out - 2):
+        next_start, next_end = math.floor((i + 1) * every) + 1, min(math.floor((i + 2) * every) + 1, n)
+        avg_x = sum(range(next_start, next_end)) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = None, -1.0
+        for j in range(math.floor(i * every) + 1, math.floor((i + 1) * every) + 1):
+            area = abs((a - avg_x) * (y[j] - y[a]) - (a - j) * (avg_y - y[a])) / 2
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    return selected + [n - 1]
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    y = np.cumsum(rng.normal(0, 1, n))
+    y[n // 3] += 40 # A spike that must survive min/max bucketing
+    return y
+
+@pytest.mark.parametrize('n, n_out', [(1000, 100), (1257, 500), (50, 7), (10, 9)])
+def test_lttb_matches_loop_reference(n, n_out):
+    y = series(n)
+    indices = lttb_indices(y, n_out)
+    assert indices.tolist() == naive_lttb(y.tolist(), n_out)
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+
+@pytest.mark.parametrize('n, n_out', [(1000, 100), (1257, 500), (50, 7), (10, 9)])
+def test_minmax_keeps_endpoints_and_extremes_within_budget(n, n_out):
+    y = series(n, seed=1)
+    indices = minmax_indices(y, n_out)
+    assert len(indices) <= n_out
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+    assert {int(np.argmin(y)), int(np.argmax(y)), n // 3} <= set(indices.tolist())
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_budget_at_or_above_length_keeps_every_point(method):
+    y = series(120)
+    for n_out in (120, 500):
+        assert downsample_indices(y, n_out, method).tolist() == list(range(120))
+    assert downsample_indices(y, 2, method).tolist() == list(range(120)) # Budget too small to bucket
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import INDICATOR_COLUMNS, MAX_INCREMENTAL_BARS, compute_indicator_arrays, extend_indicator_arrays
+from timeframes import resample_bars
+
+def ohlcv(dates, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+    return pd.DataFrame({'Open': close * 0.99, 'High': close * 1.02, 'Low': close * 0.97, 'Close': close,
+                         'Volume': rng.integers(1, 1000, len(dates)).astype(float)}, index=dates)
+
+def test_weeks_run_saturday_to_friday(generate_data):
+    # Crypto trades every day: Saturday 2025-03-08 opens the week that ends Friday 2025-03-14
+    frame = ohlcv(pd.date_range('2025-03-05', '2025-03-16', tz='UTC'))
+    bars = generate_data.resample_ohlcv(frame, 'weekly')
+    assert bars.index.strftime('%Y-%m-%d').tolist() == ['2025-03-07', '2025-03-14', '2025-03-16']
+    week = frame.loc['2025-03-08':'2025-03-14']
+    assert bars.iloc[1].to_dict() == {'Open': week['Open'].iloc[0], 'High': week['High'].max(), 'Low': week['Low'].min(),
+                                      'Close': week['Close'].iloc[-1], 'Volume': week['Volume'].sum()}
+
+@pytest.mark.parametrize('timeframe', ['weekly', 'monthly'])
+@pytest.mark.parametrize('calendar', ['B', 'D'])
+def test_backend_resampling_matches_the_static_generator(generate_data, timeframe, calendar):
+    dates = pd.date_range('2023-12-20', '2025-03-12', freq=calendar, tz='UTC')
+    frame = ohlcv(dates.delete(range(3, len(dates), 11)), seed=1) # With holidays
+    bars, keys = resample_bars(frame, timeframe)
+    expected = generate_data.resample_ohlcv(frame, timeframe)
+    pd.testing.assert_frame_equal(bars, expected, check_freq=False)
+    assert len(np.unique(keys)) == len(keys) == len(bars)
+
+def full_and_incremental(close, start):
+    previous = compute_indicator_arrays(close[:start])
+    return compute_indicator_arrays(close), extend_indicator_arrays(close, previous, start)
+
+@pytest.mark.parametrize('appended', [1, 5, MAX_INCREMENTAL_BARS])
+def test_appended_bars_match_a_full_recompute(appended):
+    close = ohlcv(pd.bdate_range('2022-01-03', periods=400), seed=2)['Close'].to_numpy()
+    full, incremental = full_and_incremental(close, len(close) - appended)
+    for column in INDICATOR_COLUMNS + ['_avg_gain', '_avg_loss']:
+        np.testing.assert_allclose(incremental[column], full[column], rtol=1e-12, atol=1e-12, equal_nan=True)
+
+def test_a_changed_last_bar_matches_a_full_recompute():
+    close = ohlcv(pd.bdate_range('2022-01-03', periods=300), seed=3)['Close'].to_numpy()
+    previous = compute_indicator_arrays(close)
+    revised = close.copy()
+    revised[-1] *= 1.03 # The current bar moved since the last refresh
+    incremental = extend_indicator_arrays(revised, previous, len(close) - 1)
+    full = compute_indicator_arrays(revised)
+    for column in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(incremental[column], full[column], rtol=1e-12, atol=1e-12, equal_nan=True)
+
+def test_short_histories_leave_the_z_score_undefined():
+    close = ohlcv(pd.bdate_range('2024-01-01', periods=60), seed=4)['Close'].to_numpy()
+    full, incremental = full_and_incremental(close, 55)
+    assert np.isnan(incremental['Z_Score_100']).all() and np.isnan(full['Z_Score_100']).all()
+    np.testing.assert_allclose(incremental['RSI14'], full['RSI14'], rtol=1e-12)
+
+@pytest.mark.parametrize('close', [np.linspace(50.0, 80.0, 40), np.full(40, 50.0)], ids=['rising', 'flat'])
+def test_loss_free_rsi_matches_a_full_recompute(close):
+    # No losses: steady gains read as RSI 100, no movement at all as 50
+    full, incremental = full_and_incremental(close, 30)
+    np.testing.assert_array_equal(incremental['RSI14'], full['RSI14'])
+    assert full['RSI14'][-1] == (100.0 if close[-1] > close[0] else 50.0)
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio import Holdings, PortfolioEngine, panel_days, summarize
+
+NOW = pd.Timestamp('2025-03-14', tz='UTC')
+NOW_DAY = int((NOW - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1))
+
+@pytest.fixture
+def make_panels(make_panel, random_closes):
+    """`make_panels(end=NOW)`: an equity and a crypto panel of the same random walks up to `end`."""
+    def make(end=NOW):
+        weekdays = pd.bdate_range('2023-06-01', end.tz_localize(None)).tz_localize('UTC')
+        every_day = pd.date_range('2023-06-01', end.tz_localize(None)).tz_localize('UTC')
+        equity = random_closes(weekdays, ['AAPL', 'MSFT', 'SPY'], seed=1, missing=0.02)
+        crypto = random_closes(every_day, ['BTC-USD'], seed=2)
+        return [make_panel('equity', equity), make_panel('crypto', crypto)]
+    return make
+
+def make_holdings(tmp_path):
+    holdings = Holdings(str(tmp_path / 'holdings.json'))
+    for account, symbol, quantity, cost, acquired in (
+            ('ira', 'AAPL', 10, 1000, '2024-01-02'), ('ira', 'MSFT', 5, 600, '2024-06-03'),
+            ('ira', 'AAPL', 3, 330, '2025-01-10'), ('taxable', 'BTC-USD', 0.5, 40, '2024-02-14'),
+            ('taxable', 'SPY', 2, 210, '2024-12-31'), ('taxable', 'MSFT', 1, 120, NOW.strftime('%Y-%m-%d'))):
+        holdings.add_lot(account, {'symbol': symbol, 'quantity': quantity, 'cost_basis': cost, 'acquired': acquired})
+    return holdings
+
+def reference(panels, holdings, days):
+    """Per-account value, P&L and time-weighted index on the engine's calendar, by plain loops."""
+    calendar = pd.to_datetime(days, unit='D', utc=True)
+    prices = {}
+    for panel in panels:
+        for symbol in panel.symbols:
+            series = panel.series(symbol).astype(float).dropna()
+            prices[symbol] = series.reindex(series.index.union(calendar)).ffill().reindex(calendar).fillna(0.0).to_numpy()
+    accounts = sorted(holdings.accounts)
+    value, index = np.zeros((len(accounts), len(days))), np.ones((len(accounts), len(days)))
+    for a, account in enumerate(accounts):
+        lots = [(lot['symbol'], lot['quantity'], pd.Timestamp(lot['acquired'], tz='UTC')) for lot in holdings.accounts[account]['lots']]
+        for t, day in enumerate(calendar):
+            value[a, t] = sum(quantity * prices[symbol][t] for symbol, quantity, acquired in lots if acquired <= day)
+            if t == 0:
+                continue
+            previous_day = calendar[t - 1]
+            held = [(symbol, quantity) for symbol, quantity, acquired in lots if acquired <= previous_day]
+            pnl = sum(quantity * (prices[symbol][t] - prices[symbol][t - 1]) for symbol, quantity in held)
+            previous_value = sum(quantity * prices[symbol][t - 1] for symbol, quantity in held)
+            index[a, t] = index[a, t - 1] * (1 + (pnl / previous_value if previous_value > 0 else 0.0))
+    return accounts, value, index
+
+def test_engine_matches_loop_reference(tmp_path, make_panels):
+    panels = make_panels()
+    holdings = make_holdings(tmp_path)
+    state = PortfolioEngine().update(holdings, panels, now_day=NOW_DAY)
+
+    accounts, value, index = reference(panels, holdings, state['days'])
+    assert state['accounts'] == accounts
+    np.testing.assert_allclose(state['value'], value, rtol=1e-9)
+    np.testing.assert_allclose(state['index'], index, rtol=1e-9)
+
+    summary = summarize(state)
+    costs = [sum(lot['cost_basis'] for lot in holdings.accounts[account]['lots']) for account in accounts]
+    np.testing.assert_allclose(summary['unrealized_pnl'], value[:, -1] - costs)
+    # The MSFT lot bought on the last day is a cash flow, not part of the day's P&L
+    np.testing.assert_allclose(summary['daily_pnl'], value[:, -1] - value[:, -2] - [0, 120])
+
+def test_incremental_update_matches_full_recompute(tmp_path, make_panels):
+    holdings = make_holdings(tmp_path)
+    engine = PortfolioEngine()
+    engine.update(holdings, make_panels(), now_day=NOW_DAY)
+    assert engine.update(holdings, make_panels(), now_day=NOW_DAY) is not None
+
+    # A corrected last bar plus one new day, on the same history
+    later = NOW + pd.Timedelta(days=3)
+    panels = make_panels(end=later)
+    equity = panels[0]
+    assert panel_days(equity)[-1] == NOW_DAY + 3
+    incremental = engine.update(holdings, panels, now_day=NOW_DAY + 3)
+    full = PortfolioEngine().update(holdings, panels, now_day=NOW_DAY + 3)
+    for name in ('value', 'pnl', 'prev_value', 'index'):
+        np.testing.assert_allclose(incremental[name], full[name], rtol=1e-12, atol=1e-9)
+
+def test_symbols_are_validated_on_every_add(tmp_path):
+    tracked = ['AAPL']
+    holdings = Holdings(str(tmp_path / 'holdings.json'), valid_symbols=lambda: tracked)
+    with pytest.raises(ValueError):
+        holdings.add_lot('ira', {'symbol': 'NVDA', 'quantity': 1, 'cost_basis': 100})
+    tracked.append('NVDA') # e.g. added to a watchlist after startup
+    assert holdings.add_lot('ira', {'symbol': 'nvda', 'quantity': 1, 'cost_basis': 100})['symbol'] == 'NVDA'
+
+@pytest.mark.parametrize('lot', [
+    {'quantity': 'inf', 'cost_basis': 100}, {'quantity': 'nan', 'cost_basis': 100}, {'quantity': 0, 'cost_basis': 100},
+    {'quantity': 1, 'cost_basis': 'inf'}, {'quantity': 1, 'cost_basis': '-inf'}, {'quantity': 1, 'cost_basis': -1},
+])
+def test_non_finite_or_negative_lots_are_rejected(tmp_path, lot):
+    holdings = Holdings(str(tmp_path / 'holdings.json'))
+    with pytest.raises(ValueError):
+        holdings.add_lot('ira', {'symbol': 'AAPL', **lot})
+    assert holdings.accounts == {}
+
+def test_responses_map_infinities_to_null(backend_app):
+    payload = {'value': float('inf'), 'pnl': [float('-inf'), float('nan'), 1.5]}
+    assert backend_app.clean_nan(payload) == {'value': None, 'pnl': [None, None, 1.5]}
@@ -0,0 +1,13 @@
+import numpy as np
+import pandas as pd
+
+def test_last_bars_leave_out_symbols_without_bars(make_panel, random_closes):
+    dates = pd.bdate_range('2025-01-01', periods=30).tz_localize('UTC')
+    closes = random_closes(dates, ['AAPL', 'MSFT', 'NOPE'], seed=9)
+    closes['NOPE'] = np.nan # Unknown to the data provider
+    closes.iloc[-3:, 1] = np.nan # MSFT's latest bars are missing
+    first = make_panel('equity', closes).last_bars()
+    assert set(first) == {'AAPL', 'MSFT'}
+    assert first['MSFT'] == (dates[-4].strftime('%Y-%m-%d'), float(np.float32(closes.iloc[-4, 1])))
+    # An identical rewrite reports no symbol as changed
+    assert make_panel('equity', closes).last_bars() == first
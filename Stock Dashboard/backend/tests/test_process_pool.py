@@ -0,0 +1,36 @@
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from process_pool import START_METHOD, SharedArrays, WorkerPool, attach
+
+def _row_sum(task):
+    shared, row = task
+    arrays = attach(shared)
+    return os.getpid(), id(arrays), float(arrays['matrix'][row].sum() + arrays['offsets'][row])
+
+def test_tasks_read_the_shared_arrays_once_per_worker():
+    matrix = np.arange(40, dtype=np.float32).reshape(8, 5)
+    offsets = np.linspace(0.0, 1.0, 8)
+    pool = WorkerPool()
+    try:
+        with SharedArrays({'matrix': matrix, 'offsets': offsets}) as shared:
+            results = pool.map(_row_sum, [(shared, row) for row in range(8)], workers=2)
+        assert [total for _, _, total in results] == pytest.approx(matrix.sum(axis=1) + offsets)
+        mappings = {}
+        for pid, mapping, _ in results:
+            assert mappings.setdefault(pid, mapping) == mapping # One mapping per worker, reused by its tasks
+        assert pool.executor._mp_context.get_start_method() == START_METHOD != 'fork'
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shared[0]) # Unlinked once the job is done
+    finally:
+        pool.executor.shutdown()
+
+def test_attached_arrays_are_read_only():
+    with SharedArrays({'values': np.ones(3)}) as shared:
+        values = attach(shared)['values']
+        with pytest.raises(ValueError):
+            values[0] = 2.0
+        np.testing.assert_array_equal(values, np.ones(3))
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeframes import TimeframeCache, resample_bars
+
+DRAWDOWN_PERIODS = ('1m', '3m', '6m', '1y', '5y')
+CHANGE_PERIODS = ('1d', '1w', '1m', '3m', '6m', '1y')
+# Every drawdown period (with the default change period) and every change period (with the default drawdown)
+SELECTIONS = [(period, '1d') for period in DRAWDOWN_PERIODS] + [('1y', period) for period in CHANGE_PERIODS[1:]]
+SPY_1Y_CHANGE = 7.5
+FIELDS = ('latest_price', 'daily_change_pct', 'ema13', 'ema21', 'ema100', 'ema200', 'rsi14', 'z_score_100',
+          'ema_signal', 'ema_long_signal', 'current_drawdown_pct', 'relative_perf_1y')
+HISTORIES = {
+    'asset_1y_history_dates': ('asset_1y_history_values',),
+    'drawdown_history_dates': ('drawdown_history_values',),
+    'rsi_1y_history_dates': ('rsi_1y_history_values',),
+    'zscore_1y_history_dates': ('zscore_1y_history_values',),
+    'ema_1y_history_dates': ('ema13_1y_history_values', 'ema21_1y_history_values'),
+    'ema_long_1y_history_dates': ('ema100_1y_history_values', 'ema200_1y_history_values'),
+}
+
+@pytest.fixture
+def quoted(backend_app, make_panel, random_closes, tmp_path, monkeypatch):
+    """A daily panel (a random walk and a steady climb whose last bar is every window's peak) and a fresh cache."""
+    monkeypatch.setattr(backend_app, 'TIMEFRAME_CACHE', TimeframeCache(str(tmp_path / 'timeframe_state.npz')))
+    dates = pd.bdate_range(end='2025-06-11', periods=1400, tz='UTC') # A Wednesday mid-month
+    closes = random_closes(dates, ['AAPL'], seed=3)
+    closes['MSFT'] = np.linspace(50.0, 400.0, len(dates))
+    return make_panel('equity', closes)
+
+def quote_day(last_day, timeframe, append):
+    """A quote time on the last bar's day, or on a day that starts the next bar of `timeframe`."""
+    if not append:
+        return last_day
+    return last_day + {'daily': pd.Timedelta(days=1), 'weekly': pd.Timedelta(days=7),
+                       'monthly': pd.offsets.MonthBegin(1)}[timeframe]
+
+def rebuilt_entry(app, daily, day, price, timeframe, drawdown_period, change_period, symbol):
+    """The entry process_asset_data computes from scratch with the quote as a real daily bar."""
+    daily = daily.copy()
+    if day == daily.index[-1]:
+        daily.iloc[-1, daily.columns.get_loc('Close')] = price
+    else:
+        daily = pd.concat([daily, pd.DataFrame({'Close': [price]}, index=pd.DatetimeIndex([day]))])
+    bars, _ = resample_bars(daily, timeframe)
+    return app.clean_nan(app.process_asset_data(symbol, bars, drawdown_period, change_period,
+                                                spy_1y_change=SPY_1Y_CHANGE))
+
+def assert_matches(patched, rebuilt):
+    for field in FIELDS:
+        assert patched[field] == pytest.approx(rebuilt[field], rel=1e-9, abs=1e-9), field
+    assert patched['sparkline_data'] == pytest.approx(rebuilt['sparkline_data'], rel=1e-9)
+    for dates, values in HISTORIES.items():
+        assert patched[dates] == rebuilt[dates], dates
+        for field in values:
+            # History points are rounded to 2 decimals; a patched point was rounded from the same value
+            assert np.allclose(patched[field], np.round(rebuilt[field], 2), atol=0.011), field
+
+@pytest.mark.parametrize('timeframe', ['daily', 'weekly', 'monthly'])
+@pytest.mark.parametrize('append', [False, True], ids=['replaced', 'appended'])
+@pytest.mark.parametrize('symbol', ['AAPL', 'MSFT'])
+def test_overlay_matches_full_rebuild(backend_app, quoted, timeframe, append, symbol):
+    app = backend_app
+    daily = quoted.frame(symbol)[['Close']].astype(float)
+    day = quote_day(daily.index[-1], timeframe, append)
+    for multiplier in (0.9, 1.02):
+        price = float(daily['Close'].iloc[-1]) * multiplier
+        for drawdown_period, change_period in SELECTIONS:
+            bars, indicators, axis = app.get_timeframe_data(quoted, symbol, timeframe)
+            base = app.clean_nan(app.process_asset_data(symbol, bars, drawdown_period, change_period,
+                                                        spy_1y_change=SPY_1Y_CHANGE, axis=axis, indicators=indicators))
+            patched = app.overlay_entry(base, symbol, (price, day + pd.Timedelta(hours=15)),
+                                        drawdown_period, change_period, timeframe)
+            assert patched['provisional']
+            rebuilt = rebuilt_entry(app, daily, day, price, timeframe, drawdown_period, change_period, symbol)
+            assert_matches(patched, rebuilt)
+
+def test_stale_quote_leaves_the_entry(backend_app, quoted):
+    app = backend_app
+    bars, indicators, axis = app.get_timeframe_data(quoted, 'AAPL', 'daily')
+    base = app.process_asset_data('AAPL', bars, '1y', '1d', spy_1y_change=SPY_1Y_CHANGE, axis=axis, indicators=indicators)
+    quote = (123.0, bars.index[-2] + pd.Timedelta(hours=15))
+    assert app.overlay_entry(base, 'AAPL', quote, '1y', '1d', 'daily') is base
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+import risk
+from risk import build_model, risk_summary, simulate
+
+def sample_returns(days=300, symbols=4, seed=3):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0004, 0.015, size=(days, symbols)).astype(np.float32)
+
+def naive_bootstrap_chunk(returns, weights, seed, paths, horizon):
+    """One chunk path by path: resample days, compound each symbol, track the portfolio's drawdown."""
+    rows = np.random.default_rng(seed).integers(len(returns), size=(paths, horizon))
+    final, first, drawdowns = [], [], []
+    for path in range(paths):
+        cumulative = np.zeros(returns.shape[1])
+        peak, worst, values = 1.0, 0.0, []
+        for day in range(horizon):
+            cumulative += returns[rows[path, day]].astype(float)
+            value = float((weights * np.exp(cumulative)).sum())
+            peak = max(peak, value)
+            worst = min(worst, value / peak - 1)
+            values.append(value)
+        final.append(values[-1] - 1)
+        first.append(values[0] - 1)
+        drawdowns.append(worst)
+    return np.array(final), np.array(first), np.array(drawdowns)
+
+def test_bootstrap_chunk_matches_loop_reference():
+    returns = sample_returns()
+    weights = np.array([0.4, 0.3, 0.2, 0.1])
+    model = build_model(returns, weights, 'bootstrap')
+    seed = np.random.SeedSequence(7)
+    results = risk._simulate_chunk((seed, 50, 15), model)
+    for actual, expected in zip(results, naive_bootstrap_chunk(returns, weights, seed, 50, 15)):
+        np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_normal_model_keeps_the_sample_covariance():
+    returns = sample_returns()
+    model = build_model(returns, np.full(4, 0.25), 'normal')
+    loadings = model['loadings'].astype(float)
+    covariance = loadings.T @ loadings + np.diag(model['residual_sd'].astype(float) ** 2)
+    frame = pd.DataFrame(returns.astype(float))
+    np.testing.assert_allclose(covariance, frame.cov().to_numpy(), rtol=1e-4, atol=1e-9)
+    np.testing.assert_allclose(model['mean'], frame.mean().to_numpy(), rtol=1e-5)
+
+def test_summary_matches_pandas_quantiles():
+    rng = np.random.default_rng(11)
+    horizon, one_day, drawdowns = rng.normal(0, 0.05, 4000), rng.normal(0, 0.01, 4000), -rng.random(4000) * 0.4
+    summary = risk_summary(horizon, one_day, drawdowns)
+    tail = pd.Series(horizon)
+    cutoff = tail.quantile(0.05)
+    assert np.isclose(summary['var']['95']['horizon_pct'], -cutoff * 100)
+    assert np.isclose(summary['cvar']['95']['horizon_pct'], -tail[tail <= cutoff].mean() * 100)
+    assert np.isclose(summary['max_drawdown']['probability_exceeding']['20'], (drawdowns < -0.2).mean())
+
+def test_seeded_results_do_not_depend_on_workers(monkeypatch):
+    monkeypatch.setattr(risk, 'CHUNK_ELEMENTS', 2000) # 2000 // (10 x 4) = 50 paths per chunk
+    for method in ('bootstrap', 'normal'):
+        model = build_model(sample_returns(), np.full(4, 0.25), method)
+        inline = simulate(model, 420, 10, seed=5, workers=1)
+        pooled = simulate(model, 420, 10, seed=5, workers=3)
+        for a, b in zip(inline, pooled):
+            np.testing.assert_array_equal(a, b)
+    executor = risk._pool.executor
+    assert executor is not None
+    simulate(model, 420, 10, seed=6, workers=3)
+    assert risk._pool.executor is executor # Reused, not recreated per call
@@ -0,0 +1,45 @@
+from datetime import date, datetime, timedelta, timezone
+
+from scheduler import RefreshSchedule, always_open_calendar, equity_calendar, equity_session, nyse_holidays
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+def equity_schedule():
+    return RefreshSchedule('equity', equity_calendar, open_interval=15 * 60, closed_interval=None, settle_delay=20 * 60)
+
+def test_holidays_and_early_closes():
+    assert {date(2025, 4, 18), date(2025, 6, 19), date(2025, 7, 4), date(2025, 11, 27), date(2025, 12, 25)} <= nyse_holidays(2025)
+    assert date(2021, 12, 31) not in nyse_holidays(2022) # New Year's Day on a Saturday is not observed
+    assert equity_session(date(2025, 4, 18)) is None
+    # 1pm closes: the day after Thanksgiving (EST) and July 3rd (EDT)
+    assert equity_session(date(2025, 11, 28)) == (utc(2025, 11, 28, 14, 30), utc(2025, 11, 28, 18))
+    assert equity_session(date(2025, 7, 3)) == (utc(2025, 7, 3, 13, 30), utc(2025, 7, 3, 17))
+    assert equity_session(date(2025, 7, 2))[1] == utc(2025, 7, 2, 20)
+
+def test_first_run_is_immediate():
+    now = utc(2025, 4, 19, 12)
+    assert equity_schedule().next_run(now, None) == now
+
+def test_open_session_runs_on_the_interval():
+    last_run = utc(2025, 4, 17, 15)
+    assert equity_schedule().next_run(utc(2025, 4, 17, 15, 5), last_run) == last_run + timedelta(minutes=15)
+
+def test_settle_refresh_then_skip_the_holiday():
+    schedule = equity_schedule()
+    # Thursday before Good Friday: the last reconcile ran just before the 20:00 UTC close
+    assert schedule.next_run(utc(2025, 4, 17, 20, 5), utc(2025, 4, 17, 19, 55)) == utc(2025, 4, 17, 20, 20)
+    # After the settle refresh nothing runs until Monday's open
+    assert schedule.next_run(utc(2025, 4, 17, 20, 21), utc(2025, 4, 17, 20, 20)) == utc(2025, 4, 21, 13, 30)
+    assert schedule.next_run(utc(2025, 4, 18, 15), utc(2025, 4, 17, 20, 20)) == utc(2025, 4, 21, 13, 30)
+
+def test_settle_refresh_after_an_early_close():
+    schedule = equity_schedule()
+    assert schedule.next_run(utc(2025, 11, 28, 17, 50), utc(2025, 11, 28, 17, 45)) == utc(2025, 11, 28, 18)
+    assert schedule.next_run(utc(2025, 11, 28, 18, 5), utc(2025, 11, 28, 17, 55)) == utc(2025, 11, 28, 18, 20)
+    assert schedule.next_run(utc(2025, 11, 28, 18, 30), utc(2025, 11, 28, 18, 20)) == utc(2025, 12, 1, 14, 30)
+
+def test_crypto_runs_around_the_clock():
+    schedule = RefreshSchedule('crypto', always_open_calendar, open_interval=15 * 60)
+    last_run = utc(2025, 4, 18, 3)
+    assert schedule.next_run(utc(2025, 4, 18, 3, 1), last_run) == utc(2025, 4, 18, 3, 15)
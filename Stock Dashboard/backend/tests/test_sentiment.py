@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from sentiment import JsonlHeadlineSource, SentimentPipeline
+
+def article(headline, symbols=('NVDA',), published='2025-04-17'):
+    return {'symbols': list(symbols), 'published': published, 'headline': headline}
+
+def append(path, *records, raw=b''):
+    with open(path, 'ab') as f:
+        for record in records:
+            f.write(json.dumps(record).encode('utf-8') + b'\n')
+        f.write(raw)
+
+@pytest.fixture
+def feed(tmp_path):
+    """(news directory, pipeline with its state under tmp_path)."""
+    news = tmp_path / 'news'
+    news.mkdir()
+    return news, SentimentPipeline(str(tmp_path / 'state' / 'sentiment_state.json'))
+
+def test_resent_articles_are_scored_and_counted_once(feed):
+    news, pipeline = feed
+    append(news / 'wire.jsonl', article('Nvidia beats estimates, shares surge', ['NVDA', 'AMD']),
+           article('Boeing shares fall on delays', ['BA']))
+    stats = pipeline.ingest(JsonlHeadlineSource(str(news)))
+    assert stats == {'read': 2, 'scored': 2, 'cached': 0, 'duplicates': 0, 'skipped': 0}
+    scores = pipeline.monthly_scores()
+
+    # The same story syndicated elsewhere, re-cased and re-spaced; once more with a new symbol
+    append(news / 'syndicated.jsonl', article('NVIDIA  beats estimates,\tshares SURGE', ['nvda']),
+           article('Nvidia beats estimates, shares surge', ['NVDA', 'TSM']))
+    stats = pipeline.ingest(JsonlHeadlineSource(str(news)))
+    assert stats == {'read': 2, 'scored': 0, 'cached': 2, 'duplicates': 2, 'skipped': 0}
+    assert pipeline.rollup['NVDA']['2025-04'][1] == 1
+    assert pipeline.monthly_scores()['TSM'] == scores['NVDA']
+    assert {symbol: months for symbol, months in pipeline.monthly_scores().items() if symbol != 'TSM'} == scores
+
+def test_appends_are_read_from_the_cursor(feed):
+    news, pipeline = feed
+    path = news / 'wire.jsonl'
+    append(path, article('Nvidia beats estimates'), article('AMD gains on upgrade', ['AMD']),
+           raw=b'{"symbols": ["BA"], "published": "2025-04-18", "headline": "Boeing ')
+    source = JsonlHeadlineSource(str(news))
+    assert pipeline.ingest(source)['read'] == 2 # The partial last line waits for its newline
+
+    # Garble the lines already read without changing the size: only new bytes are parsed
+    consumed = pipeline.cursor['wire.jsonl']['offset']
+    data = path.read_bytes()
+    path.write_bytes(b'x' * (consumed - 1) + b'\n' + data[consumed:])
+    append(path, raw=b'jet deliveries drop"}\n')
+    append(path, article('Tesla recalls vehicles', ['TSLA']))
+    stats = pipeline.ingest(source)
+    assert stats['read'] == 2 and stats['skipped'] == 0
+    assert set(pipeline.rollup) == {'NVDA', 'AMD', 'BA', 'TSLA'}
+
+    # Unchanged files: nothing is read and the state is not rewritten
+    saved = pipeline._mtime
+    assert pipeline.ingest(source) == {'read': 0, 'scored': 0, 'cached': 0, 'duplicates': 0, 'skipped': 0}
+    assert pipeline._mtime == saved
+
+def test_a_rewritten_file_is_reread_without_double_counting(feed):
+    news, pipeline = feed
+    path = news / 'wire.jsonl'
+    append(path, article('Nvidia beats estimates'), article('AMD gains on upgrade', ['AMD']))
+    pipeline.ingest(JsonlHeadlineSource(str(news)))
+    path.write_bytes(b'')
+    append(path, article('Nvidia beats estimates')) # Shorter than the cursor offset
+    stats = pipeline.ingest(JsonlHeadlineSource(str(news)))
+    assert stats == {'read': 1, 'scored': 0, 'cached': 1, 'duplicates': 1, 'skipped': 0}
+    assert pipeline.rollup['NVDA']['2025-04'][1] == 1
+
+def test_incremental_runs_match_a_cold_run(feed, tmp_path):
+    news, pipeline = feed
+    batches = [[article('Nvidia beats estimates'), article('AMD misses, shares drop', ['AMD'], '2025-05-02')],
+               [article('Nvidia not bullish on supply', ['NVDA'], '2025-05-09'), {'headline': 'no symbols'}],
+               [article('AMD misses, shares drop', ['AMD'], '2025-05-02'), article('Record quarter', ['AMD'])]]
+    for records in batches:
+        append(news / 'wire.jsonl', *records)
+        pipeline.ingest(JsonlHeadlineSource(str(news)))
+    cold = SentimentPipeline(str(tmp_path / 'cold.json'))
+    cold.ingest(JsonlHeadlineSource(str(news)))
+    assert pipeline.monthly_scores() == cold.monthly_scores()
+    # A restarted pipeline resumes from the saved cursor
+    restarted = SentimentPipeline(pipeline.path)
+    assert restarted.ingest(JsonlHeadlineSource(str(news)))['read'] == 0
+    assert restarted.monthly_scores() == cold.monthly_scores()
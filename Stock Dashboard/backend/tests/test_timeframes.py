@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from timeframes import TimeframeCache
+
+@pytest.fixture
+def daily_frame(random_closes):
+    """`daily_frame(seed)`: 600 weekday closes as the daily frame of one symbol."""
+    def make(seed=0):
+        dates = pd.bdate_range(end='2025-03-14', periods=600).tz_localize('UTC').as_unit('s') # Panel dates are in seconds
+        return random_closes(dates, ['Close'], seed=seed)
+    return make
+
+def test_saved_state_round_trips(tmp_path, daily_frame):
+    path = str(tmp_path / 'timeframe_state.npz')
+    frames = {'AAPL': daily_frame(seed=1), 'MSFT': daily_frame(seed=2)}
+    cache = TimeframeCache(path)
+    expected = {(symbol, timeframe): cache.get(symbol, frame, timeframe)
+                for symbol, frame in frames.items() for timeframe in ('daily', 'weekly', 'monthly')}
+    cache.save()
+
+    restarted = TimeframeCache(path)
+    for (symbol, timeframe), (bars, indicators) in expected.items():
+        restored_bars, restored = restarted.get(symbol, frames[symbol], timeframe)
+        pdt.assert_frame_equal(restored_bars, bars)
+        pdt.assert_frame_equal(restored, indicators, check_freq=False) # freq is not saved
+    assert restarted.stats == {'full': 0, 'incremental': 0, 'unchanged': len(expected)}
+
+def test_restored_state_extends_like_a_full_compute(tmp_path, daily_frame):
+    path = str(tmp_path / 'timeframe_state.npz')
+    frame = daily_frame(seed=3)
+    cache = TimeframeCache(path)
+    for timeframe in ('daily', 'weekly'):
+        cache.get('AAPL', frame.iloc[:-3], timeframe)
+    cache.save()
+
+    restarted = TimeframeCache(path)
+    for timeframe in ('daily', 'weekly'):
+        _, incremental = restarted.get('AAPL', frame, timeframe)
+        _, full = TimeframeCache().get('AAPL', frame, timeframe)
+        np.testing.assert_allclose(incremental.to_numpy(), full.to_numpy(), rtol=1e-10, equal_nan=True)
+    assert restarted.stats['full'] == 0
+
+def test_missing_or_corrupt_state_starts_empty(tmp_path, daily_frame):
+    path = tmp_path / 'timeframe_state.npz'
+    assert TimeframeCache(str(path)).provisional('AAPL', 'daily', pd.Timestamp('2025-03-14', tz='UTC'), 1.0) is None
+    path.write_bytes(b'not an npz')
+    cache = TimeframeCache(str(path))
+    cache.get('AAPL', daily_frame(), 'daily')
+    assert cache.stats['full'] == 1
+
+def test_warm_start_serves_the_persisted_snapshot_as_stale(backend_app, monkeypatch):
+    app = backend_app
+    key = (app.DEFAULT_DRAWDOWN_PERIOD, app.DEFAULT_CHANGE_PERIOD, app.DEFAULT_TIMEFRAME)
+    payload = {'market_data': {}, 'asset_data': {'AAPL': {'latest_price': 123.0}}}
+    monkeypatch.setitem(app.MARKET_DATA_CACHE, 'snapshots', {key: payload})
+    app.persist_snapshots()
+
+    # A restarted scheduling process: nothing refreshed yet, the scheduler thread not started
+    monkeypatch.setattr(app, 'RUN_SCHEDULER', True)
+    monkeypatch.setattr(app.refresh_scheduler, 'start', lambda: None)
+    monkeypatch.setitem(app.MARKET_DATA_CACHE, 'snapshots', {})
+    monkeypatch.setitem(app.MARKET_DATA_CACHE, 'warm_snapshots', {})
+    monkeypatch.setitem(app.MARKET_DATA_CACHE, 'warm_started', False)
+    monkeypatch.setattr(app, '_first_snapshot', type(app._first_snapshot)())
+    response = app.app.test_client().get('/api/dashboard-data')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['stale'] is True
+    assert body['asset_data'] == payload['asset_data']
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from corporate_actions import CorporateActionStore
+from timeframes import TimeframeCache
+from watchlists import SymbolResultCache, WatchlistStore
+
+KEY = ('1y', '1d', 'daily')
+
+@pytest.fixture
+def watched(backend_app, tmp_path, monkeypatch):
+    """The app with its own watchlist store, result caches and quotes, releasing through release_symbols."""
+    app = backend_app
+    monkeypatch.setattr(app, 'SYMBOL_RESULTS', SymbolResultCache())
+    monkeypatch.setattr(app, 'TIMEFRAME_CACHE', TimeframeCache(str(tmp_path / 'timeframe_state.npz')))
+    monkeypatch.setattr(app, 'QUOTE_OVERLAY', {})
+    monkeypatch.setattr(app, 'watchlists', WatchlistStore(str(tmp_path / 'watchlists.json'), on_release=app.release_symbols))
+    return app
+
+@pytest.fixture
+def fake_downloads(backend_app, tmp_path, monkeypatch):
+    """Replaces the provider with random walks; returns the (symbols, period) of every download."""
+    calls = []
+
+    def download_history(symbols, period=backend_app.DATA_FETCH_PERIOD):
+        calls.append((list(symbols), period))
+        index = pd.bdate_range(end='2025-03-14', periods=300 if period == backend_app.DATA_FETCH_PERIOD else 22, tz='UTC')
+        rng = np.random.default_rng(len(calls))
+        return pd.concat({symbol: pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index)))),
+                                                'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+                          for symbol in symbols}, axis=1)
+
+    monkeypatch.setattr(backend_app, 'download_history', download_history)
+    monkeypatch.setattr(backend_app, 'PANEL_DIR', str(tmp_path))
+    monkeypatch.setattr(backend_app, '_bar_stores', {})
+    return calls
+
+def test_last_release_drops_cached_results_state_and_quote(watched, make_panel, random_closes):
+    app = watched
+    dates = pd.bdate_range(end='2025-03-14', periods=300, tz='UTC')
+    panels = {'equity': make_panel('equity', random_closes(dates, ['SPY', 'AAPL', 'ZZZ'], seed=9))}
+    app.watchlists.put('chips', {'symbols': ['ZZZ', 'AAPL']})
+    app.watchlists.put('mine', {'symbols': ['zzz']})
+    quote = (101.0, dates[-1] + pd.Timedelta(hours=15))
+    app.QUOTE_OVERLAY.update(ZZZ=quote, AAPL=quote)
+    for symbol in ('ZZZ', 'AAPL'):
+        assert app.get_symbol_result(symbol, KEY, panels, 1, quote)['provisional']
+
+    app.watchlists.remove('chips') # AAPL is on the dashboard anyway; ZZZ is still on 'mine'
+    assert app.SYMBOL_RESULTS.get('ZZZ', KEY, 1) is not None
+    assert app.SYMBOL_RESULTS.get('AAPL', KEY, 1) is not None
+
+    app.watchlists.remove('mine')
+    assert app.SYMBOL_RESULTS.get('ZZZ', KEY, 1) is None
+    assert app.SYMBOL_RESULTS.get('ZZZ', KEY + ('live',), (1, quote)) is None
+    assert app.TIMEFRAME_CACHE.provisional('ZZZ', 'daily', quote[1], quote[0]) is None
+    assert 'ZZZ' not in app.QUOTE_OVERLAY
+    # Dashboard symbols are never released
+    assert app.SYMBOL_RESULTS.get('AAPL', KEY, 1) is not None and 'AAPL' in app.QUOTE_OVERLAY
+
+def test_stored_bars_are_dropped_at_the_next_refresh(watched, fake_downloads):
+    app = watched
+    app.watchlists.put('mine', {'symbols': ['ZZZ']})
+
+    def refresh():
+        return app.update_bar_store('equity', [s for s in app.get_all_symbols() if app.get_asset_class(s) == 'equity'])[0]
+
+    assert 'ZZZ' in refresh().symbols
+    app.watchlists.remove('mine')
+    assert 'ZZZ' not in refresh().symbols
+    assert 'ZZZ' not in CorporateActionStore.load('equity', app.PANEL_DIR).symbols
+    # Watching it again fetches its full history again
+    app.watchlists.put('mine', {'symbols': ['ZZZ']})
+    fake_downloads.clear()
+    assert 'ZZZ' in refresh().symbols
+    assert (['ZZZ'], app.DATA_FETCH_PERIOD) in fake_downloads
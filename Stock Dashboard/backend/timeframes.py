@@ -0,0 +1,176 @@
+"""Weekly/monthly resampling with incrementally maintained indicators.
+
+Bars are resampled from the stored daily panel (Open=first, High=max, Low=min,
+Close=last, Volume=sum for whichever fields the panel stores) and each bar is
+labelled with its last trading date, so the current, still-forming week or
+month ends on the latest daily bar. Indicators are cached per (symbol,
+timeframe); on a refresh usually only the current period's bar has changed,
+and only that bar is recomputed. The cache can be saved to and lazily reloaded
+from one .npz file, so a restarted server extends the previous run's indicator
+state instead of recomputing every history.
+"""
+import os
+import threading
+
+from indicators import compute_indicator_arrays, extend_indicator_arrays, first_changed_bar, indicator_frame, provisional_values
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+TIMEFRAMES = ('daily', 'weekly', 'monthly')
+DEFAULT_TIMEFRAME = 'daily'
+
+def period_keys(index, timeframe):
+    """Returns an int64 bucket key per bar (weeks end on Friday; months are calendar months)."""
+    days = (index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1)
+    days = np.asarray(days, dtype=np.int64)
+    if timeframe == 'weekly':
+        # 1970-01-03 was a Saturday: weeks run Saturday..Friday so weekend crypto bars join the next week
+        return (days - 2) // 7
+    if timeframe == 'monthly':
+        return np.asarray(index.year * 12 + index.month - 1, dtype=np.int64)
+    return days
+
+def resample_bars(frame, timeframe):
+    """Resamples a NaN-free daily frame; returns (resampled frame, bucket keys)."""
+    keys = period_keys(frame.index, timeframe)
+    if timeframe == 'daily' or len(frame) == 0:
+        return frame, keys
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    data = {}
+    for column in frame.columns:
+        values = frame[column].to_numpy(dtype=float)
+        if column == 'Open':
+            data[column] = values[starts]
+        elif column == 'High':
+            data[column] = np.maximum.reduceat(values, starts)
+        elif column == 'Low':
+            data[column] = np.minimum.reduceat(values, starts)
+        elif column == 'Volume':
+            data[column] = np.add.reduceat(values, starts)
+        else:
+            data[column] = values[ends] # Close (and anything else): last value of the period
+    return pd.DataFrame(data, index=frame.index[ends]), keys[starts]
+
+class TimeframeCache:
+    """Per-(symbol, timeframe) resampled bars plus their indicator state."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._loaded = path is None
+        self._lock = threading.Lock()
+        self.stats = {'full': 0, 'incremental': 0, 'unchanged': 0}
+
+    def _ensure_loaded(self):
+        """Loads the saved state on first use (so restarts don't import numpy/pandas before they must)."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with np.load(self.path) as data:
+                    saved = {name: data[name] for name in data.files}
+            except (OSError, ValueError) as e:
+                if os.path.exists(self.path):
+                    print(f"Timeframes: Could not load indicator state: {e}")
+                return
+            columns = [name[len('arrays/'):] for name in saved if name.startswith('arrays/')]
+            bounds = np.r_[0, np.cumsum(saved['lengths'])]
+            for i, (symbol, timeframe) in enumerate(zip(saved['symbols'].tolist(), saved['timeframes'].tolist())):
+                rows = slice(bounds[i], bounds[i + 1])
+                arrays = {column: saved[f'arrays/{column}'][rows] for column in columns}
+                index = pd.DatetimeIndex(pd.to_datetime(saved['index'][rows], unit='s', utc=True))
+                self._entries.setdefault((symbol, timeframe), {
+                    'keys': saved['keys'][rows], 'close': saved['close'][rows], 'arrays': arrays,
+                    'indicators': indicator_frame(arrays, index), 'days': saved['days'][rows]})
+        print(f"Timeframes: Loaded indicator state for {len(self._entries)} symbol timeframe(s).")
+
+    def save(self):
+        """Atomically writes every cached entry to `path`."""
+        if self.path is None:
+            return
+        self._ensure_loaded()
+        with self._lock:
+            entries = list(self._entries.items())
+        if not entries:
+            return
+        first = entries[0][1]['arrays']
+        columns = [column for column in first if all(column in entry['arrays'] for _, entry in entries)]
+        data = {
+            'symbols': np.array([key[0] for key, _ in entries]),
+            'timeframes': np.array([key[1] for key, _ in entries]),
+            'lengths': np.array([len(entry['close']) for _, entry in entries], dtype=np.int64),
+            'index': np.concatenate([(entry['indicators'].index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+                                     for _, entry in entries]).astype(np.int64), # Seconds, as in the panel manifest
+        }
+        for field in ('keys', 'close', 'days'):
+            data[field] = np.concatenate([entry[field] for _, entry in entries])
+        for column in columns:
+            data[f'arrays/{column}'] = np.concatenate([entry['arrays'][column] for _, entry in entries])
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, **data)
+        os.replace(tmp_path, self.path)
+
+    def get(self, symbol, daily_frame, timeframe):
+        """Returns (bars, indicators) for `symbol`, updating only the bars that changed."""
+        self._ensure_loaded()
+        bars, keys = resample_bars(daily_frame, timeframe)
+        close = bars['Close'].to_numpy(dtype=float)
+        with self._lock:
+            entry = self._entries.get((symbol, timeframe))
+        if entry is None:
+            arrays = compute_indicator_arrays(close)
+            self.stats['full'] += 1
+        else:
+            start = first_changed_bar(entry['keys'], entry['close'], keys, close)
+            if start == len(close) == len(entry['close']):
+                self.stats['unchanged'] += 1
+                return bars, entry['indicators']
+            arrays = extend_indicator_arrays(close, entry['arrays'], start)
+            self.stats['incremental'] += 1
+        indicators = indicator_frame(arrays, bars.index)
+        days = (bars.index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1)
+        with self._lock:
+            self._entries[(symbol, timeframe)] = {'keys': keys, 'close': close, 'arrays': arrays, 'indicators': indicators,
+                                                  'days': np.asarray(days, dtype=np.int64)}
+        return bars, indicators
+
+    def provisional(self, symbol, timeframe, timestamp, price):
+        """Returns a provisional last bar for a live quote without changing the cache, or None.
+
+        The quote either updates the cached last bar (same day/week/month) or starts the next
+        one. The result holds the bar's indicator values, whether it replaced the last bar,
+        the EMAs of the bar before it, and the cached closes and bar days (UTC days since
+        epoch) it extends.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get((symbol, timeframe))
+        if entry is None or not len(entry['keys']):
+            return None
+        day = pd.Timestamp(timestamp).tz_convert('UTC').normalize()
+        key = period_keys(pd.DatetimeIndex([day]), timeframe)[0]
+        last_key = entry['keys'][-1]
+        if key < last_key:
+            return None # Quote older than the reconciled bars
+        replace_last = key == last_key
+        values = provisional_values(entry['close'], entry['arrays'], price, replace_last)
+        if values is None:
+            return None
+        previous = len(entry['close']) - (2 if replace_last else 1)
+        return {'values': values, 'replace_last': replace_last, 'close': entry['close'], 'days': entry['days'],
+                'previous': {column: entry['arrays'][column][previous] for column in ('EMA13', 'EMA21', 'EMA100', 'EMA200')},
+                'day': int((day - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(days=1))}
+
+    def discard(self, symbol):
+        """Drops every cached timeframe of a symbol."""
+        self._ensure_loaded()
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == symbol]:
+                del self._entries[key]
@@ -0,0 +1,156 @@
+"""Per-user and per-team watchlists plus the per-symbol result cache they share.
+
+A watchlist is a named symbol list with an owner (a user or a team). The store
+keeps a reference count per symbol across all lists; when the count of a symbol
+drops to zero, the `on_release` callback lets the app free whatever it computed
+for it. Payloads are assembled from a `SymbolResultCache`, so a symbol is
+computed once per data version however many watchlists contain it.
+"""
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+from price_panel import atomic_write_json
+
+MAX_WATCHLIST_SYMBOLS = 200
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9.^=\-]{1,15}$')
+
+class WatchlistStore:
+    """Watchlists persisted as one JSON file, with symbol reference counts."""
+
+    def __init__(self, path, on_release=None):
+        self.path = path
+        self.on_release = on_release
+        self.watchlists = {} # watchlist id -> {'name', 'owner', 'symbols'}
+        self.refcounts = Counter()
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """(Re)reads the file; returns the symbols no longer referenced."""
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path) as f:
+                self.watchlists = json.load(f).get('watchlists', {})
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.path):
+                print(f"Watchlists: Could not load watchlists: {e}")
+        return self._recount()
+
+    def _recount(self):
+        previous = self.refcounts
+        self.refcounts = Counter(symbol for watchlist in self.watchlists.values() for symbol in watchlist['symbols'])
+        return [symbol for symbol in previous if symbol not in self.refcounts]
+
+    def _release(self, symbols):
+        if symbols and self.on_release is not None:
+            self.on_release(symbols)
+
+    def reload_if_changed(self):
+        """Picks up watchlists edited by another worker process."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                released = self._load()
+            self._release(released)
+
+    def _save(self):
+        atomic_write_json(self.path, {'watchlists': self.watchlists})
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def put(self, watchlist_id, data):
+        """Validates and stores (or replaces) a watchlist; returns (watchlist, created)."""
+        if not isinstance(data, dict):
+            raise ValueError("A watchlist must be a JSON object")
+        symbols = data.get('symbols')
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+        if not isinstance(symbols, list) or not symbols:
+            raise ValueError("symbols must be a non-empty list")
+        symbols = list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols))
+        invalid = [symbol for symbol in symbols if not SYMBOL_PATTERN.match(symbol)]
+        if invalid:
+            raise ValueError(f"Invalid symbols: {', '.join(invalid)}")
+        if len(symbols) > MAX_WATCHLIST_SYMBOLS:
+            raise ValueError(f"A watchlist holds at most {MAX_WATCHLIST_SYMBOLS} symbols")
+        watchlist = {'name': data.get('name') or watchlist_id, 'owner': data.get('owner'), 'symbols': symbols}
+        self.reload_if_changed()
+        with self._lock:
+            created = watchlist_id not in self.watchlists
+            self.watchlists[watchlist_id] = watchlist
+            released = self._recount()
+            self._save()
+        self._release(released)
+        return dict(watchlist, id=watchlist_id), created
+
+    def remove(self, watchlist_id):
+        """Deletes a watchlist; returns False if it did not exist."""
+        self.reload_if_changed()
+        with self._lock:
+            if self.watchlists.pop(watchlist_id, None) is None:
+                return False
+            released = self._recount()
+            self._save()
+        self._release(released)
+        return True
+
+    def get(self, watchlist_id):
+        """Returns one watchlist, or None."""
+        self.reload_if_changed()
+        with self._lock:
+            watchlist = self.watchlists.get(watchlist_id)
+            return None if watchlist is None else dict(watchlist, id=watchlist_id)
+
+    def all(self, owner=None):
+        """Returns every watchlist (of one owner when given)."""
+        self.reload_if_changed()
+        with self._lock:
+            return [dict(watchlist, id=watchlist_id) for watchlist_id, watchlist in self.watchlists.items()
+                    if owner is None or watchlist.get('owner') == owner]
+
+    def watched_symbols(self):
+        """Returns every symbol on at least one watchlist."""
+        self.reload_if_changed()
+        with self._lock:
+            return list(self.refcounts)
+
+class SymbolResultCache:
+    """Computed results per (symbol, key), each tagged with what it was computed from (e.g. the data version)."""
+
+    def __init__(self):
+        self._entries = {} # symbol -> {key: (tag, result)}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'released': 0}
+
+    def get(self, symbol, key, tag):
+        """Returns the cached result if it was stored with `tag`, else None."""
+        with self._lock:
+            cached = self._entries.get(symbol, {}).get(key)
+            if cached is not None and cached[0] == tag:
+                self.stats['hits'] += 1
+                return cached[1]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, symbol, key, tag, result):
+        """Stores a result, replacing the one computed from an older tag."""
+        with self._lock:
+            self._entries.setdefault(symbol, {})[key] = (tag, result)
+        return result
+
+    def release(self, symbols):
+        """Drops every result of the given symbols."""
+        with self._lock:
+            for symbol in symbols:
+                if self._entries.pop(symbol, None) is not None:
+                    self.stats['released'] += 1
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(results) for results in self._entries.values())
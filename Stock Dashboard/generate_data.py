@@ -2,8 +2,11 @@
 """
 Standalone data generation script for GitHub Actions.
 Generates data.json with all dashboard data for static deployment.
+Weekly/monthly variants are written to data_weekly.json / data_monthly.json
+(e.g. python generate_data.py --timeframe daily,weekly,monthly).
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 import yfinance as yf
@@ -30,6 +33,9 @@ MARKET_SYMBOLS = {
 }
 
 DATA_FETCH_PERIOD = "5y"
+TIMEFRAMES = ('daily', 'weekly', 'monthly')
+# Monthly headline sentiment per symbol; backend/sentiment.py merges ingested headlines into it
+SENTIMENT_PATH = os.path.join(os.path.dirname(__file__), 'sentiment_data.json')
 
 
 def calculate_indicators(df):
@@ -177,6 +183,19 @@ def calculate_cumulative_return(close_prices, period_str='1y'):
         return cumulative_return.dropna()
 
 
+def resample_ohlcv(df, timeframe):
+    """Resamples daily bars to weekly (Saturday-Friday) or monthly bars labelled with their last trading date."""
+    df = df.dropna(subset=['Close'])
+    if timeframe == 'daily' or df.empty:
+        return df
+    period_index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+    keys = period_index.to_period('W-FRI' if timeframe == 'weekly' else 'M')
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    bars = df.groupby(keys).agg({col: how for col, how in agg.items() if col in df.columns})
+    bars.index = pd.DatetimeIndex(df.index.to_series().groupby(keys).last())
+    return bars
+
+
 # Simplified process_asset_data - only essential data for static deployment
 def process_asset_simple(symbol, stock_data_raw, spy_1y_change=None):
     """Simplified asset processing for static deployment."""
@@ -288,12 +307,10 @@ def process_asset_simple(symbol, stock_data_raw, spy_1y_change=None):
         return None
 
 
-def main():
-    """Generate dashboard data and save to data.json"""
+def main(timeframes=('daily',)):
+    """Generate dashboard data and save to data.json (and data_<timeframe>.json per extra timeframe)"""
     print(f"Starting data generation at {datetime.now(timezone.utc).isoformat()}")
     
-    market_data = {}
-    asset_data = {}
     spy_1y_change = None
     spy_1y_history_dates = []
     spy_1y_history_values = []
@@ -330,19 +347,37 @@ def main():
         if batch_data.index.tz is None:
             batch_data.index = batch_data.index.tz_localize('UTC')
     
+    sentiment = {}
+    try:
+        with open(SENTIMENT_PATH) as f:
+            sentiment = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading sentiment: {e}")
+
+    # The single daily download is resampled for every requested timeframe
+    for timeframe in timeframes:
+        write_timeframe(batch_data, timeframe, spy_1y_change, spy_1y_history_dates, spy_1y_history_values, sentiment)
+
+
+def write_timeframe(batch_data, timeframe, spy_1y_change, spy_1y_history_dates, spy_1y_history_values, sentiment=None):
+    """Process every symbol at one timeframe and save the output file"""
+    market_data = {}
+    asset_data = {}
+    available = set(batch_data.columns.get_level_values(0)) if not batch_data.empty else set()
+
     # Process market data
     for symbol in MARKET_SYMBOLS.keys():
         try:
-            if symbol in batch_data.columns.get_level_values(0):
-                market_data[symbol] = process_asset_simple(symbol, batch_data[symbol], spy_1y_change)
+            if symbol in available:
+                market_data[symbol] = process_asset_simple(symbol, resample_ohlcv(batch_data[symbol], timeframe), spy_1y_change)
         except Exception as e:
             print(f"Error processing {symbol}: {e}")
     
     # Process asset data
     for symbol in ASSET_LIST.keys():
         try:
-            if symbol in batch_data.columns.get_level_values(0):
-                asset_data[symbol] = process_asset_simple(symbol, batch_data[symbol], spy_1y_change)
+            if symbol in available:
+                asset_data[symbol] = process_asset_simple(symbol, resample_ohlcv(batch_data[symbol], timeframe), spy_1y_change)
         except Exception as e:
             print(f"Error processing {symbol}: {e}")
     
@@ -360,17 +395,28 @@ def main():
         'market_data': market_data,
         'asset_data': asset_data,
         'spy_1y_history': {'dates': spy_1y_history_dates, 'values': spy_1y_history_values},
+        'sentiment': {symbol: months for symbol, months in (sentiment or {}).items() if symbol in asset_data},
+        'timeframe': timeframe,
         'generated_at': datetime.now(timezone.utc).isoformat()
     })
     
     # Write to file
-    output_path = os.path.join(os.path.dirname(__file__), 'frontend', 'data.json')
+    filename = 'data.json' if timeframe == 'daily' else f'data_{timeframe}.json'
+    output_path = os.path.join(os.path.dirname(__file__), 'frontend', filename)
     with open(output_path, 'w') as f:
         json.dump(output_data, f, indent=2)
     
     print(f"Successfully generated {output_path}")
-    print(f"Processed {len(market_data)} market symbols and {len(asset_data)} assets")
+    print(f"Processed {len(market_data)} market symbols and {len(asset_data)} assets ({timeframe})")
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--timeframe', default='daily',
+                        help=f"Comma-separated timeframes to generate ({', '.join(TIMEFRAMES)})")
+    args = parser.parse_args()
+    selected = [tf.strip().lower() for tf in args.timeframe.split(',') if tf.strip()]
+    unknown = [tf for tf in selected if tf not in TIMEFRAMES]
+    if unknown:
+        parser.error(f"unknown timeframe(s): {', '.join(unknown)}")
+    main(selected)